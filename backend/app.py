@@ -1,32 +1,178 @@
-"""Flask REST API for chess game."""
+"""Flask REST API for chess game.
 
-from flask import Flask, jsonify, request
+Routes live on the ``api`` blueprint; ``create_app()`` builds an app
+around it with its own game store and engine pool. ``python app.py`` runs
+the development server and serve.py is the production entry point.
+"""
+
+import concurrent.futures
+import os
+
+from flask import Blueprint, Flask, current_app, g, jsonify, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from board import ChessBoard
+from werkzeug.local import LocalProxy
+import archive
+import book
+import metrics
+import wire
+from store import GameStore, ENGINES
+from workers import EnginePool, PoolSaturated, analyze_positions, engine_search, replay_games
+from notation import NotationError, apply_move_strings, read_pgn
+from rules import GAME_OVER
+from transposition import position_cache
+
+
+class WireJSONProvider(DefaultJSONProvider):
+    """JSON responses encoded by wire.dumps: orjson when installed, compact either way."""
+    
+    def dumps(self, obj, **kwargs):
+        return wire.dumps(obj).decode()
+
+
+# Settings read by create_app(), each overridable by an environment variable
+# of the same name: name -> (type, default)
+SETTINGS = {
+    'CHESS_DB_PATH': (str, 'games.db'),
+    'CHESS_MAX_HOT_GAMES': (int, 10000),
+    'CHESS_IDLE_TTL': (float, 3600),
+    'CHESS_FREEZE_AFTER': (float, 60),
+    'CHESS_MAX_FROZEN_GAMES': (int, 100000),
+    'CHESS_OPENING_BOOK': (str, None),
+    'CHESS_ENGINE_WORKERS': (int, os.cpu_count() or 1),
+    # Default: 4 per engine worker
+    'CHESS_ENGINE_QUEUE': (int, None),
+    # Longest search a client may ask the engine for, in milliseconds
+    'CHESS_ENGINE_MAX_TIME_MS': (int, 10000),
+    # Index of this worker process, put in game IDs so a proxy can route them back
+    'CHESS_WORKER': (int, None),
+    # Sampling profiler for production debugging, only reachable when opted in
+    'CHESS_PROFILER': (lambda value: value == '1', False),
+}
+
+
+def load_config(overrides=None):
+    """SETTINGS from the environment or their defaults, updated with overrides."""
+    config = {
+        name: convert(os.environ[name]) if name in os.environ else default
+        for name, (convert, default) in SETTINGS.items()
+    }
+    config.update(overrides or {})
+    return config
+
+
+api = Blueprint('api', __name__)
+
+# The game store and engine pool of the app serving the request
+store = LocalProxy(lambda: current_app.extensions['chess']['store'])
+engine_pool = LocalProxy(lambda: current_app.extensions['chess']['engine_pool'])
+
+# Extra seconds to wait for a search result before giving up on the worker
+ENGINE_TIMEOUT_MARGIN = 5
+
+
+def _state_etag(game):
+    """ETag for a game's state; changes whenever a move is made or taken back."""
+    return game.version()
+
+
+def _since_param(game):
+    """The move count named by the ?since=<version> query parameter, or None.
+    
+    None also when the version is not from the game's current history,
+    e.g. after moves it covers were taken back, so the client gets the
+    full state rather than a delta against a board it does not have.
+    """
+    since = request.args.get('since')
+    if since is None:
+        return None
+    return game.resolve_version(since)
+
+
+def _pool_busy(error):
+    """503 response telling the client to retry once the engine pool drains."""
+    response = jsonify({
+        'success': False,
+        'error': str(error)
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+@api.before_app_request
+def _start_request_timer():
+    g.request_start = metrics.begin_request()
+
+
+@api.after_app_request
+def _record_request(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.end_request(start, request.method, route, response.status_code)
+    return response
+
 
-app = Flask(__name__)
-CORS(app)
+@api.before_app_request
+def _negotiate_board_format():
+    if request.endpoint == 'api.export_games':
+        # ?format= selects the export format there
+        return None
+    try:
+        g.board_format = wire.board_format(request.args.get('format'), request.headers.get('Accept'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+
+def _state_response(fields, game, status=200):
+    """JSON response of fields plus the game's state in the requested board format.
+    
+    The state is spliced in from the game's cached encoding, so repeated
+    fetches of an unchanged position do not serialize the board again.
+    """
+    response = current_app.response_class(
+        wire.with_field(fields, 'state', game.encoded_state(g.board_format)),
+        status=status,
+        mimetype='application/json'
+    )
+    response.vary.add('Accept')
+    return response
 
-# Store active games (in production, use a database)
-games = {}
-game_counter = 0
 
+def _conditional(response, game):
+    """Tag a response with the game's ETag and answer 304 if the client has it."""
+    response.set_etag(_state_etag(game), weak=True)
+    return response.make_conditional(request)
 
-@app.route('/api/game/new', methods=['POST'])
+
+@api.route('/api/game/new', methods=['POST'])
 def new_game():
-    """Create a new chess game."""
-    global game_counter
+    """Create a new chess game, optionally from a FEN position."""
     try:
-        game_counter += 1
-        game_id = f"game_{game_counter}"
-        games[game_id] = ChessBoard()
+        data = request.get_json(silent=True) or {}
+        engine = data.get('engine', 'object')
+        if engine not in ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown engine '{engine}'"
+            }), 400
         
-        return jsonify({
+        try:
+            game_id, game = store.create(engine, data.get('fen'))
+        except NotationError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return _state_response({
             'success': True,
             'game_id': game_id,
-            'message': 'New game created',
-            'state': games[game_id].get_board_state()
-        }), 201
+            'message': 'New game created'
+        }, game, 201)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -34,21 +180,190 @@ def new_game():
         }), 500
 
 
-@app.route('/api/game/<game_id>/state', methods=['GET'])
+@api.route('/api/game/<game_id>/state', methods=['GET'])
 def get_game_state(game_id):
     """Get current state of a game."""
     try:
-        if game_id not in games:
+        with store.locked(game_id) as game:
+            if game is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game not found'
+                }), 404
+            
+            since = _since_param(game)
+            if since is not None:
+                response = jsonify({
+                    'success': True,
+                    'game_id': game_id,
+                    'delta': game.get_state_delta(since)
+                })
+            else:
+                response = _state_response({
+                    'success': True,
+                    'game_id': game_id
+                }, game)
+            return _conditional(response, game)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/game/<game_id>/move', methods=['POST'])
+def make_move(game_id):
+    """Make a move in a game."""
+    try:
+        with store.locked(game_id) as game:
+            if game is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game not found'
+                }), 404
+            
+            data = request.get_json()
+            if not data or 'from' not in data or 'to' not in data:
+                return jsonify({
+                    'success': False,
+                    'error': 'Missing from or to position'
+                }), 400
+            
+            from_pos = tuple(data['from'])
+            to_pos = tuple(data['to'])
+            
+            success, message = game.move_piece(from_pos, to_pos, data.get('promotion'))
+            
+            if success:
+                store.mark_dirty(game_id)
+                since = _since_param(game)
+                if since is not None:
+                    return jsonify({
+                        'success': True,
+                        'message': message,
+                        'delta': game.get_state_delta(since)
+                    }), 200
+                return _state_response({
+                    'success': True,
+                    'message': message
+                }, game, 200)
+            else:
+                return jsonify({
+                    'success': False,
+                    'error': message
+                }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/game/<game_id>/engine-move', methods=['POST'])
+def engine_move(game_id):
+    """Let the built-in engine play a move for the side to move."""
+    try:
+        data = request.get_json(silent=True) or {}
+        time_ms = data.get('time_ms', 1000)
+        max_time_ms = current_app.config['CHESS_ENGINE_MAX_TIME_MS']
+        if not isinstance(time_ms, (int, float)) or not 1 <= time_ms <= max_time_ms:
             return jsonify({
                 'success': False,
-                'error': 'Game not found'
-            }), 404
+                'error': f"time_ms must be between 1 and {max_time_ms}"
+            }), 400
         
+        with store.locked(game_id) as game:
+            if game is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game not found'
+                }), 404
+            if game.game_status in GAME_OVER:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game is over'
+                }), 400
+            fen = game.to_fen()
+            position = (len(game.move_history), game.zobrist_hash)
+            # Book positions are answered at once, without a search
+            result = book.suggest(game.zobrist_hash)
+        
+        if result is None:
+            # Search in a worker process so the game stays readable and other
+            # games keep being served while the engine thinks
+            try:
+                future = engine_pool.submit(engine_search, fen, time_ms)
+            except PoolSaturated as e:
+                return _pool_busy(e)
+            try:
+                result = future.result(timeout=time_ms / 1000 + ENGINE_TIMEOUT_MARGIN)
+            except concurrent.futures.TimeoutError:
+                # Not the builtin TimeoutError before Python 3.11
+                return jsonify({
+                    'success': False,
+                    'error': 'Engine timed out'
+                }), 504
+        
+        with store.locked(game_id) as game:
+            if game is None or (len(game.move_history), game.zobrist_hash) != position:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game changed during search'
+                }), 409
+            
+            from_pos, to_pos, promotion = result['move']
+            success, message = game.move_piece(from_pos, to_pos, promotion)
+            if not success:
+                return jsonify({
+                    'success': False,
+                    'error': message
+                }), 500
+            store.mark_dirty(game_id)
+            
+            return _state_response({
+                'success': True,
+                'move': {'from': from_pos, 'to': to_pos, 'promotion': promotion},
+                'search': {key: value for key, value in result.items() if key != 'move'}
+            }, game, 200)
+    except Exception as e:
         return jsonify({
-            'success': True,
-            'game_id': game_id,
-            'state': games[game_id].get_board_state()
-        }), 200
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/game/<game_id>/undo', methods=['POST'])
+def undo_move(game_id):
+    """Take back the last move, or the last count moves."""
+    try:
+        with store.locked(game_id) as game:
+            if game is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game not found'
+                }), 404
+            
+            data = request.get_json(silent=True) or {}
+            count = data.get('count', 1)
+            if not isinstance(count, int) or count < 1:
+                return jsonify({
+                    'success': False,
+                    'error': 'count must be a positive integer'
+                }), 400
+            if count > len(game.move_history):
+                return jsonify({
+                    'success': False,
+                    'error': 'Not enough moves to undo'
+                }), 400
+            
+            for _ in range(count):
+                game.unmake_move()
+            store.mark_dirty(game_id)
+            
+            return _state_response({
+                'success': True,
+                'undone': count
+            }, game, 200)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -56,40 +371,190 @@ def get_game_state(game_id):
         }), 500
 
 
-@app.route('/api/game/<game_id>/move', methods=['POST'])
-def make_move(game_id):
-    """Make a move in a game."""
+@api.route('/api/game/<game_id>/history', methods=['GET'])
+def get_move_history(game_id):
+    """Get move history for a game."""
+    try:
+        with store.locked(game_id) as game:
+            if game is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game not found'
+                }), 404
+            
+            since = _since_param(game) or 0
+            response = jsonify({
+                'success': True,
+                'game_id': game_id,
+                'since': since,
+                'history': game.move_history[since:]
+            })
+            return _conditional(response, game)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/game/<game_id>/moves', methods=['GET'])
+def get_legal_moves(game_id):
+    """Get all legal moves for the side to move."""
     try:
-        if game_id not in games:
+        with store.locked(game_id) as game:
+            if game is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game not found'
+                }), 404
+            
+            moves = [
+                {'from': from_pos, 'to': to_pos, 'promotion': promotion}
+                for from_pos, to_pos, promotion in game.legal_moves()
+            ]
+            
+            response = jsonify({
+                'success': True,
+                'game_id': game_id,
+                'current_turn': game.current_turn,
+                'moves': moves
+            })
+            return _conditional(response, game)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/game/<game_id>/fen', methods=['GET'])
+def get_fen(game_id):
+    """Get the current position as a FEN string."""
+    try:
+        with store.locked(game_id) as game:
+            if game is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game not found'
+                }), 404
+            
+            response = jsonify({
+                'success': True,
+                'game_id': game_id,
+                'fen': game.to_fen()
+            })
+            return _conditional(response, game)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _parse_move_list(data):
+    """Return (move strings, notation) from a batch/import request body."""
+    if 'pgn' in data:
+        if not isinstance(data['pgn'], str):
+            raise NotationError("'pgn' must be a string")
+        parsed = list(read_pgn(data['pgn'].splitlines()))
+        if len(parsed) != 1:
+            raise NotationError('Expected exactly one game in PGN')
+        return parsed[0]['moves'], 'san'
+    moves = data.get('moves')
+    if not isinstance(moves, list):
+        raise NotationError("Missing 'moves' list or 'pgn' text")
+    return moves, data.get('format', 'uci')
+
+
+@api.route('/api/game/<game_id>/moves:batch', methods=['POST'])
+def make_moves_batch(game_id):
+    """Apply a list of UCI/SAN moves or a PGN game in one request."""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            moves, notation = _parse_move_list(data)
+        except NotationError as e:
             return jsonify({
                 'success': False,
-                'error': 'Game not found'
-            }), 404
+                'error': str(e)
+            }), 400
         
-        data = request.get_json()
-        if not data or 'from' not in data or 'to' not in data:
+        with store.locked(game_id) as game:
+            if game is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Game not found'
+                }), 404
+            
+            applied, error = apply_move_strings(game, moves, notation)
+            if applied:
+                store.mark_dirty(game_id)
+            
+            if error:
+                return _state_response({
+                    'success': False,
+                    'error': error,
+                    'applied': applied
+                }, game, 400)
+            return _state_response({
+                'success': True,
+                'applied': applied
+            }, game, 200)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/games:import', methods=['POST'])
+def import_games():
+    """Create games from a PGN archive or from lists of UCI/SAN moves."""
+    try:
+        data = request.get_json(silent=True) or {}
+        engine = data.get('engine', 'object')
+        if engine not in ENGINES:
             return jsonify({
                 'success': False,
-                'error': 'Missing from or to position'
+                'error': f"Unknown engine '{engine}'"
             }), 400
         
-        from_pos = tuple(data['from'])
-        to_pos = tuple(data['to'])
-        
-        game = games[game_id]
-        success, message = game.move_piece(from_pos, to_pos)
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'message': message,
-                'state': game.get_board_state()
-            }), 200
+        if 'pgn' in data:
+            if not isinstance(data['pgn'], str):
+                return jsonify({
+                    'success': False,
+                    'error': "'pgn' must be a string"
+                }), 400
+            sources = [
+                (game['moves'], 'san', game['headers'].get('FEN'))
+                for game in read_pgn(data['pgn'].splitlines())
+            ]
+        elif isinstance(data.get('games'), list):
+            sources = [(moves, data.get('format', 'uci'), None) for moves in data['games']]
         else:
             return jsonify({
                 'success': False,
-                'error': message
+                'error': "Missing 'pgn' text or 'games' list"
             }), 400
+        
+        # Replaying is CPU-bound, so validate in a worker and store packed moves
+        try:
+            results = engine_pool.submit(replay_games, engine, sources).result()
+        except PoolSaturated as e:
+            return _pool_busy(e)
+        
+        replayed = [result for result in results if 'packed' in result]
+        game_ids = store.import_packed(engine, [
+            (result.pop('packed'), result.pop('fen'), result['game_status']) for result in replayed
+        ])
+        for result, game_id in zip(replayed, game_ids):
+            result['game_id'] = game_id
+        
+        return jsonify({
+            'success': True,
+            'imported': sum(1 for result in results if 'game_id' in result),
+            'games': results
+        }), 201
     except Exception as e:
         return jsonify({
             'success': False,
@@ -97,20 +562,24 @@ def make_move(game_id):
         }), 500
 
 
-@app.route('/api/game/<game_id>/history', methods=['GET'])
-def get_move_history(game_id):
-    """Get move history for a game."""
+@api.route('/api/games', methods=['GET'])
+def list_games():
+    """List stored games a page at a time, in game ID order."""
     try:
-        if game_id not in games:
+        try:
+            limit = archive.page_size(request.args.get('limit'))
+            statuses = archive.status_filter(request.args.get('status'))
+        except ValueError as e:
             return jsonify({
                 'success': False,
-                'error': 'Game not found'
-            }), 404
+                'error': str(e)
+            }), 400
         
+        games, next_cursor = archive.list_page(store, request.args.get('cursor'), limit, statuses)
         return jsonify({
             'success': True,
-            'game_id': game_id,
-            'history': games[game_id].move_history
+            'games': games,
+            'next_cursor': next_cursor
         }), 200
     except Exception as e:
         return jsonify({
@@ -119,22 +588,218 @@ def get_move_history(game_id):
         }), 500
 
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/games:export', methods=['GET'])
+def export_games():
+    """Stream stored games as NDJSON or PGN, one game at a time."""
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in archive.EXPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown export format '{export_format}'; use ndjson or pgn"
+            }), 400
+        try:
+            statuses = archive.status_filter(request.args.get('status'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        rows = store.iter_games(request.args.get('cursor'), statuses)
+        body = archive.ndjson_lines(rows) if export_format == 'ndjson' else archive.pgn_games(rows)
+        response = current_app.response_class(body, mimetype=archive.EXPORT_FORMATS[export_format])
+        response.headers['Content-Disposition'] = f'attachment; filename="games.{export_format}"'
+        return response
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/analyze', methods=['POST'])
+def analyze():
+    """Evaluate many FEN positions in the engine workers, streaming one NDJSON result per position."""
+    try:
+        if request.is_json:
+            data = request.get_json(silent=True) or {}
+            fens = data.get('positions')
+            if not isinstance(fens, list):
+                return jsonify({
+                    'success': False,
+                    'error': "Missing 'positions' list"
+                }), 400
+        else:
+            # One FEN per line, read as the workers ask for more
+            fens = (line.decode('utf-8', 'replace').strip() for line in request.stream)
+            fens = (fen for fen in fens if fen)
+        
+        results = analyze_positions(fens, pool=engine_pool)
+        try:
+            # Start the first chunks now so a full pool is still a 503
+            first = next(results, None)
+        except PoolSaturated as e:
+            return _pool_busy(e)
+        
+        def lines():
+            if first is None:
+                return
+            yield wire.dumps(first) + b'\n'
+            try:
+                for result in results:
+                    yield wire.dumps(result) + b'\n'
+            except PoolSaturated as e:
+                yield wire.dumps({'error': str(e)}) + b'\n'
+        
+        return current_app.response_class(stream_with_context(lines()), mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
-        'active_games': len(games)
+        'active_games': len(store),
+        'stored_games': store.stored_count(),
+        'frozen_games': store.frozen_count(),
+        'transposition_cache': position_cache.stats(),
+        'engine_pool': engine_pool.stats()
     }), 200
 
 
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Metrics in the Prometheus text exposition format."""
+    return metrics.registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+@api.route('/api/debug/profiler', methods=['GET', 'POST'])
+def sampling_profiler():
+    """Start or stop the sampling profiler (POST), or fetch its collapsed stacks (GET)."""
+    profiler = current_app.extensions['chess']['profiler']
+    if profiler is None:
+        return jsonify({
+            'success': False,
+            'error': 'Profiler disabled; set CHESS_PROFILER=1 to enable it'
+        }), 404
+    
+    if request.method == 'GET':
+        return profiler.collapsed(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        enabled = data.get('enabled')
+        if not isinstance(enabled, bool):
+            return jsonify({
+                'success': False,
+                'error': 'enabled must be true or false'
+            }), 400
+        if enabled:
+            profiler.start()
+        else:
+            profiler.stop()
+        return jsonify({
+            'success': True,
+            'running': profiler.running,
+            'samples': profiler.samples
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def create_backends(config):
+    """Build the game store, opening book and engine pool a server needs from load_config() settings.
+    
+    Returns (store, pool); the store's flusher thread is already running.
+    Shared by create_app() and the asyncio server.
+    """
+    # Hot games in memory, persisted to SQLite with write-behind flushes
+    game_store = GameStore(
+        db_path=config['CHESS_DB_PATH'],
+        max_hot=config['CHESS_MAX_HOT_GAMES'],
+        idle_ttl=config['CHESS_IDLE_TTL'],
+        freeze_after=config['CHESS_FREEZE_AFTER'],
+        max_frozen=config['CHESS_MAX_FROZEN_GAMES'],
+        worker=config['CHESS_WORKER']
+    )
+    game_store.start()
+    
+    # Opening book shared read-only with other workers through mmap; a
+    # pre-forking server has usually loaded it before the fork already
+    book_path = config['CHESS_OPENING_BOOK']
+    if book_path and (position_cache.book is None or position_cache.book.path != book_path):
+        book.load(book_path)
+    
+    # Worker processes for engine searches and bulk imports, with a bounded queue
+    workers = config['CHESS_ENGINE_WORKERS']
+    pool = EnginePool(
+        max_workers=workers,
+        max_pending=config['CHESS_ENGINE_QUEUE'] or 4 * max(workers, 1)
+    )
+    return game_store, pool
+
+
+def create_app(config=None):
+    """Build the API app with its own game store and engine pool.
+    
+    config overrides load_config() settings, for example
+    ``create_app({'CHESS_DB_PATH': None})`` for a store without SQLite.
+    Importing this module builds nothing, so processes that only import it
+    (engine workers, tools) stay light, and a pre-forking server can import
+    everything once and build an app per worker after the fork.
+    """
+    config = load_config(config)
+    app = Flask(__name__)
+    app.config.update(config)
+    app.json = WireJSONProvider(app)
+    CORS(app, expose_headers=['ETag'])
+    metrics.instrument()
+    game_store, pool = create_backends(config)
+    metrics.register_server_metrics(game_store, pool)
+    app.extensions['chess'] = {
+        'store': game_store,
+        'engine_pool': pool,
+        'profiler': metrics.SamplingProfiler() if config['CHESS_PROFILER'] else None
+    }
+    app.register_blueprint(api)
+    return app
+
+
+def close_app(app):
+    """Flush an app's games to storage and stop its engine workers."""
+    state = app.extensions['chess']
+    state['store'].close()
+    state['engine_pool'].shutdown()
+
+
 if __name__ == '__main__':
+    app = create_app()
     print("Starting Chess API server...")
     print("API will be available at http://localhost:5001")
     print("\nEndpoints:")
     print("  POST   /api/game/new")
     print("  GET    /api/game/<game_id>/state")
     print("  POST   /api/game/<game_id>/move")
+    print("  POST   /api/game/<game_id>/engine-move")
+    print("  POST   /api/game/<game_id>/undo")
     print("  GET    /api/game/<game_id>/history")
+    print("  GET    /api/game/<game_id>/moves")
+    print("  GET    /api/game/<game_id>/fen")
+    print("  POST   /api/game/<game_id>/moves:batch")
+    print("  POST   /api/games:import")
+    print("  GET    /api/games")
+    print("  GET    /api/games:export")
+    print("  POST   /api/analyze")
     print("  GET    /api/health")
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    print("  GET    /api/metrics")
+    print("\nDevelopment server; use serve.py in production")
+    app.run(debug=os.environ.get('CHESS_DEBUG') == '1', host='0.0.0.0', port=5001)
@@ -0,0 +1,118 @@
+"""Listing and bulk export of stored games.
+
+Everything here is a generator over ``GameStore.iter_games()``, which reads
+the store in small batches, so a page costs one query and an export of the
+whole archive holds one game in memory at a time however large the archive
+is. NDJSON exports need no replay: moves are unpacked straight to UCI.
+PGN exports replay each game to write its moves in SAN.
+"""
+
+import itertools
+import time
+
+import wire
+from notation import format_pgn, format_uci, san_moves
+from rules import GAME_OVER
+from store import ENGINES, unpack_moves
+
+# Export format -> response media type
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'pgn': 'application/x-chess-pgn'
+}
+GAME_STATUSES = ('active', 'check', 'checkmate', 'stalemate', 'draw')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+def status_filter(value):
+    """Game statuses selected by a ?status= value, or None for every game.
+    
+    'finished' selects every status that ends the game. Raises ValueError
+    for an unknown value.
+    """
+    if value is None:
+        return None
+    if value == 'finished':
+        return GAME_OVER
+    if value in GAME_STATUSES:
+        return (value,)
+    raise ValueError(f"Unknown status '{value}'; use finished or one of {', '.join(GAME_STATUSES)}")
+
+
+def page_size(value):
+    """Page size from a ?limit= value. Raises ValueError if it is not a number in range."""
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def summary(row):
+    """Summary of a stored game row for listings."""
+    return {
+        'game_id': row['game_id'],
+        'engine': row['engine'],
+        'game_status': row['game_status'],
+        'move_count': len(row['moves']) // 2,
+        'start_fen': row['start_fen'],
+        'updated_at': row['updated_at']
+    }
+
+
+def list_page(store, cursor=None, limit=DEFAULT_PAGE_SIZE, statuses=None):
+    """One page of game summaries after cursor, and the cursor of the next page (None on the last)."""
+    rows = store.iter_games(cursor, statuses, batch_size=limit + 1)
+    try:
+        games = [summary(row) for row in itertools.islice(rows, limit + 1)]
+    finally:
+        rows.close()
+    if len(games) > limit:
+        return games[:limit], games[limit - 1]['game_id']
+    return games, None
+
+
+def ndjson_lines(rows):
+    """Yield one JSON line per stored game, with its moves in UCI."""
+    for row in rows:
+        record = summary(row)
+        record['moves'] = [format_uci(move) for move in unpack_moves(row['moves'])]
+        yield wire.dumps(record) + b'\n'
+
+
+def pgn_result(game):
+    """PGN result tag for a game's current status."""
+    if game.game_status == 'checkmate':
+        return '0-1' if game.current_turn == 'white' else '1-0'
+    if game.game_status in ('stalemate', 'draw'):
+        return '1/2-1/2'
+    return '*'
+
+
+def pgn_games(rows):
+    """Yield the PGN text of each stored game, replayed to write its moves in SAN."""
+    for row in rows:
+        game = ENGINES[row['engine']](row['start_fen'])
+        fullmove, turn = game.fullmove_number, game.current_turn
+        moves = list(san_moves(game, unpack_moves(row['moves'])))
+        result = pgn_result(game)
+        updated_at = row['updated_at']
+        headers = {
+            'Event': 'Chess API game',
+            'Site': '?',
+            'Date': time.strftime('%Y.%m.%d', time.gmtime(updated_at)) if updated_at else '????.??.??',
+            'Round': '-',
+            'White': '?',
+            'Black': '?',
+            'Result': result,
+            'GameId': row['game_id']
+        }
+        if row['start_fen']:
+            headers['SetUp'] = '1'
+            headers['FEN'] = row['start_fen']
+        yield format_pgn(headers, moves, result, fullmove, turn) + '\n'
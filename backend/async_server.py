@@ -0,0 +1,481 @@
+"""Asyncio server mode with Server-Sent Events for live games.
+
+Serves the same JSON API as ``app.py`` (board formats are selected with
+``?format=`` only, not the Accept header) from a single event loop and adds
+
+    GET /api/game/<game_id>/events
+
+which streams a ``state`` event on connect and a ``move`` event (a state
+delta, see API.md) after every move, to any number of subscribers. A
+takeback is sent as a new ``state`` event. Idle
+subscribers are just suspended coroutines, so one process can hold tens of
+thousands of open streams. Anything that can block, taking a game's
+lock, replaying a game or reading SQLite, runs in the loop's thread pool,
+so a slow game never holds up other requests or streams.
+
+Settings come from the same CHESS_* environment variables as app.py.
+
+Usage:
+    python async_server.py [--host HOST] [--port PORT]
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import re
+from urllib.parse import parse_qs
+
+import book
+import metrics
+import wire
+from app import ENGINE_TIMEOUT_MARGIN, SETTINGS, create_backends, load_config
+from store import ENGINES
+from notation import NotationError
+from rules import GAME_OVER
+from transposition import position_cache
+from workers import EnginePool, PoolSaturated, engine_search
+
+MAX_BODY_BYTES = 64 * 1024
+KEEPALIVE_SECONDS = 15
+
+REASONS = {
+    200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request',
+    404: 'Not Found', 405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+    500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'
+}
+CORS_HEADERS = (
+    'Access-Control-Allow-Origin: *\r\n'
+    'Access-Control-Allow-Headers: Content-Type, Last-Event-ID\r\n'
+    'Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n'
+)
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestTooLarge(ValueError):
+    """Raised when a request body exceeds MAX_BODY_BYTES."""
+
+
+def format_event(event, data, event_id=None):
+    """Encode one Server-Sent Event."""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class EventBroker:
+    """Fans out encoded events to every subscriber of a game.
+    
+    Each subscriber has a bounded queue. A subscriber that falls too far
+    behind is sent ``None`` and dropped; it can reconnect with Last-Event-ID
+    to catch up.
+    """
+    
+    def __init__(self, max_queue=256):
+        self.max_queue = max_queue
+        self._subscribers = {}
+    
+    def subscribe(self, game_id):
+        queue = asyncio.Queue(self.max_queue)
+        self._subscribers.setdefault(game_id, set()).add(queue)
+        return queue
+    
+    def unsubscribe(self, game_id, queue):
+        queues = self._subscribers.get(game_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[game_id]
+    
+    def publish(self, game_id, message):
+        """Queue an already encoded event for every subscriber of game_id."""
+        for queue in list(self._subscribers.get(game_id, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.unsubscribe(game_id, queue)
+    
+    def subscriber_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+
+class AsyncChessServer:
+    """Minimal HTTP/1.1 server exposing the chess API on an asyncio loop."""
+    
+    def __init__(self, store, broker=None, pool=None, max_time_ms=SETTINGS['CHESS_ENGINE_MAX_TIME_MS'][1]):
+        self.store = store
+        self.broker = broker or EventBroker()
+        # Engine searches run in worker processes, never on the event loop
+        self.pool = pool or EnginePool()
+        self.max_time_ms = max_time_ms
+        # The loop serving connections, for handlers publishing from the thread pool
+        self.loop = None
+        self.routes = [
+            ('POST', re.compile(r'^/api/game/new$'), self.new_game),
+            ('GET', re.compile(r'^/api/game/([^/]+)/state$'), self.get_game_state),
+            ('POST', re.compile(r'^/api/game/([^/]+)/move$'), self.make_move),
+            ('POST', re.compile(r'^/api/game/([^/]+)/undo$'), self.undo_move),
+            ('POST', re.compile(r'^/api/game/([^/]+)/engine-move$'), self.engine_move),
+            ('GET', re.compile(r'^/api/game/([^/]+)/history$'), self.get_move_history),
+            ('GET', re.compile(r'^/api/game/([^/]+)/moves$'), self.get_legal_moves),
+            ('GET', re.compile(r'^/api/game/([^/]+)/fen$'), self.get_fen),
+            ('GET', re.compile(r'^/api/health$'), self.health_check),
+        ]
+        self.events_route = re.compile(r'^/api/game/([^/]+)/events$')
+        metrics.register_server_metrics(store, self.pool)
+    
+    async def serve(self, host='0.0.0.0', port=5001):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+    
+    async def handle_connection(self, reader, writer):
+        self.loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                
+                match = self.events_route.match(path)
+                if match and method == 'GET':
+                    await self.stream_events(match.group(1), headers, writer)
+                    break
+                
+                if method == 'OPTIONS':
+                    self._write_json(writer, 204, None)
+                elif method == 'GET' and path == '/api/metrics':
+                    # Store gauges take game locks and query SQLite
+                    rendered = await self.blocking(metrics.registry.render)
+                    self._write(writer, 200, rendered.encode(), METRICS_CONTENT_TYPE)
+                else:
+                    self._write_json(writer, *await self.dispatch(method, path, query, body))
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except RequestTooLarge as e:
+            # The body is left unread, so the connection cannot be reused
+            self._write_json(writer, 413, {'success': False, 'error': str(e)})
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        length = int(headers.get('content-length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestTooLarge(f"Request body larger than {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+        path, _, query = target.partition('?')
+        return method.upper(), path, parse_qs(query), headers, body
+    
+    def _write_json(self, writer, status, payload):
+        body = b'' if payload is None else wire.dumps(payload)
+        self._write(writer, status, body, 'application/json')
+    
+    def _write(self, writer, status, body, content_type):
+        # Saturated engine pool: ask clients to back off briefly
+        extra = 'Retry-After: 1\r\n' if status == 503 else ''
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"{extra}{CORS_HEADERS}\r\n"
+        )
+        writer.write(head.encode() + body)
+    
+    async def blocking(self, fn, *args):
+        """Run fn(*args) in the loop's thread pool and return its result."""
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    
+    def publish(self, game_id, message):
+        """Publish an event from a handler running in the thread pool."""
+        self.loop.call_soon_threadsafe(self.broker.publish, game_id, message)
+    
+    def _route(self, method, path):
+        """Return (handler, path arguments), or (None, (status, payload)) if no route matches."""
+        unmatched = 404, {'success': False, 'error': 'Not found'}
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return handler, match.groups()
+                unmatched = 405, {'success': False, 'error': 'Method not allowed'}
+        return None, unmatched
+    
+    def _invoke(self, handler, args, query, body):
+        """Call handler with the decoded request; returns (status, payload) or, from coroutine handlers, a coroutine."""
+        if handler is None:
+            return args
+        try:
+            # Normalized here so handlers can read query['format'][0] directly
+            query['format'] = [wire.board_format(query.get('format', [None])[0], None)]
+        except ValueError as e:
+            return 400, {'success': False, 'error': str(e)}
+        try:
+            data = json.loads(body) if body else None
+            return handler(*args, query=query, data=data)
+        except Exception as e:
+            return 500, {'success': False, 'error': str(e)}
+    
+    def _respond(self, method, handler, args, query, body):
+        """Serve a request with a plain handler, timed on the calling thread."""
+        start = metrics.begin_request()
+        status, payload = self._invoke(handler, args, query, body)
+        metrics.end_request(start, method, handler.__name__ if handler else 'unmatched', status)
+        return status, payload
+    
+    async def dispatch(self, method, path, query, body):
+        """Route a request to its handler and return (status, payload).
+        
+        Plain handlers run in the thread pool, timing included, so their
+        is_valid_move counts are exact. Coroutine handlers, which wait on
+        the engine pool, run on the loop and send their own blocking steps
+        to the thread pool; their counts are approximate.
+        """
+        handler, args = self._route(method, path)
+        if not inspect.iscoroutinefunction(handler):
+            return await self.blocking(self._respond, method, handler, args, query, body)
+        start = metrics.begin_request()
+        try:
+            status, payload = await self._invoke(handler, args, query, body)
+        except Exception as e:
+            status, payload = 500, {'success': False, 'error': str(e)}
+        metrics.end_request(start, method, handler.__name__, status)
+        return status, payload
+    
+    def _game_not_found(self):
+        return 404, {'success': False, 'error': 'Game not found'}
+    
+    def new_game(self, query, data):
+        engine = (data or {}).get('engine', 'object')
+        if engine not in ENGINES:
+            return 400, {'success': False, 'error': f"Unknown engine '{engine}'"}
+        try:
+            game_id, game = self.store.create(engine, (data or {}).get('fen'))
+        except NotationError as e:
+            return 400, {'success': False, 'error': str(e)}
+        return 201, {
+            'success': True,
+            'game_id': game_id,
+            'message': 'New game created',
+            'state': game.get_board_state(query['format'][0])
+        }
+    
+    def get_game_state(self, game_id, query, data):
+        with self.store.locked(game_id) as game:
+            if game is None:
+                return self._game_not_found()
+            return 200, {'success': True, 'game_id': game_id, 'state': game.get_board_state(query['format'][0])}
+    
+    def make_move(self, game_id, query, data):
+        with self.store.locked(game_id) as game:
+            if game is None:
+                return self._game_not_found()
+            if not data or 'from' not in data or 'to' not in data:
+                return 400, {'success': False, 'error': 'Missing from or to position'}
+            
+            success, message = game.move_piece(tuple(data['from']), tuple(data['to']), data.get('promotion'))
+            if not success:
+                return 400, {'success': False, 'error': message}
+            
+            self.store.mark_dirty(game_id)
+            delta = game.get_state_delta(len(game.move_history) - 1)
+            self.publish(game_id, format_event('move', delta, delta['version']))
+            return 200, {'success': True, 'message': message, 'state': game.get_board_state(query['format'][0])}
+    
+    def undo_move(self, game_id, query, data):
+        with self.store.locked(game_id) as game:
+            if game is None:
+                return self._game_not_found()
+            count = (data or {}).get('count', 1)
+            if not isinstance(count, int) or count < 1:
+                return 400, {'success': False, 'error': 'count must be a positive integer'}
+            if count > len(game.move_history):
+                return 400, {'success': False, 'error': 'Not enough moves to undo'}
+            
+            for _ in range(count):
+                game.unmake_move()
+            self.store.mark_dirty(game_id)
+            # Deltas cannot express a takeback, so subscribers get the full state
+            state = game.get_board_state()
+            self.publish(game_id, format_event('state', state, state['version']))
+            return 200, {'success': True, 'undone': count, 'state': game.get_board_state(query['format'][0])}
+    
+    async def engine_move(self, game_id, query, data):
+        time_ms = (data or {}).get('time_ms', 1000)
+        if not isinstance(time_ms, (int, float)) or not 1 <= time_ms <= self.max_time_ms:
+            return 400, {'success': False, 'error': f"time_ms must be between 1 and {self.max_time_ms}"}
+        snapshot = await self.blocking(self._engine_position, game_id)
+        if not isinstance(snapshot, tuple):
+            return snapshot
+        fen, position, result = snapshot
+        
+        if result is None:
+            try:
+                future = self.pool.submit(engine_search, fen, time_ms)
+            except PoolSaturated as e:
+                return 503, {'success': False, 'error': str(e)}
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), time_ms / 1000 + ENGINE_TIMEOUT_MARGIN)
+            except asyncio.TimeoutError:
+                return 504, {'success': False, 'error': 'Engine timed out'}
+        
+        return await self.blocking(self._play_engine_move, game_id, position, result, query['format'][0])
+    
+    def _engine_position(self, game_id):
+        """(FEN, position key, book move or None) to search from, or an error response as a list."""
+        with self.store.locked(game_id) as game:
+            if game is None:
+                return list(self._game_not_found())
+            if game.game_status in GAME_OVER:
+                return [400, {'success': False, 'error': 'Game is over'}]
+            return game.to_fen(), (len(game.move_history), game.zobrist_hash), book.suggest(game.zobrist_hash)
+    
+    def _play_engine_move(self, game_id, position, result, board_format):
+        with self.store.locked(game_id) as game:
+            if game is None or (len(game.move_history), game.zobrist_hash) != position:
+                return 409, {'success': False, 'error': 'Game changed during search'}
+            from_pos, to_pos, promotion = result['move']
+            success, message = game.move_piece(from_pos, to_pos, promotion)
+            if not success:
+                return 500, {'success': False, 'error': message}
+            
+            self.store.mark_dirty(game_id)
+            delta = game.get_state_delta(len(game.move_history) - 1)
+            self.publish(game_id, format_event('move', delta, delta['version']))
+            return 200, {
+                'success': True,
+                'move': {'from': from_pos, 'to': to_pos, 'promotion': promotion},
+                'search': {key: value for key, value in result.items() if key != 'move'},
+                'state': game.get_board_state(board_format)
+            }
+    
+    def get_move_history(self, game_id, query, data):
+        with self.store.locked(game_id) as game:
+            if game is None:
+                return self._game_not_found()
+            since = game.resolve_version(query.get('since', [''])[0]) or 0
+            return 200, {'success': True, 'game_id': game_id, 'since': since, 'history': game.move_history[since:]}
+    
+    def get_legal_moves(self, game_id, query, data):
+        with self.store.locked(game_id) as game:
+            if game is None:
+                return self._game_not_found()
+            moves = [
+                {'from': from_pos, 'to': to_pos, 'promotion': promotion}
+                for from_pos, to_pos, promotion in game.legal_moves()
+            ]
+            return 200, {
+                'success': True,
+                'game_id': game_id,
+                'current_turn': game.current_turn,
+                'moves': moves
+            }
+    
+    def get_fen(self, game_id, query, data):
+        with self.store.locked(game_id) as game:
+            if game is None:
+                return self._game_not_found()
+            return 200, {'success': True, 'game_id': game_id, 'fen': game.to_fen()}
+    
+    def health_check(self, query, data):
+        return 200, {
+            'status': 'healthy',
+            'active_games': len(self.store),
+            'stored_games': self.store.stored_count(),
+            'frozen_games': self.store.frozen_count(),
+            'subscribers': self.broker.subscriber_count(),
+            'transposition_cache': position_cache.stats(),
+            'engine_pool': self.pool.stats()
+        }
+    
+    async def stream_events(self, game_id, headers, writer):
+        """Stream a game's events until the client disconnects."""
+        # Subscribe before taking the snapshot so no move falls in between
+        queue = self.broker.subscribe(game_id)
+        try:
+            snapshot = await self.blocking(self._stream_snapshot, game_id, headers.get('last-event-id', ''))
+            if snapshot is None:
+                self._write_json(writer, *self._game_not_found())
+                await writer.drain()
+                return
+            
+            writer.write((
+                'HTTP/1.1 200 OK\r\n'
+                'Content-Type: text/event-stream\r\n'
+                'Cache-Control: no-cache\r\n'
+                'Connection: keep-alive\r\n'
+                f'{CORS_HEADERS}\r\n'
+            ).encode() + snapshot)
+            await writer.drain()
+            
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    message = b': keepalive\n\n'
+                if message is None:
+                    break
+                writer.write(message)
+                await writer.drain()
+        finally:
+            self.broker.unsubscribe(game_id, queue)
+    
+    def _stream_snapshot(self, game_id, last_event_id):
+        """The first event of a stream, or None if the game does not exist."""
+        with self.store.locked(game_id) as game:
+            if game is None:
+                return None
+            since = game.resolve_version(last_event_id)
+            if since is not None:
+                delta = game.get_state_delta(since)
+                return format_event('move', delta, delta['version'])
+            state = game.get_board_state()
+            return format_event('state', state, state['version'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Asyncio chess API server with live move events')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+    
+    config = load_config()
+    metrics.instrument()
+    store, pool = create_backends(config)
+    print(f"Starting async Chess API server on http://{args.host}:{args.port}")
+    print("Live events: GET /api/game/<game_id>/events")
+    try:
+        asyncio.run(AsyncChessServer(store, pool=pool, max_time_ms=config['CHESS_ENGINE_MAX_TIME_MS']).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Precomputed attack tables for fast check detection.
+
+Squares are indexed 0-63 as ``row * 8 + col``, matching the board layout
+used by ``ChessBoard`` (row 0 is Black's back rank).
+"""
+
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+
+def square(position):
+    """Convert a (row, col) tuple to a square index."""
+    row, col = position
+    return row * 8 + col
+
+
+def _on_board(row, col):
+    return 0 <= row < 8 and 0 <= col < 8
+
+
+def _leaper_table(offsets):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        table.append(tuple(
+            (row + dr) * 8 + (col + dc)
+            for dr, dc in offsets if _on_board(row + dr, col + dc)
+        ))
+    return tuple(table)
+
+
+def _ray_table(directions):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        rays = []
+        for dr, dc in directions:
+            ray = []
+            r, c = row + dr, col + dc
+            while _on_board(r, c):
+                ray.append(r * 8 + c)
+                r += dr
+                c += dc
+            rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return tuple(table)
+
+
+# (row, col) tuple for every square index
+POSITIONS = tuple(divmod(sq, 8) for sq in range(64))
+
+KNIGHT_ATTACKS = _leaper_table(KNIGHT_OFFSETS)
+KING_ATTACKS = _leaper_table(KING_OFFSETS)
+
+# Squares attacked by a pawn of the given color standing on each square
+PAWN_ATTACKS = {
+    'white': _leaper_table(((-1, -1), (-1, 1))),
+    'black': _leaper_table(((1, -1), (1, 1))),
+}
+
+# Rays are ordered outwards from the origin square, one tuple per direction
+ROOK_RAYS = _ray_table(ROOK_DIRECTIONS)
+BISHOP_RAYS = _ray_table(BISHOP_DIRECTIONS)
+QUEEN_RAYS = tuple(ROOK_RAYS[sq] + BISHOP_RAYS[sq] for sq in range(64))
@@ -0,0 +1,181 @@
+"""Engine benchmark: perft, search and hot-path timings against a stored baseline.
+
+Usage:
+    python bench.py                     # run and compare with bench_baseline.json
+    python bench.py --update-baseline   # run and store the results as the new baseline
+    python bench.py --depth 4 --json
+
+Perft positions are set up from FEN; each runs at --depth or at the
+deepest depth listed for it, whichever is smaller.
+Perft node counts are checked against published values; a wrong count
+always fails. Timings fail when they are more than --tolerance worse than
+the baseline. Baselines are machine specific: regenerate them on the
+machine that runs the comparison.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+from board import ChessBoard
+from bitboard import BitboardChessBoard
+from transposition import position_cache
+from notation import STARTING_FEN
+from search import search
+
+ENGINES = {
+    'object': ChessBoard,
+    'bitboard': BitboardChessBoard
+}
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# Published perft node counts by depth (index 0 is depth 1), as (FEN, counts).
+# Deeper counts are known but take minutes in Python.
+PERFT_POSITIONS = {
+    'startpos': (STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2039, 97862]),
+    'endgame': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238]),
+    'promotions': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467, 422333]),
+    'position5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379]),
+    'position6': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                  [46, 2079, 89890]),
+}
+
+# 1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6, then 5. Nc3 is timed
+MIDDLEGAME = [
+    ((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 1), (2, 2)),
+    ((7, 5), (3, 1)), ((1, 0), (2, 0)), ((3, 1), (4, 0)), ((0, 6), (2, 5))
+]
+TIMED_MOVE = ((7, 1), (5, 2))
+SEARCH_MS = 1000
+
+
+def _setup(engine_class):
+    game = engine_class()
+    game.apply_moves(MIDDLEGAME)
+    return game
+
+
+def run_perft(engine_class, fen, depth):
+    """Run perft on a FEN position; return (nodes, nodes per second)."""
+    game = engine_class.from_fen(fen)
+    start = time.perf_counter()
+    nodes = game.perft(depth)
+    elapsed = time.perf_counter() - start
+    return nodes, nodes / elapsed if elapsed else float('inf')
+
+
+def time_call(engine_class, call, iterations, repeat=5):
+    """Microseconds per call on a fresh middlegame position with an empty position cache.
+    
+    Like timeit, reports the best of several rounds, since slower rounds
+    measure interference from the rest of the machine rather than the code.
+    """
+    rounds = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            total = 0.0
+            for _ in range(iterations):
+                game = _setup(engine_class)
+                position_cache.clear()
+                start = time.perf_counter()
+                call(game)
+                total += time.perf_counter() - start
+            rounds.append(total / iterations)
+    finally:
+        gc.enable()
+    return min(rounds) * 1e6
+
+
+def run(depth, iterations):
+    """Run every benchmark and return (metrics, perft failures)."""
+    metrics = {}
+    failures = []
+    for engine_name, engine_class in ENGINES.items():
+        for position, (fen, counts) in PERFT_POSITIONS.items():
+            position_depth = min(depth, len(counts))
+            nodes, nps = run_perft(engine_class, fen, position_depth)
+            if nodes != counts[position_depth - 1]:
+                failures.append(
+                    f"{engine_name} perft {position} depth {position_depth}: {nodes} != {counts[position_depth - 1]}")
+            metrics[f"perft.{position}.{engine_name}.nps"] = nps
+        
+        metrics[f"move_piece.{engine_name}.us"] = time_call(
+            engine_class, lambda game: game.move_piece(*TIMED_MOVE), iterations)
+        metrics[f"update_game_status.{engine_name}.us"] = time_call(
+            engine_class, lambda game: game._update_game_status(), iterations)
+        metrics[f"get_board_state.{engine_name}.us"] = time_call(
+            engine_class, lambda game: game.get_board_state(), iterations)
+        metrics[f"encode_state.{engine_name}.us"] = time_call(
+            engine_class, lambda game: game.encoded_state(), iterations)
+        metrics[f"encode_state.compact.{engine_name}.us"] = time_call(
+            engine_class, lambda game: game.encoded_state('compact'), iterations)
+    
+    # The engine searches ChessBoard copies of every game
+    position_cache.clear()
+    metrics['search.nps'] = search(_setup(ChessBoard), SEARCH_MS)['nps']
+    return metrics, failures
+
+
+def compare(metrics, baseline, tolerance):
+    """Return descriptions of metrics that regressed beyond tolerance."""
+    regressions = []
+    for key, value in metrics.items():
+        if key not in baseline:
+            continue
+        expected = baseline[key]
+        # Throughput should not drop, latency should not grow
+        if key.endswith('.nps'):
+            worse = value < expected * (1 - tolerance)
+        else:
+            worse = value > expected * (1 + tolerance)
+        if worse:
+            regressions.append(f"{key}: {value:,.1f} (baseline {expected:,.1f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chess engine benchmark')
+    parser.add_argument('--depth', type=int, default=3, help='perft depth (default 3)')
+    parser.add_argument('--iterations', type=int, default=200, help='samples per timed call')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown as a fraction')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    max_depth = max(len(counts) for _, counts in PERFT_POSITIONS.values())
+    if not 1 <= args.depth <= max_depth:
+        parser.error(f"--depth must be between 1 and {max_depth}")
+    
+    metrics, failures = run(args.depth, args.iterations)
+    
+    if args.json:
+        print(json.dumps(metrics, indent=2, sort_keys=True))
+    else:
+        for key, value in metrics.items():
+            print(f"{key:<40} {value:>14,.1f}")
+    
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(metrics, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            failures += compare(metrics, json.load(f), args.tolerance)
+    
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Memory benchmark: per-game footprint of each board implementation.
+
+Usage:
+    python bench_memory.py [--games N] [--plies N]
+
+Creates N games per engine, plays the same opening plies in each, and
+reports the traced allocation per game with tracemalloc.
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from board import ChessBoard
+from bitboard import BitboardChessBoard
+
+ENGINES = {
+    'object': ChessBoard,
+    'bitboard': BitboardChessBoard
+}
+
+# 1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6
+OPENING = [
+    ((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 1), (2, 2)),
+    ((7, 5), (3, 1)), ((1, 0), (2, 0)), ((3, 1), (4, 0)), ((0, 6), (2, 5))
+]
+
+
+def measure(engine_class, games, plies):
+    """Return traced bytes per game after creating games and playing plies."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    boards = []
+    for _ in range(games):
+        board = engine_class()
+        for from_pos, to_pos in OPENING[:plies]:
+            board.move_piece(from_pos, to_pos)
+        boards.append(board)
+
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / games
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--plies', type=int, default=len(OPENING))
+    args = parser.parse_args()
+
+    print(f"{'engine':<10} {'bytes/game':>12}")
+    for name, engine_class in ENGINES.items():
+        per_game = measure(engine_class, args.games, args.plies)
+        print(f"{name:<10} {per_game:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
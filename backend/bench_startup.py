@@ -0,0 +1,121 @@
+"""Startup benchmark: how long a new API worker takes to come up.
+
+Usage:
+    python bench_startup.py [--runs N] [--json]
+
+Reports the median of --runs for:
+
+- interpreter: a bare ``python -c pass``, the floor for any cold start
+- cold: a new interpreter importing the app and calling create_app(), as
+  a freshly started container or ``python app.py`` does
+- create_app: create_app() in a process that has already imported
+  everything, the part of a pre-forked worker's startup not shared
+- fork: a worker forked by serve.py from a preloaded parent, until it
+  answers its first /api/health request
+
+Games are stored in a temporary directory and the engine pool is not
+started, so only startup itself is timed.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from app import close_app, create_app, load_config
+
+COLD_START = (
+    "from app import close_app, create_app\n"
+    "close_app(create_app({'CHESS_DB_PATH': %r, 'CHESS_ENGINE_WORKERS': 0}))\n"
+)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def time_subprocess(code, runs):
+    """Median wall time in seconds of running code in a new interpreter."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=directory, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def time_create_app(config, runs):
+    """Median seconds for create_app() once the app module is imported."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        app = create_app(config)
+        times.append(time.perf_counter() - start)
+        close_app(app)
+    return statistics.median(times)
+
+
+def time_fork(config, runs):
+    """Median seconds from forking a serve.py worker to its first health check response."""
+    import serve
+    
+    serve.preload(config)
+    times = []
+    for _ in range(runs):
+        port = _free_port()
+        start = time.perf_counter()
+        pid = serve.fork_worker('127.0.0.1', port, config)
+        try:
+            while True:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+                try:
+                    connection.request('GET', '/api/health')
+                    if connection.getresponse().status == 200:
+                        break
+                except OSError:
+                    time.sleep(0.0005)
+                finally:
+                    connection.close()
+            times.append(time.perf_counter() - start)
+        finally:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        config = load_config({'CHESS_DB_PATH': os.path.join(directory, 'games.db'), 'CHESS_ENGINE_WORKERS': 0})
+        results = {
+            'interpreter': time_subprocess('pass', args.runs),
+            'cold': time_subprocess(COLD_START % config['CHESS_DB_PATH'], args.runs),
+            'create_app': time_create_app(config, args.runs),
+        }
+        if hasattr(os, 'fork'):
+            results['fork'] = time_fork(config, args.runs)
+    
+    if args.json:
+        print(json.dumps({name: round(seconds * 1000, 2) for name, seconds in results.items()}, indent=2))
+        return
+    print(f"{'startup':<12} {'ms':>8}")
+    for name, seconds in results.items():
+        print(f"{name:<12} {seconds * 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
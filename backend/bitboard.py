@@ -0,0 +1,474 @@
+"""Bitboard-backed chess board.
+
+``BitboardChessBoard`` exposes the same interface as ``board.ChessBoard``
+(``move_piece``, ``generate_moves``, ``get_board_state``, ``move_history``,
+``current_turn``, ``game_status``) but stores the position as twelve
+64-bit integers, one per color and piece type, instead of ``Piece``
+objects. Square ``sq`` is bit ``1 << sq`` with ``sq = row * 8 + col``.
+Game history, status and state encoding come from ``boardbase.BaseBoard``.
+"""
+
+from attacks import (
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, ROOK_RAYS, BISHOP_RAYS,
+    ROOK_DIRECTIONS, BISHOP_DIRECTIONS, POSITIONS, square
+)
+from zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS
+from notation import parse_fen
+from rules import ALL_CASTLING, CASTLING_MOVES, CASTLING_TARGETS, CASTLING_MASKS, PROMOTION_PIECES, GAME_OVER
+from boardbase import BaseBoard
+
+WHITE, BLACK = 0, 1
+COLORS = ('white', 'black')
+COLOR_INDEX = {'white': WHITE, 'black': BLACK}
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_NAMES = ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')
+
+
+def _bits(squares):
+    mask = 0
+    for sq in squares:
+        mask |= 1 << sq
+    return mask
+
+
+def _ray_masks(ray_table, directions):
+    """Per-direction ray masks plus whether the ray runs towards higher squares."""
+    masks = []
+    for index, (dr, dc) in enumerate(directions):
+        positive = dr * 8 + dc > 0
+        masks.append((tuple(_bits(ray_table[sq][index]) for sq in range(64)), positive))
+    return tuple(masks)
+
+
+KNIGHT_BB = tuple(_bits(targets) for targets in KNIGHT_ATTACKS)
+KING_BB = tuple(_bits(targets) for targets in KING_ATTACKS)
+PAWN_BB = tuple(tuple(_bits(targets) for targets in PAWN_ATTACKS[color]) for color in COLORS)
+ROOK_RAY_BB = _ray_masks(ROOK_RAYS, ROOK_DIRECTIONS)
+BISHOP_RAY_BB = _ray_masks(BISHOP_RAYS, BISHOP_DIRECTIONS)
+
+# Pawns that have never moved sit on these rows, so has_moved needs no storage
+PAWN_START_ROWS = (_bits(range(48, 56)), _bits(range(8, 16)))
+PAWN_PUSH = (-8, 8)
+# Pawns arriving on either back rank promote
+BACK_RANKS = _bits(range(8)) | _bits(range(56, 64))
+PROMOTION_KINDS = (QUEEN, ROOK, BISHOP, KNIGHT)
+# King destination -> squares between king and rook that must be empty
+CASTLING_EMPTY = {king_to: _bits(move[4]) for king_to, move in CASTLING_MOVES.items()}
+
+
+def _slider_attacks(sq, occupied, ray_masks):
+    """Attacks along each ray, stopping at (and including) the first blocker."""
+    attacks = 0
+    for table, positive in ray_masks:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+def _iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitboardChessBoard(BaseBoard):
+    """Chess board backed by twelve piece bitboards."""
+    
+    def __init__(self, fen=None):
+        # bitboards[color * 6 + kind]
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        self.current_turn = 'white'
+        self.move_history = []
+        self.game_status = 'active'  # 'active', 'check', 'checkmate', 'stalemate', 'draw'
+        # FEN the game started from, or None for the standard starting position
+        self.start_fen = fen
+        # Plies since the last capture or pawn move, and the current move number
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        # Mask of rules castling right bits, and the square a pawn may capture en passant onto
+        self.castling_rights = ALL_CASTLING
+        self.en_passant = None
+        if fen is None:
+            self._setup_board()
+        else:
+            self._setup_fen(fen)
+        self.zobrist_hash = self._compute_hash()
+        # Hash after every move, for repetition detection
+        self.hash_history = [self.zobrist_hash]
+        # One (push record, halfmove clock, fullmove number) per move, for unmake_move
+        self._undo_stack = []
+        # Encoded get_board_state() by board format, dropped whenever the position changes
+        self._encoded_states = None
+        if fen is not None:
+            self._check_fen_position(fen)
+            self._update_game_status()
+    
+    def _setup_board(self):
+        """Initialize bitboards with pieces in starting positions."""
+        back_rank = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+        for col, kind in enumerate(back_rank):
+            self._put(BLACK, kind, col)
+            self._put(WHITE, kind, 56 + col)
+        for col in range(8):
+            self._put(BLACK, PAWN, 8 + col)
+            self._put(WHITE, PAWN, 48 + col)
+    
+    def _setup_fen(self, fen):
+        """Fill the bitboards and set the side to move and clocks from a FEN string."""
+        (pieces, self.current_turn, self.castling_rights, self.en_passant,
+         self.halfmove_clock, self.fullmove_number) = parse_fen(fen)
+        for sq, color, piece_type in pieces:
+            self._put(COLOR_INDEX[color], PIECE_NAMES.index(piece_type), sq)
+    
+    def _squares(self):
+        """The 64 squares in order as (color, type) pairs or None."""
+        squares = [None] * 64
+        for index, bb in enumerate(self.bitboards):
+            piece = (COLORS[index // 6], PIECE_NAMES[index % 6])
+            for sq in _iter_bits(bb):
+                squares[sq] = piece
+        return squares
+    
+    def _put(self, color, kind, sq):
+        bit = 1 << sq
+        self.bitboards[color * 6 + kind] |= bit
+        self.occupancy[color] |= bit
+    
+    def _compute_hash(self):
+        """Compute the Zobrist hash of the position from scratch."""
+        h = SIDE_KEY if self.current_turn == 'black' else 0
+        h ^= CASTLING_KEYS[self.castling_rights]
+        if self.en_passant is not None:
+            h ^= EN_PASSANT_KEYS[self.en_passant & 7]
+        for index, bb in enumerate(self.bitboards):
+            keys = PIECE_KEYS[index]
+            for sq in _iter_bits(bb):
+                h ^= keys[sq]
+        return h
+    
+    def _piece_at(self, sq, color=None):
+        """Return bitboard index of the piece on sq, or -1 if empty.
+        
+        Passing color restricts the search to that side's six bitboards.
+        """
+        bit = 1 << sq
+        colors = (WHITE, BLACK) if color is None else (color,)
+        for side in colors:
+            if self.occupancy[side] & bit:
+                bbs = self.bitboards
+                for index in range(side * 6, side * 6 + 6):
+                    if bbs[index] & bit:
+                        return index
+        return -1
+    
+    def _make(self, from_sq, to_sq, moved, promotion=-1):
+        """Apply a move of piece index moved on the bitboards and return an undo record.
+        
+        Handles en passant captures, castling (the rook moves too) and
+        promotion to piece kind promotion, a Queen when it is -1.
+        """
+        from_bit, to_bit = 1 << from_sq, 1 << to_sq
+        bbs = self.bitboards
+        color = moved // 6
+        kind = moved % 6
+        captured = self._piece_at(to_sq, 1 - color)
+        captured_sq = to_sq
+        if kind == PAWN and captured < 0 and (to_sq - from_sq) & 7:
+            # A diagonal pawn move onto an empty square captures en passant
+            captured_sq = to_sq - PAWN_PUSH[color]
+            captured = (1 - color) * 6 + PAWN
+        if captured >= 0:
+            bbs[captured] ^= 1 << captured_sq
+            self.occupancy[1 - color] ^= 1 << captured_sq
+        placed = moved
+        if kind == PAWN and to_bit & BACK_RANKS:
+            placed = color * 6 + (QUEEN if promotion < 0 else promotion)
+        bbs[moved] ^= from_bit
+        bbs[placed] ^= to_bit
+        self.occupancy[color] ^= from_bit | to_bit
+        if kind == KING and abs(to_sq - from_sq) == 2:
+            _, _, rook_from, rook_to, _, _ = CASTLING_MOVES[to_sq]
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            bbs[color * 6 + ROOK] ^= rook_bits
+            self.occupancy[color] ^= rook_bits
+        return moved, captured, from_sq, to_sq, captured_sq, placed
+    
+    def _unmake(self, record):
+        """Revert a move applied by _make."""
+        moved, captured, from_sq, to_sq, captured_sq, placed = record
+        from_bit, to_bit = 1 << from_sq, 1 << to_sq
+        bbs = self.bitboards
+        color = moved // 6
+        bbs[placed] ^= to_bit
+        bbs[moved] ^= from_bit
+        self.occupancy[color] ^= from_bit | to_bit
+        if captured >= 0:
+            bbs[captured] |= 1 << captured_sq
+            self.occupancy[captured // 6] |= 1 << captured_sq
+        if moved % 6 == KING and abs(to_sq - from_sq) == 2:
+            _, _, rook_from, rook_to, _, _ = CASTLING_MOVES[to_sq]
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            bbs[color * 6 + ROOK] ^= rook_bits
+            self.occupancy[color] ^= rook_bits
+    
+    def _attackers(self, sq, by_color):
+        """Bitboard of by_color pieces attacking sq."""
+        base = by_color * 6
+        bbs = self.bitboards
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        rooks = bbs[base + ROOK] | bbs[base + QUEEN]
+        bishops = bbs[base + BISHOP] | bbs[base + QUEEN]
+        return (
+            (PAWN_BB[1 - by_color][sq] & bbs[base + PAWN])
+            | (KNIGHT_BB[sq] & bbs[base + KNIGHT])
+            | (KING_BB[sq] & bbs[base + KING])
+            | (_slider_attacks(sq, occupied, ROOK_RAY_BB) & rooks if rooks else 0)
+            | (_slider_attacks(sq, occupied, BISHOP_RAY_BB) & bishops if bishops else 0)
+        )
+    
+    def _is_in_check(self, color):
+        """Check if the king of the given color is in check."""
+        return self._king_attacked(COLOR_INDEX[color])
+    
+    def _king_attacked(self, color_index):
+        king = self.bitboards[color_index * 6 + KING]
+        if not king:
+            return False
+        return self._attackers(king.bit_length() - 1, 1 - color_index) != 0
+    
+    def _targets(self, sq, color, kind):
+        """Bitboard of pseudo-legal target squares for a piece on sq."""
+        own = self.occupancy[color]
+        occupied = own | self.occupancy[1 - color]
+        if kind == PAWN:
+            single = sq + PAWN_PUSH[color]
+            targets = PAWN_BB[color][sq] & self.occupancy[1 - color]
+            if self.en_passant is not None and COLORS[color] == self.current_turn:
+                targets |= PAWN_BB[color][sq] & (1 << self.en_passant)
+            if 0 <= single < 64 and not occupied & (1 << single):
+                targets |= 1 << single
+                double = single + PAWN_PUSH[color]
+                if PAWN_START_ROWS[color] & (1 << sq) and not occupied & (1 << double):
+                    targets |= 1 << double
+            return targets
+        if kind == KNIGHT:
+            return KNIGHT_BB[sq] & ~own
+        if kind == KING:
+            targets = KING_BB[sq] & ~own
+            if self.castling_rights and COLORS[color] == self.current_turn:
+                for king_to in CASTLING_TARGETS[COLORS[color]]:
+                    if self._can_castle(color, king_to):
+                        targets |= 1 << king_to
+            return targets
+        attacks = 0
+        if kind != BISHOP:
+            attacks |= _slider_attacks(sq, occupied, ROOK_RAY_BB)
+        if kind != ROOK:
+            attacks |= _slider_attacks(sq, occupied, BISHOP_RAY_BB)
+        return attacks & ~own
+    
+    def _can_castle(self, color, king_to):
+        """Check castling rights, empty squares and attacked squares for the king moving to king_to."""
+        right, king_from, _, _, _, safe = CASTLING_MOVES[king_to]
+        if not self.castling_rights & right or not self.bitboards[color * 6 + KING] & (1 << king_from):
+            return False
+        if CASTLING_EMPTY[king_to] & (self.occupancy[WHITE] | self.occupancy[BLACK]):
+            return False
+        return not any(self._attackers(sq, 1 - color) for sq in safe)
+    
+    def _leaves_king_safe(self, from_sq, to_sq, moved):
+        record = self._make(from_sq, to_sq, moved)
+        safe = not self._king_attacked(moved // 6)
+        self._unmake(record)
+        return safe
+    
+    def generate_moves(self, color=None):
+        """Lazily yield legal (from_pos, to_pos, promotion) moves for color."""
+        if color is None:
+            color = self.current_turn
+        for from_sq, to_sq, _, promotion in self._legal_moves_sq(COLOR_INDEX[color]):
+            yield POSITIONS[from_sq], POSITIONS[to_sq], PIECE_NAMES[promotion] if promotion >= 0 else None
+    
+    def get_square(self, position):
+        """Get the piece at position as a {'type', 'color'} dict, or None."""
+        index = self._piece_at(square(position))
+        if index < 0:
+            return None
+        return {'type': PIECE_NAMES[index % 6], 'color': COLORS[index // 6]}
+    
+    def is_legal_move(self, from_pos, to_pos):
+        """Check whether the side to move may play from_pos -> to_pos."""
+        if not all(0 <= coord < 8 for coord in (*from_pos, *to_pos)):
+            return False
+        from_sq, to_sq = square(from_pos), square(to_pos)
+        color = COLOR_INDEX[self.current_turn]
+        moved = self._piece_at(from_sq, color)
+        return (
+            moved >= 0
+            and bool(self._targets(from_sq, color, moved % 6) & (1 << to_sq))
+            and self._leaves_king_safe(from_sq, to_sq, moved)
+        )
+    
+    def move_piece(self, from_pos, to_pos, promotion=None, update_status=True):
+        """Move a piece from one position to another.
+        
+        promotion names the piece a pawn reaching the last rank becomes and
+        defaults to a Queen. With update_status=False the game status
+        evaluation is skipped and game_status is left stale; callers
+        applying a sequence of moves evaluate it once at the end.
+        """
+        from_row, from_col = from_pos
+        to_row, to_col = to_pos
+        
+        if self.game_status in GAME_OVER:
+            return False, "Game is over"
+        
+        if not (0 <= from_row < 8 and 0 <= from_col < 8):
+            return False, "No piece at starting position"
+        from_sq = square(from_pos)
+        moved = self._piece_at(from_sq)
+        
+        # Validate move
+        if moved < 0:
+            return False, "No piece at starting position"
+        
+        color = moved // 6
+        if COLORS[color] != self.current_turn:
+            return False, f"It's {self.current_turn}'s turn"
+        
+        if not (0 <= to_row < 8 and 0 <= to_col < 8):
+            return False, "Target position out of bounds"
+        
+        to_sq = square(to_pos)
+        if not self._targets(from_sq, color, moved % 6) & (1 << to_sq):
+            return False, "Invalid move for this piece"
+        
+        # Check if move puts own king in check
+        if not self._leaves_king_safe(from_sq, to_sq, moved):
+            return False, "Move would put king in check"
+        
+        promotion_kind = -1
+        if promotion is not None:
+            if moved % 6 != PAWN or not (1 << to_sq) & BACK_RANKS:
+                return False, "Promotion is only allowed for a pawn reaching the last rank"
+            if promotion not in PROMOTION_PIECES:
+                return False, f"Invalid promotion piece '{promotion}'"
+            promotion_kind = PIECE_NAMES.index(promotion)
+        
+        self._make_move(from_sq, to_sq, moved, promotion_kind, update_status)
+        return True, "Move successful"
+    
+    def make_move(self, from_pos, to_pos, promotion=None, update_status=True):
+        """Make a move that is already known to be legal and record how to undo it.
+        
+        Unlike move_piece nothing is validated, so the move must come from
+        generate_moves() or have passed is_legal_move().
+        """
+        from_sq = square(from_pos)
+        promotion_kind = -1 if promotion is None else PIECE_NAMES.index(promotion)
+        self._make_move(from_sq, square(to_pos), self._piece_at(from_sq), promotion_kind, update_status)
+    
+    def _make_move(self, from_sq, to_sq, moved, promotion, update_status):
+        self._encoded_states = None
+        record = self._push(from_sq, to_sq, moved, promotion)
+        self._undo_stack.append((record, self.halfmove_clock, self.fullmove_number))
+        self.hash_history.append(self.zobrist_hash)
+        _, captured, _, _, captured_sq, placed = record[0]
+        if captured >= 0 or moved % 6 == PAWN:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if moved // 6 == BLACK:
+            self.fullmove_number += 1
+        
+        # Record move
+        move = {
+            'from': POSITIONS[from_sq],
+            'to': POSITIONS[to_sq],
+            'piece': PIECE_NAMES[moved % 6],
+            'captured': PIECE_NAMES[captured % 6] if captured >= 0 else None
+        }
+        if placed != moved:
+            move['promotion'] = PIECE_NAMES[placed % 6]
+        elif moved % 6 == KING and abs(to_sq - from_sq) == 2:
+            move['castling'] = 'kingside' if to_sq > from_sq else 'queenside'
+        if captured_sq != to_sq:
+            move['en_passant'] = True
+        self.move_history.append(move)
+        
+        # Update game status
+        if update_status:
+            self._update_game_status()
+    
+    def _push(self, from_sq, to_sq, moved, promotion=-1):
+        """Make a move without validation, history or status and return an undo record.
+        
+        Unlike _make this also updates the position hash, castling rights,
+        en passant square and side to move.
+        """
+        record = self._make(from_sq, to_sq, moved, promotion)
+        undo = (record, self.zobrist_hash, self.castling_rights, self.en_passant)
+        _, captured, _, _, captured_sq, placed = record
+        color = moved // 6
+        
+        h = self.zobrist_hash ^ SIDE_KEY ^ CASTLING_KEYS[self.castling_rights]
+        if self.en_passant is not None:
+            h ^= EN_PASSANT_KEYS[self.en_passant & 7]
+        h ^= PIECE_KEYS[moved][from_sq] ^ PIECE_KEYS[placed][to_sq]
+        if captured >= 0:
+            h ^= PIECE_KEYS[captured][captured_sq]
+        kind = moved % 6
+        if kind == KING and abs(to_sq - from_sq) == 2:
+            _, _, rook_from, rook_to, _, _ = CASTLING_MOVES[to_sq]
+            rook_keys = PIECE_KEYS[color * 6 + ROOK]
+            h ^= rook_keys[rook_from] ^ rook_keys[rook_to]
+        
+        self.castling_rights &= CASTLING_MASKS[from_sq] & CASTLING_MASKS[to_sq]
+        h ^= CASTLING_KEYS[self.castling_rights]
+        self.en_passant = None
+        if kind == PAWN and abs(to_sq - from_sq) == 16:
+            # Only record the square when an enemy pawn can actually capture onto it
+            passed = (from_sq + to_sq) // 2
+            if PAWN_BB[color][passed] & self.bitboards[(1 - color) * 6 + PAWN]:
+                self.en_passant = passed
+                h ^= EN_PASSANT_KEYS[passed & 7]
+        self.zobrist_hash = h
+        self.current_turn = 'black' if self.current_turn == 'white' else 'white'
+        return undo
+    
+    def _pop(self, undo):
+        """Revert a move made by _push."""
+        record, self.zobrist_hash, self.castling_rights, self.en_passant = undo
+        self._unmake(record)
+        self.current_turn = 'black' if self.current_turn == 'white' else 'white'
+    
+    def _legal_moves_sq(self, color_index):
+        """Yield legal moves for color as (from_sq, to_sq, moved, promotion) tuples.
+        
+        promotion is a piece kind for pawns reaching the last rank, which
+        yield one move per promotion piece, and -1 otherwise.
+        """
+        for kind in range(6):
+            moved = color_index * 6 + kind
+            for from_sq in _iter_bits(self.bitboards[moved]):
+                for to_sq in _iter_bits(self._targets(from_sq, color_index, kind)):
+                    if self._leaves_king_safe(from_sq, to_sq, moved):
+                        if kind == PAWN and (1 << to_sq) & BACK_RANKS:
+                            for promotion in PROMOTION_KINDS:
+                                yield from_sq, to_sq, moved, promotion
+                        else:
+                            yield from_sq, to_sq, moved, -1
+    
+    
+    def _push_moves(self):
+        """Legal moves for the side to move, as arguments for _push."""
+        return list(self._legal_moves_sq(COLOR_INDEX[self.current_turn]))
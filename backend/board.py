@@ -1,17 +1,50 @@
 """Chess board and game logic."""
 
 from pieces import Pawn, Rook, Knight, Bishop, Queen, King
+from attacks import (
+    POSITIONS, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS,
+    ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS, square
+)
+from zobrist import KEYS_BY_NAME, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS
+from notation import parse_fen
+from rules import ALL_CASTLING, CASTLING_MOVES, CASTLING_TARGETS, CASTLING_MASKS, PROMOTION_PIECES, GAME_OVER
+from boardbase import BaseBoard
 
+PIECE_CLASSES = {cls.__name__: cls for cls in (Pawn, Rook, Knight, Bishop, Queen, King)}
 
-class ChessBoard:
+
+class ChessBoard(BaseBoard):
     """Represents a chess board and game state."""
     
-    def __init__(self):
+    def __init__(self, fen=None):
         self.board = [[None for _ in range(8)] for _ in range(8)]
         self.current_turn = 'white'
         self.move_history = []
-        self.game_status = 'active'  # 'active', 'check', 'checkmate', 'stalemate'
-        self._setup_board()
+        self.game_status = 'active'  # 'active', 'check', 'checkmate', 'stalemate', 'draw'
+        # FEN the game started from, or None for the standard starting position
+        self.start_fen = fen
+        # Plies since the last capture or pawn move, and the current move number
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        # Mask of rules castling right bits, and the square a pawn may capture en passant onto
+        self.castling_rights = ALL_CASTLING
+        self.en_passant = None
+        if fen is None:
+            self._setup_board()
+            self._king_positions = {'white': (7, 4), 'black': (0, 4)}
+        else:
+            self._setup_fen(fen)
+        self._init_attack_maps()
+        self.zobrist_hash = self._compute_hash()
+        # Hash after every move, for repetition detection
+        self.hash_history = [self.zobrist_hash]
+        # One (push record, halfmove clock, fullmove number) per move, for unmake_move
+        self._undo_stack = []
+        # Encoded get_board_state() by board format, dropped whenever the position changes
+        self._encoded_states = None
+        if fen is not None:
+            self._check_fen_position(fen)
+            self._update_game_status()
     
     def _setup_board(self):
         """Initialize board with pieces in starting positions."""
@@ -29,19 +62,103 @@ class ChessBoard:
             King('white', (7, 4)), Bishop('white', (7, 5)), Knight('white', (7, 6)), Rook('white', (7, 7))
         ]
     
+    def _setup_fen(self, fen):
+        """Place pieces and set the side to move and clocks from a FEN string."""
+        (pieces, self.current_turn, self.castling_rights, self.en_passant,
+         self.halfmove_clock, self.fullmove_number) = parse_fen(fen)
+        self._king_positions = {}
+        for sq, color, piece_type in pieces:
+            position = POSITIONS[sq]
+            piece = PIECE_CLASSES[piece_type](color, position)
+            if piece_type == 'Pawn':
+                # Only pawns on their starting rank may still advance two squares
+                piece.has_moved = position[0] != (6 if color == 'white' else 1)
+            elif piece_type == 'King':
+                self._king_positions[color] = position
+            self.board[position[0]][position[1]] = piece
+    
+    def _squares(self):
+        """The 64 squares in order as (color, type) pairs or None."""
+        squares = []
+        for row in self.board:
+            for piece in row:
+                squares.append(None if piece is None else (piece.color, piece.__class__.__name__))
+        return squares
+    
     def get_piece(self, position):
         """Get piece at position."""
         row, col = position
         return self.board[row][col]
     
-    def move_piece(self, from_pos, to_pos):
-        """Move a piece from one position to another."""
+    def get_square(self, position):
+        """Get the piece at position as a {'type', 'color'} dict, or None."""
+        row, col = position
+        piece = self.board[row][col]
+        if piece is None:
+            return None
+        return {'type': piece.__class__.__name__, 'color': piece.color}
+    
+    def is_legal_move(self, from_pos, to_pos):
+        """Check whether the side to move may play from_pos -> to_pos."""
+        if not all(0 <= coord < 8 for coord in (*from_pos, *to_pos)):
+            return False
+        from_row, from_col = from_pos
+        piece = self.board[from_row][from_col]
+        return (
+            piece is not None
+            and piece.color == self.current_turn
+            and self._can_reach(piece, to_pos)
+            and not self._would_be_in_check(from_pos, to_pos)
+        )
+    
+    def _can_reach(self, piece, to_pos):
+        """Check the piece's own movement rules, plus castling and en passant, ignoring checks."""
+        kind = type(piece)
+        if kind is King and abs(to_pos[1] - piece.position[1]) == 2:
+            return self._can_castle(piece.color, square(to_pos))
+        if (kind is Pawn and square(to_pos) == self.en_passant and piece.color == self.current_turn
+                and self.en_passant in PAWN_ATTACKS[piece.color][square(piece.position)]):
+            return True
+        return piece.is_valid_move(to_pos, self.board)
+    
+    def _can_castle(self, color, king_to):
+        """Check castling rights, empty squares and attacked squares for the king moving to king_to.
+        
+        Uses the attack maps, so it costs a few lookups and no board scan.
+        """
+        if king_to not in CASTLING_TARGETS[color]:
+            return False
+        right, king_from, _, _, empty, safe = CASTLING_MOVES[king_to]
+        if not self.castling_rights & right or self._king_positions.get(color) != POSITIONS[king_from]:
+            return False
+        board = self.board
+        for sq in empty:
+            row, col = POSITIONS[sq]
+            if board[row][col] is not None:
+                return False
+        attacked = self.attack_maps['black' if color == 'white' else 'white']
+        return not any(attacked[sq] for sq in safe)
+    
+    def move_piece(self, from_pos, to_pos, promotion=None, update_status=True):
+        """Move a piece from one position to another.
+        
+        promotion names the piece a pawn reaching the last rank becomes and
+        defaults to a Queen. With update_status=False the game status
+        evaluation is skipped and game_status is left stale; callers
+        applying a sequence of moves evaluate it once at the end.
+        """
         from_row, from_col = from_pos
         to_row, to_col = to_pos
         
+        # Validate move
+        if self.game_status in GAME_OVER:
+            return False, "Game is over"
+        
+        # Negative indices would silently pick a piece from the far side of the board
+        if not (0 <= from_row < 8 and 0 <= from_col < 8):
+            return False, "No piece at starting position"
         piece = self.board[from_row][from_col]
         
-        # Validate move
         if piece is None:
             return False, "No piece at starting position"
         
@@ -51,53 +168,310 @@ class ChessBoard:
         if not (0 <= to_row < 8 and 0 <= to_col < 8):
             return False, "Target position out of bounds"
         
-        if not piece.is_valid_move(to_pos, self.board):
+        if not self._can_reach(piece, to_pos):
             return False, "Invalid move for this piece"
         
         # Check if move puts own king in check
         if self._would_be_in_check(from_pos, to_pos):
             return False, "Move would put king in check"
         
-        # Execute move
-        captured_piece = self.board[to_row][to_col]
-        self.board[to_row][to_col] = piece
-        self.board[from_row][from_col] = None
-        piece.position = to_pos
-        piece.has_moved = True
+        if promotion is not None:
+            if type(piece) is not Pawn or to_row not in (0, 7):
+                return False, "Promotion is only allowed for a pawn reaching the last rank"
+            if promotion not in PROMOTION_PIECES:
+                return False, f"Invalid promotion piece '{promotion}'"
+        
+        self.make_move(from_pos, to_pos, promotion, update_status)
+        return True, "Move successful"
+    
+    def make_move(self, from_pos, to_pos, promotion=None, update_status=True):
+        """Make a move that is already known to be legal and record how to undo it.
+        
+        Unlike move_piece nothing is validated, so the move must come from
+        generate_moves() or have passed is_legal_move(). Takes no copy of
+        the board; unmake_move() reverts it from the undo stack.
+        """
+        piece = self.get_piece(from_pos)
+        self._encoded_states = None
+        record = self._push(from_pos, to_pos, promotion)
+        self._undo_stack.append((record, self.halfmove_clock, self.fullmove_number))
+        self.hash_history.append(self.zobrist_hash)
+        captured_piece = record[3]
+        if captured_piece or isinstance(piece, Pawn):
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if piece.color == 'black':
+            self.fullmove_number += 1
         
         # Record move
-        self.move_history.append({
+        move = {
             'from': from_pos,
             'to': to_pos,
             'piece': piece.__class__.__name__,
             'captured': captured_piece.__class__.__name__ if captured_piece else None
-        })
+        }
+        placed = self.get_piece(to_pos)
+        if placed is not piece:
+            move['promotion'] = placed.__class__.__name__
+        elif isinstance(piece, King) and abs(to_pos[1] - from_pos[1]) == 2:
+            move['castling'] = 'kingside' if to_pos[1] == 6 else 'queenside'
+        if record[4] != to_pos:
+            move['en_passant'] = True
+        self.move_history.append(move)
+        
+        # Update game status
+        if update_status:
+            self._update_game_status()
+    
+    def _push(self, from_pos, to_pos, promotion=None):
+        """Make a move without validation, history or status and return an undo record.
+        
+        Updates the board, piece state, king squares, attack maps, position
+        hash, castling rights, en passant square and side to move. Castling
+        also moves the rook, and a pawn reaching the last rank is replaced by
+        a new promotion piece (a Queen unless promotion says otherwise).
+        """
+        from_row, from_col = from_pos
+        to_row, to_col = to_pos
+        from_sq, to_sq = square(from_pos), square(to_pos)
+        board = self.board
+        piece = board[from_row][from_col]
+        captured = board[to_row][to_col]
+        captured_pos = to_pos
+        kind = type(piece)
+        color = piece.color
+        record_head = (from_pos, to_pos, piece)
+        record_tail = (piece.has_moved, self.castling_rights, self.en_passant, self.zobrist_hash)
+        
+        h = self.zobrist_hash ^ SIDE_KEY ^ CASTLING_KEYS[self.castling_rights]
+        if self.en_passant is not None:
+            h ^= EN_PASSANT_KEYS[self.en_passant & 7]
+        if kind is Pawn and captured is None and from_col != to_col:
+            # En passant: the captured pawn stands beside the moving one
+            captured_pos = (from_row, to_col)
+            captured = board[from_row][to_col]
+            board[from_row][to_col] = None
+        if captured:
+            h ^= KEYS_BY_NAME[(captured.color, captured.__class__.__name__)][square(captured_pos)]
+        
+        board[from_row][from_col] = None
+        placed = piece
+        if kind is Pawn and to_row in (0, 7):
+            placed = PIECE_CLASSES[promotion or 'Queen'](color, to_pos)
+        board[to_row][to_col] = placed
+        placed.position = to_pos
+        placed.has_moved = True
+        h ^= KEYS_BY_NAME[(color, kind.__name__)][from_sq] ^ KEYS_BY_NAME[(color, placed.__class__.__name__)][to_sq]
+        
+        changed = [from_sq, to_sq]
+        if captured_pos != to_pos:
+            changed.append(square(captured_pos))
+        if kind is King:
+            self._king_positions[color] = to_pos
+            if abs(to_col - from_col) == 2:
+                _, _, rook_from, rook_to, _, _ = CASTLING_MOVES[to_sq]
+                rook = board[POSITIONS[rook_from][0]][POSITIONS[rook_from][1]]
+                board[POSITIONS[rook_from][0]][POSITIONS[rook_from][1]] = None
+                board[POSITIONS[rook_to][0]][POSITIONS[rook_to][1]] = rook
+                rook.position = POSITIONS[rook_to]
+                rook.has_moved = True
+                rook_keys = KEYS_BY_NAME[(color, 'Rook')]
+                h ^= rook_keys[rook_from] ^ rook_keys[rook_to]
+                changed += (rook_from, rook_to)
+        
+        self.castling_rights &= CASTLING_MASKS[from_sq] & CASTLING_MASKS[to_sq]
+        h ^= CASTLING_KEYS[self.castling_rights]
+        self.en_passant = None
+        if kind is Pawn and abs(to_row - from_row) == 2:
+            # Only record the square when an enemy pawn can actually capture onto it,
+            # so the hash of otherwise identical positions stays the same
+            passed = (from_sq + to_sq) // 2
+            for origin in PAWN_ATTACKS[color][passed]:
+                row, col = POSITIONS[origin]
+                neighbour = board[row][col]
+                if type(neighbour) is Pawn and neighbour.color != color:
+                    self.en_passant = passed
+                    h ^= EN_PASSANT_KEYS[passed & 7]
+                    break
+        
+        self._update_attack_maps(*changed)
+        self.zobrist_hash = h
         
         # Switch turn
-        self.current_turn = 'black' if self.current_turn == 'white' else 'white'
+        self.current_turn = 'black' if color == 'white' else 'white'
+        return record_head + (captured, captured_pos) + record_tail
+    
+    def _pop(self, record):
+        """Revert a move made by _push."""
+        from_pos, to_pos, piece, captured, captured_pos, had_moved, rights, en_passant, zobrist_hash = record
+        from_row, from_col = from_pos
+        to_row, to_col = to_pos
+        from_sq, to_sq = square(from_pos), square(to_pos)
+        board = self.board
         
-        # Update game status
-        self._update_game_status()
+        board[to_row][to_col] = None
+        board[from_row][from_col] = piece
+        piece.position = from_pos
+        piece.has_moved = had_moved
+        changed = [from_sq, to_sq]
+        if captured:
+            board[captured_pos[0]][captured_pos[1]] = captured
+            if captured_pos != to_pos:
+                changed.append(square(captured_pos))
+        if type(piece) is King:
+            self._king_positions[piece.color] = from_pos
+            if abs(to_col - from_col) == 2:
+                _, _, rook_from, rook_to, _, _ = CASTLING_MOVES[to_sq]
+                rook = board[POSITIONS[rook_to][0]][POSITIONS[rook_to][1]]
+                board[POSITIONS[rook_to][0]][POSITIONS[rook_to][1]] = None
+                board[POSITIONS[rook_from][0]][POSITIONS[rook_from][1]] = rook
+                rook.position = POSITIONS[rook_from]
+                rook.has_moved = False
+                changed += (rook_from, rook_to)
         
-        return True, "Move successful"
+        self._update_attack_maps(*changed)
+        self.castling_rights = rights
+        self.en_passant = en_passant
+        self.zobrist_hash = zobrist_hash
+        self.current_turn = piece.color
+    
+    def _push_moves(self):
+        """Legal moves for the side to move, as arguments for _push."""
+        return list(self.generate_moves())
+    
+    def _compute_hash(self):
+        """Compute the Zobrist hash of the position from scratch."""
+        h = SIDE_KEY if self.current_turn == 'black' else 0
+        h ^= CASTLING_KEYS[self.castling_rights]
+        if self.en_passant is not None:
+            h ^= EN_PASSANT_KEYS[self.en_passant & 7]
+        for row in self.board:
+            for piece in row:
+                if piece:
+                    h ^= KEYS_BY_NAME[(piece.color, piece.__class__.__name__)][square(piece.position)]
+        return h
     
     def _find_king(self, color):
         """Find the king of the specified color."""
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if isinstance(piece, King) and piece.color == color:
-                    return (row, col)
-        return None
+        return self._king_positions.get(color)
+    
+    def _init_attack_maps(self):
+        """Build the per-color attacked-squares maps from scratch."""
+        # attack_maps[color][sq] counts how many pieces of color attack sq
+        self.attack_maps = {'white': [0] * 64, 'black': [0] * 64}
+        # (color, attacked squares) contributed by the piece on each square
+        self._attack_sets = [None] * 64
+        self._refresh_attacks(range(64))
+    
+    def _attacks_from(self, sq, piece):
+        """Squares attacked by piece standing on sq."""
+        kind = type(piece)
+        if kind is Pawn:
+            return PAWN_ATTACKS[piece.color][sq]
+        if kind is Knight:
+            return KNIGHT_ATTACKS[sq]
+        if kind is King:
+            return KING_ATTACKS[sq]
+        
+        if kind is Rook:
+            rays = ROOK_RAYS[sq]
+        elif kind is Bishop:
+            rays = BISHOP_RAYS[sq]
+        else:
+            rays = QUEEN_RAYS[sq]
+        board = self.board
+        attacked = []
+        for ray in rays:
+            for target in ray:
+                attacked.append(target)
+                row, col = POSITIONS[target]
+                if board[row][col] is not None:
+                    break
+        return attacked
+    
+    def _refresh_attacks(self, squares):
+        """Recompute the attack contribution of the pieces on squares."""
+        board = self.board
+        attack_sets = self._attack_sets
+        for sq in squares:
+            previous = attack_sets[sq]
+            if previous is not None:
+                counts = self.attack_maps[previous[0]]
+                for target in previous[1]:
+                    counts[target] -= 1
+            
+            row, col = POSITIONS[sq]
+            piece = board[row][col]
+            if piece is None:
+                attack_sets[sq] = None
+                continue
+            attacked = self._attacks_from(sq, piece)
+            counts = self.attack_maps[piece.color]
+            for target in attacked:
+                counts[target] += 1
+            attack_sets[sq] = (piece.color, attacked)
+    
+    def _sliders_through(self, sq):
+        """Squares of sliding pieces whose nearest blocker along a line is sq."""
+        board = self.board
+        found = []
+        for rays, kinds in ((ROOK_RAYS[sq], (Rook, Queen)), (BISHOP_RAYS[sq], (Bishop, Queen))):
+            for ray in rays:
+                for origin in ray:
+                    row, col = POSITIONS[origin]
+                    piece = board[row][col]
+                    if piece is not None:
+                        if type(piece) in kinds:
+                            found.append(origin)
+                        break
+        return found
+    
+    def _update_attack_maps(self, *squares):
+        """Incrementally update attack maps after the pieces on squares changed.
+        
+        Only the moved pieces, any captured piece and sliders whose rays
+        pass through the changed squares can have different attacks.
+        """
+        affected = set(squares)
+        for sq in squares:
+            affected.update(self._sliders_through(sq))
+        self._refresh_attacks(affected)
     
     def _is_position_attacked(self, position, by_color):
-        """Check if a position is attacked by any piece of the given color."""
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color == by_color:
-                    if piece.is_valid_move(position, self.board):
-                        return True
+        """Check if a position is attacked by any piece of the given color.
+        
+        Looks outwards from the target square using the precomputed tables,
+        so it is valid for simulated positions that the attack maps do not
+        reflect.
+        """
+        board = self.board
+        sq = square(position)
+        opponent_color = 'black' if by_color == 'white' else 'white'
+        
+        # A pawn of by_color attacks sq from the squares an opposing pawn on sq would attack
+        for origin in PAWN_ATTACKS[opponent_color][sq]:
+            row, col = POSITIONS[origin]
+            piece = board[row][col]
+            if piece is not None and piece.color == by_color and type(piece) is Pawn:
+                return True
+        
+        for table, kind in ((KNIGHT_ATTACKS, Knight), (KING_ATTACKS, King)):
+            for origin in table[sq]:
+                row, col = POSITIONS[origin]
+                piece = board[row][col]
+                if piece is not None and piece.color == by_color and type(piece) is kind:
+                    return True
+        
+        for rays, kinds in ((ROOK_RAYS[sq], (Rook, Queen)), (BISHOP_RAYS[sq], (Bishop, Queen))):
+            for ray in rays:
+                for origin in ray:
+                    row, col = POSITIONS[origin]
+                    piece = board[row][col]
+                    if piece is not None:
+                        if piece.color == by_color and type(piece) in kinds:
+                            return True
+                        break
         return False
     
     def _is_in_check(self, color):
@@ -106,7 +480,7 @@ class ChessBoard:
         if not king_pos:
             return False
         opponent_color = 'black' if color == 'white' else 'white'
-        return self._is_position_attacked(king_pos, opponent_color)
+        return self.attack_maps[opponent_color][square(king_pos)] > 0
     
     def _would_be_in_check(self, from_pos, to_pos):
         """Check if a move would put own king in check."""
@@ -116,74 +490,65 @@ class ChessBoard:
         # Simulate move
         piece = self.board[from_row][from_col]
         captured = self.board[to_row][to_col]
-        original_pos = piece.position
+        # An en passant capture also empties the square beside the pawn
+        passed = None
+        if captured is None and from_col != to_col and type(piece) is Pawn:
+            passed = self.board[from_row][to_col]
+            self.board[from_row][to_col] = None
         
         self.board[to_row][to_col] = piece
         self.board[from_row][from_col] = None
-        piece.position = to_pos
         
         # Check if in check
-        in_check = self._is_in_check(piece.color)
+        king_pos = to_pos if isinstance(piece, King) else self._find_king(piece.color)
+        opponent_color = 'black' if piece.color == 'white' else 'white'
+        in_check = king_pos is not None and self._is_position_attacked(king_pos, opponent_color)
         
         # Undo move
         self.board[from_row][from_col] = piece
         self.board[to_row][to_col] = captured
-        piece.position = original_pos
+        if passed is not None:
+            self.board[from_row][to_col] = passed
         
         return in_check
     
-    def _update_game_status(self):
-        """Update game status (check, checkmate, stalemate)."""
-        if self._is_in_check(self.current_turn):
-            if self._is_checkmate(self.current_turn):
-                self.game_status = 'checkmate'
-            else:
-                self.game_status = 'check'
-        elif self._is_stalemate(self.current_turn):
-            self.game_status = 'stalemate'
-        else:
-            self.game_status = 'active'
-    
-    def _is_checkmate(self, color):
-        """Check if the given color is in checkmate."""
-        return self._is_in_check(color) and not self._has_legal_moves(color)
-    
-    def _is_stalemate(self, color):
-        """Check if the given color is in stalemate."""
-        return not self._is_in_check(color) and not self._has_legal_moves(color)
-    
-    def _has_legal_moves(self, color):
-        """Check if the given color has any legal moves."""
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color == color:
-                    for target_row in range(8):
-                        for target_col in range(8):
-                            if piece.is_valid_move((target_row, target_col), self.board):
-                                if not self._would_be_in_check((row, col), (target_row, target_col)):
-                                    return True
-        return False
+    def generate_moves(self, color=None):
+        """Lazily yield legal (from_pos, to_pos, promotion) moves for color.
+        
+        Defaults to the side to move. Pieces only propose squares they can
+        actually reach, and each candidate gets a single check test, so
+        callers that stop early pay only for the moves they consume.
+        """
+        for move in self._pseudo_moves(color or self.current_turn):
+            if not self._would_be_in_check(move[0], move[1]):
+                yield move
     
-    def get_board_state(self):
-        """Get current board state as a dictionary."""
-        state = []
-        for row in range(8):
-            row_state = []
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece:
-                    row_state.append({
-                        'type': piece.__class__.__name__,
-                        'color': piece.color
-                    })
+    def _pseudo_moves(self, color):
+        """Lazily yield (from_pos, to_pos, promotion) moves for color, ignoring checks.
+        
+        promotion is None except for pawns reaching the last rank, which
+        yield one move per promotion piece. Castling moves are only yielded
+        when the king does not pass through an attacked square.
+        """
+        board = self.board
+        to_move = color == self.current_turn
+        pieces = [piece for row in board for piece in row if piece and piece.color == color]
+        for piece in pieces:
+            from_pos = piece.position
+            kind = type(piece)
+            for to_pos in piece.pseudo_legal_targets(board):
+                if kind is Pawn and to_pos[0] in (0, 7):
+                    for promotion in PROMOTION_PIECES:
+                        yield from_pos, to_pos, promotion
                 else:
-                    row_state.append(None)
-            state.append(row_state)
-        
-        return {
-            'board': state,
-            'current_turn': self.current_turn,
-            'game_status': self.game_status,
-            'move_count': len(self.move_history)
-        }
+                    yield from_pos, to_pos, None
+            if not to_move:
+                continue
+            if kind is Pawn:
+                if self.en_passant in PAWN_ATTACKS[color][square(from_pos)]:
+                    yield from_pos, POSITIONS[self.en_passant], None
+            elif kind is King and self.castling_rights:
+                for king_to in CASTLING_TARGETS[color]:
+                    if self._can_castle(color, king_to):
+                        yield from_pos, POSITIONS[king_to], None
+
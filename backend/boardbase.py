@@ -0,0 +1,223 @@
+"""Game logic shared by both board implementations.
+
+``BaseBoard`` holds everything that only needs the move history, the
+position hash and a few primitives, so ``board.ChessBoard`` and
+``bitboard.BitboardChessBoard`` differ only in how they store the
+position and generate moves. Subclasses provide ``_squares``,
+``_push``/``_pop``, ``_push_moves``, ``_is_in_check``,
+``generate_moves``, ``get_square`` and ``move_piece``.
+"""
+
+from transposition import position_cache
+from notation import NotationError, format_fen, format_board
+from rules import is_draw
+import wire
+
+
+class BaseBoard:
+    """Game state and history on top of a subclass's position representation."""
+    
+    @classmethod
+    def from_fen(cls, fen):
+        """Create a game starting from the position described by a FEN string."""
+        return cls(fen)
+    
+    def _check_fen_position(self, fen):
+        """Reject a FEN position in which the side not to move is in check.
+        
+        parse_fen() only sees the pieces; an attacked king needs the
+        engine's attack detection, so this runs once the pieces are placed.
+        """
+        opponent = 'black' if self.current_turn == 'white' else 'white'
+        if self._is_in_check(opponent):
+            raise NotationError(f"Invalid FEN '{fen}': the side not to move is in check")
+    
+    def to_fen(self):
+        """Export the current position as a FEN string."""
+        return format_fen(self._squares(), self.current_turn, self.castling_rights, self.en_passant,
+                          self.halfmove_clock, self.fullmove_number)
+    
+    def unmake_move(self):
+        """Take back the last move. Returns False if there is no move to take back.
+        
+        The status is looked up again rather than stored in the undo record,
+        since moves applied with update_status=False never computed theirs;
+        the position cache usually answers without any move generation.
+        """
+        if not self._undo_stack:
+            return False
+        record, self.halfmove_clock, self.fullmove_number = self._undo_stack.pop()
+        self._pop(record)
+        self.hash_history.pop()
+        self.move_history.pop()
+        self._update_game_status()
+        return True
+    
+    def perft(self, depth):
+        """Count the leaf nodes of the legal move tree to depth.
+        
+        The standard move generator correctness test: results are compared
+        with published node counts for known positions.
+        """
+        if depth == 0:
+            return 1
+        moves = self._push_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            record = self._push(*move)
+            nodes += self.perft(depth - 1)
+            self._pop(record)
+        return nodes
+    
+    def apply_moves(self, moves):
+        """Apply a sequence of (from_pos, to_pos[, promotion]) moves, evaluating game status once.
+        
+        moves may be a lazy iterable; each item is only requested after the
+        previous move has been made. Stops at the first rejected move and
+        returns (number applied, error message or None). Moves after a
+        checkmate, stalemate or draw reached partway through are rejected
+        with "Game is over", as they would be one at a time.
+        """
+        applied = 0
+        try:
+            for move in moves:
+                # game_status is stale within the batch; the draw rules are cheap to check directly
+                if applied and is_draw(self.halfmove_clock, self.hash_history):
+                    return applied, "Game is over"
+                success, message = self.move_piece(*move, update_status=False)
+                if not success:
+                    if applied and not self._has_legal_moves(self.current_turn):
+                        # Checkmate or stalemate; only looked for once a move is rejected
+                        message = "Game is over"
+                    return applied, message
+                applied += 1
+            return applied, None
+        finally:
+            if applied:
+                self._update_game_status()
+    
+    def _update_game_status(self):
+        """Update game status (check, checkmate, stalemate, draw).
+        
+        The position cache holds the status implied by the position alone;
+        the fifty-move and repetition draws depend on the game's history
+        and are applied on top of it.
+        """
+        self._encoded_states = None
+        entry = position_cache.entry(self.zobrist_hash)
+        status = entry.get('status')
+        position_cache.record(status is not None)
+        if status is None:
+            in_check = self._is_in_check(self.current_turn)
+            has_moves = self._has_legal_moves(self.current_turn)
+            if in_check:
+                status = 'check' if has_moves else 'checkmate'
+            else:
+                status = 'active' if has_moves else 'stalemate'
+            entry['status'] = status
+        if status in ('active', 'check') and is_draw(self.halfmove_clock, self.hash_history):
+            status = 'draw'
+        self.game_status = status
+    
+    def legal_moves(self):
+        """List legal moves for the side to move, shared through the position cache."""
+        entry = position_cache.entry(self.zobrist_hash)
+        moves = entry.get('moves')
+        position_cache.record(moves is not None)
+        if moves is None:
+            moves = tuple(self.generate_moves())
+            entry['moves'] = moves
+        return moves
+    
+    def _has_legal_moves(self, color):
+        """Check if the given color has any legal moves."""
+        for _ in self.generate_moves(color):
+            return True
+        return False
+    
+    def version(self, move_count=None):
+        """Token naming the game after its first move_count moves (default: all of them).
+        
+        The position hash after every move is folded in, so a move count
+        reached again after a takeback gets a different token, even if a
+        different move order reaches the same position.
+        """
+        if move_count is None:
+            move_count = len(self.move_history)
+        return f"{move_count}-{hash(tuple(self.hash_history[:move_count + 1])) & 0xffffffffffffffff:016x}"
+    
+    def resolve_version(self, version):
+        """The move count of a version() token from this game's current history, or None."""
+        move_count, _, _ = str(version).partition('-')
+        if not move_count.isdigit() or int(move_count) > len(self.move_history):
+            return None
+        move_count = int(move_count)
+        return move_count if self.version(move_count) == version else None
+    
+    def get_board_state(self, board_format='full'):
+        """Get current board state as a dictionary, with the board in a wire.BOARD_FORMATS format."""
+        state = {}
+        if board_format == 'compact':
+            state['board'] = format_board(self._squares())
+        elif board_format == 'fen':
+            state['fen'] = self.to_fen()
+        else:
+            squares = self._squares()
+            state['board'] = [
+                [None if piece is None else {'type': piece[1], 'color': piece[0]}
+                 for piece in squares[row * 8:row * 8 + 8]]
+                for row in range(8)
+            ]
+        
+        state['current_turn'] = self.current_turn
+        state['game_status'] = self.game_status
+        state['move_count'] = len(self.move_history)
+        state['version'] = self.version()
+        return state
+    
+    def encoded_state(self, board_format='full'):
+        """get_board_state() as JSON bytes, encoded once per position and format."""
+        if self._encoded_states is None:
+            self._encoded_states = {}
+        encoded = self._encoded_states.get(board_format)
+        if encoded is None:
+            encoded = self._encoded_states[board_format] = wire.dumps(self.get_board_state(board_format))
+        return encoded
+    
+    def changed_squares(self, since):
+        """Squares touched by the moves made after the first since moves."""
+        squares = set()
+        for move in self.move_history[since:]:
+            from_row, from_col = move['from']
+            to_row, to_col = move['to']
+            squares.add((from_row, from_col))
+            squares.add((to_row, to_col))
+            if move.get('castling'):
+                # The rook moved between the corner and the square the king crossed
+                squares.add((to_row, 7 if to_col == 6 else 0))
+                squares.add((to_row, (from_col + to_col) // 2))
+            if move.get('en_passant'):
+                squares.add((from_row, to_col))
+        return sorted(squares)
+    
+    def get_state_delta(self, since):
+        """Get only the squares and history entries that changed after move number since.
+        
+        since must be a move count the client's copy of this history reached;
+        callers check it with resolve_version().
+        """
+        squares = []
+        for position in self.changed_squares(since):
+            squares.append({'position': position, 'piece': self.get_square(position)})
+        
+        return {
+            'since': since,
+            'squares': squares,
+            'history': self.move_history[since:],
+            'current_turn': self.current_turn,
+            'game_status': self.game_status,
+            'move_count': len(self.move_history),
+            'version': self.version()
+        }
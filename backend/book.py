@@ -0,0 +1,202 @@
+"""Opening book: a prebuilt, memory-mapped index of common positions.
+
+Usage:
+    python book.py opening.book games.pgn [more.pgn ...] [--plies 16] [--min-games 2]
+
+The builder replays PGN games and keeps every position reached within the
+first --plies plies of at least --min-games of them. For each it stores
+the legal moves, the status implied by the position and the moves played
+from it with how often each was played.
+
+The file is sorted by Zobrist hash and opened with mmap, so every worker
+process maps the same read-only pages and a lookup is a binary search
+with nothing to parse up front. Once loaded, the position cache seeds new
+entries from the book, so boards of either engine get book positions'
+status and legal moves without generating anything, and the engine plays
+the most popular book move without searching.
+
+Layout (little-endian): a 16-byte header (magic, position count), the
+sorted 8-byte hashes, an 8-byte record per position (data offset, legal
+move count, book move count, status), then the move data: legal moves at
+two bytes each, packed as in the game store, followed by book moves as
+two bytes of move and four bytes of game count, most played first.
+"""
+
+import argparse
+import bisect
+import mmap
+import struct
+from collections import Counter
+
+from notation import NotationError, read_pgn, resolve_moves
+from store import pack_move, unpack_move
+from transposition import position_cache
+
+MAGIC = b'CHESSBK1'
+HEADER = struct.Struct('<8sIxxxx')
+KEY = struct.Struct('<Q')
+RECORD = struct.Struct('<IBBBx')
+BOOK_MOVE = struct.Struct('<2sI')
+# Position-only statuses; draws depend on the game's history and are never stored
+STATUSES = ('active', 'check', 'checkmate', 'stalemate')
+
+
+class _Keys:
+    """Sequence view of the sorted hash array, for bisect."""
+    
+    def __init__(self, buffer, count):
+        self.buffer = buffer
+        self.count = count
+    
+    def __len__(self):
+        return self.count
+    
+    def __getitem__(self, index):
+        return KEY.unpack_from(self.buffer, HEADER.size + index * KEY.size)[0]
+
+
+class OpeningBook:
+    """Read-only opening book file, memory-mapped.
+    
+    Raises ValueError if the file is not an opening book.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is not an opening book")
+        magic, self.count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        self._keys = _Keys(self._map, self.count)
+        self._records = HEADER.size + self.count * KEY.size
+    
+    def __len__(self):
+        return self.count
+    
+    def _record(self, zobrist_hash):
+        index = bisect.bisect_left(self._keys, zobrist_hash)
+        if index == self.count or self._keys[index] != zobrist_hash:
+            return None
+        return RECORD.unpack_from(self._map, self._records + index * RECORD.size)
+    
+    def probe(self, zobrist_hash):
+        """Position cache fields ({'status', 'moves'}) for a book position, or None."""
+        record = self._record(zobrist_hash)
+        if record is None:
+            return None
+        self.hits += 1
+        offset, legal_count, _, status = record
+        moves = tuple(unpack_move(self._map, offset + 2 * i) for i in range(legal_count))
+        return {'status': STATUSES[status], 'moves': moves}
+    
+    def book_moves(self, zobrist_hash):
+        """List (move, games) for the moves played from a book position, most played first."""
+        record = self._record(zobrist_hash)
+        if record is None:
+            return []
+        offset, legal_count, book_count, _ = record
+        offset += 2 * legal_count
+        moves = []
+        for i in range(book_count):
+            packed, games = BOOK_MOVE.unpack_from(self._map, offset + i * BOOK_MOVE.size)
+            moves.append((unpack_move(packed), games))
+        return moves
+    
+    def stats(self):
+        return {
+            'path': self.path,
+            'positions': self.count,
+            'hits': self.hits
+        }
+    
+    def close(self):
+        self._map.close()
+
+
+def load(path):
+    """Open the book at path and have the position cache consult it from now on."""
+    book = OpeningBook(path)
+    position_cache.clear()
+    position_cache.book = book
+    return book
+
+
+def suggest(zobrist_hash):
+    """Engine result for the most played book move in a position, or None when out of book."""
+    if position_cache.book is None:
+        return None
+    moves = position_cache.book.book_moves(zobrist_hash)
+    if not moves:
+        return None
+    move, games = moves[0]
+    return {'move': move, 'book': True, 'games': games}
+
+
+def _position_status(board, legal_moves):
+    in_check = board._is_in_check(board.current_turn)
+    if legal_moves:
+        return 'check' if in_check else 'active'
+    return 'checkmate' if in_check else 'stalemate'
+
+
+def build(output, pgn_paths, plies=16, min_games=2):
+    """Build a book file from PGN files; return the number of positions written."""
+    from bitboard import BitboardChessBoard
+    
+    played = {}
+    positions = {}
+    for pgn_path in pgn_paths:
+        with open(pgn_path, encoding='utf-8', errors='replace') as f:
+            for game in read_pgn(f):
+                fen = game['headers'].get('FEN') if game['headers'].get('SetUp') == '1' else None
+                try:
+                    board = BitboardChessBoard(fen)
+                    for move in resolve_moves(board, game['moves'][:plies], 'san'):
+                        key = board.zobrist_hash
+                        if key not in positions:
+                            legal_moves = board.legal_moves()
+                            positions[key] = (_position_status(board, legal_moves), legal_moves)
+                        played.setdefault(key, Counter())[move] += 1
+                        board.move_piece(*move)
+                except NotationError:
+                    # Keep the positions before the bad move and skip the rest of the game
+                    continue
+    
+    keys = sorted(key for key, counts in played.items() if sum(counts.values()) >= min_games)
+    records = []
+    data = bytearray()
+    data_start = HEADER.size + len(keys) * (KEY.size + RECORD.size)
+    for key in keys:
+        status, legal_moves = positions[key]
+        book_moves = played[key].most_common()
+        records.append(RECORD.pack(data_start + len(data), len(legal_moves), len(book_moves),
+                                   STATUSES.index(status)))
+        data += b''.join(pack_move(move) for move in legal_moves)
+        data += b''.join(BOOK_MOVE.pack(pack_move(move), games) for move, games in book_moves)
+    
+    with open(output, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        f.write(b''.join(KEY.pack(key) for key in keys))
+        f.write(b''.join(records))
+        f.write(data)
+    return len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build an opening book from PGN files')
+    parser.add_argument('output', help='book file to write')
+    parser.add_argument('pgn', nargs='+', help='PGN files to read')
+    parser.add_argument('--plies', type=int, default=16, help='plies of each game to index')
+    parser.add_argument('--min-games', type=int, default=2,
+                        help='games a position must occur in to be kept')
+    args = parser.parse_args()
+    count = build(args.output, args.pgn, args.plies, args.min_games)
+    print(f"Wrote {count} positions to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
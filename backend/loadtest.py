@@ -0,0 +1,292 @@
+"""Load test: concurrent simulated games against the REST API.
+
+Usage:
+    python loadtest.py                                   # 1 and 2 workers, 8 and 32 clients
+    python loadtest.py --workers 1,4 --concurrency 16,64 --games 500
+    python loadtest.py --url http://localhost:5001 --concurrency 32
+    python loadtest.py --json
+
+For each worker count, serve.py is started locally with that many workers
+on consecutive ports, sharing one temporary SQLite file; --url targets a
+server that is already running instead. --games games are then played by
+each --concurrency of client threads. New games are spread across the
+workers, and every later request for a game goes to the worker named in
+its ID, as the proxy in front of serve.py does. Each move is
+followed by a state poll, as a browser client does, and the history is
+fetched once the game ends. Reports throughput and latency percentiles
+per endpoint for every combination.
+
+Moves come from random legal games after a few common openings, generated
+before the run from --seed, so runs with the same options send the same
+requests.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from bitboard import BitboardChessBoard
+from notation import parse_uci
+from rules import GAME_OVER
+from store import game_worker
+
+OPENINGS = [
+    ['e2e4', 'e7e5', 'g1f3', 'b8c6', 'f1b5', 'a7a6'],
+    ['e2e4', 'c7c5', 'g1f3', 'd7d6', 'd2d4', 'c5d4'],
+    ['d2d4', 'd7d5', 'c2c4', 'e7e6', 'b1c3', 'g8f6'],
+    ['d2d4', 'g8f6', 'c2c4', 'g7g6', 'b1c3', 'f8g7'],
+    ['c2c4', 'e7e5', 'b1c3', 'g8f6', 'g2g3', 'd7d5'],
+]
+ENDPOINTS = ('new', 'move', 'state', 'history')
+PERCENTILES = (50, 95, 99)
+SERVER_START_TIMEOUT = 30
+
+
+def simulated_games(count, plies, seed):
+    """Move lists of count games: an opening, then random legal moves until plies or the end of the game."""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = BitboardChessBoard()
+        moves = []
+        for move in map(parse_uci, rng.choice(OPENINGS)):
+            board.move_piece(*move)
+            moves.append(move)
+        while len(moves) < plies and board.game_status not in GAME_OVER:
+            move = rng.choice(board.legal_moves())
+            board.move_piece(*move)
+            moves.append(move)
+        games.append(moves)
+    return games
+
+
+def percentile(sorted_values, p):
+    """The p-th percentile of an already sorted list, by nearest rank."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+class Client:
+    """One keep-alive connection per worker, recording the latency of every request."""
+    
+    def __init__(self, addresses, results):
+        self.connections = [http.client.HTTPConnection(host, port, timeout=60) for host, port in addresses]
+        self.results = results
+    
+    def request(self, worker, endpoint, method, path, body=None):
+        """Send a request and return (status, decoded JSON body); the latency is recorded under endpoint."""
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        payload = json.dumps(body) if body is not None else None
+        connection = self.connections[worker]
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, payload, headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            # The server closed the connection; reconnect once and retry
+            connection.close()
+            connection.request(method, path, payload, headers)
+            response = connection.getresponse()
+            data = response.read()
+        self.results.record(endpoint, time.perf_counter() - start, response.status)
+        return response.status, json.loads(data) if data else None
+    
+    def play(self, worker, moves):
+        """Play one game created on a worker: make each move and poll its state, then fetch the history."""
+        status, data = self.request(worker, 'new', 'POST', '/api/game/new', {'engine': 'object'})
+        if status != 201:
+            return
+        # Route on the ID like the proxy; a single --url server names no worker
+        owner = game_worker(data['game_id'])
+        if owner is not None and owner < len(self.connections):
+            worker = owner
+        game_path = f"/api/game/{data['game_id']}"
+        for from_pos, to_pos, promotion in moves:
+            body = {'from': from_pos, 'to': to_pos}
+            if promotion:
+                body['promotion'] = promotion
+            status, _ = self.request(worker, 'move', 'POST', f'{game_path}/move', body)
+            if status != 200:
+                break
+            self.request(worker, 'state', 'GET', f'{game_path}/state')
+        self.request(worker, 'history', 'GET', f'{game_path}/history')
+    
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+
+
+class Results:
+    """Latencies and error counts per endpoint, shared by every client thread."""
+    
+    def __init__(self):
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors = dict.fromkeys(ENDPOINTS, 0)
+        self._lock = threading.Lock()
+    
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if status >= 400:
+                self.errors[endpoint] += 1
+    
+    def summary(self, elapsed):
+        """Requests per second overall, and count, errors and latency percentiles in ms per endpoint."""
+        endpoints = {}
+        total = 0
+        for endpoint in ENDPOINTS:
+            latencies = sorted(self.latencies[endpoint])
+            total += len(latencies)
+            endpoints[endpoint] = {
+                'requests': len(latencies),
+                'errors': self.errors[endpoint],
+                **{f'p{p}_ms': round(percentile(latencies, p) * 1000, 2) if latencies else None
+                   for p in PERCENTILES}
+            }
+        return {
+            'requests': total,
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(total / elapsed, 1) if elapsed else None,
+            'endpoints': endpoints
+        }
+
+
+def run_load(addresses, games, concurrency):
+    """Play games across concurrency client threads, game i created on worker i mod len(addresses)."""
+    results = Results()
+    pending = queue.Queue()
+    for index, moves in enumerate(games):
+        pending.put((index % len(addresses), moves))
+    
+    def client_thread():
+        client = Client(addresses, results)
+        try:
+            while True:
+                try:
+                    worker, moves = pending.get_nowait()
+                except queue.Empty:
+                    return
+                client.play(worker, moves)
+        finally:
+            client.close()
+    
+    threads = [threading.Thread(target=client_thread, daemon=True) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results.summary(time.perf_counter() - start)
+
+
+def _wait_until_healthy(host, port, process):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        connection = http.client.HTTPConnection(host, port, timeout=1)
+        try:
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+        finally:
+            connection.close()
+    raise RuntimeError(f"Worker on port {port} did not start within {SERVER_START_TIMEOUT}s")
+
+
+def start_server(workers, base_port, directory):
+    """Start serve.py with workers on consecutive ports; return (process, addresses) once all are healthy."""
+    env = dict(os.environ,
+               CHESS_DB_PATH=os.path.join(directory, 'games.db'),
+               CHESS_ENGINE_WORKERS='0')
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')
+    process = subprocess.Popen(
+        [sys.executable, script, '--workers', str(workers), '--host', '127.0.0.1', '--port', str(base_port)],
+        env=env, cwd=os.path.dirname(script), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    addresses = [('127.0.0.1', base_port + index) for index in range(workers)]
+    try:
+        for host, port in addresses:
+            _wait_until_healthy(host, port, process)
+    except Exception:
+        stop_server(process)
+        raise
+    return process, addresses
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait()
+
+
+def _counts(text):
+    return [int(value) for value in text.split(',')]
+
+
+def print_report(results):
+    print(f"{'workers':>7} {'clients':>7} {'req/s':>9}  {'endpoint':<8} {'requests':>8} {'errors':>6} "
+          + ' '.join(f"{f'p{p} ms':>8}" for p in PERCENTILES))
+    for result in results:
+        first = True
+        for endpoint, figures in result['endpoints'].items():
+            prefix = (f"{result['workers']:>7} {result['concurrency']:>7} {result['requests_per_second']:>9}"
+                      if first else ' ' * 25)
+            first = False
+            percentiles = ' '.join(f"{figures[f'p{p}_ms'] if figures[f'p{p}_ms'] is not None else '-':>8}"
+                                   for p in PERCENTILES)
+            print(f"{prefix}  {endpoint:<8} {figures['requests']:>8} {figures['errors']:>6} {percentiles}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=_counts, default=[1, 2],
+                        help='comma-separated worker process counts to start (default 1,2)')
+    parser.add_argument('--concurrency', type=_counts, default=[8, 32],
+                        help='comma-separated client thread counts (default 8,32)')
+    parser.add_argument('--games', type=int, default=200, help='games played per combination')
+    parser.add_argument('--plies', type=int, default=40, help='longest game in plies')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--port', type=int, default=5101, help='port of the first local worker')
+    parser.add_argument('--url', help='load an already running server instead of starting workers')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    
+    games = simulated_games(args.games, args.plies, args.seed)
+    results = []
+    if args.url:
+        target = urlsplit(args.url)
+        for concurrency in args.concurrency:
+            result = run_load([(target.hostname, target.port or 80)], games, concurrency)
+            results.append({'workers': args.url, 'concurrency': concurrency, **result})
+    else:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as directory:
+                process, addresses = start_server(workers, args.port, directory)
+                try:
+                    for concurrency in args.concurrency:
+                        result = run_load(addresses, games, concurrency)
+                        results.append({'workers': workers, 'concurrency': concurrency, **result})
+                finally:
+                    stop_server(process)
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == '__main__':
+    main()
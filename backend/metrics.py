@@ -0,0 +1,339 @@
+"""Request and engine metrics exported in Prometheus text format.
+
+Metrics are plain in-process counters, gauges and fixed-bucket histograms;
+recording one is a lock and a few additions, cheap enough for the
+per-move path. ``instrument()`` wraps the board methods worth timing and
+counts ``is_valid_move`` calls for the request in progress.
+
+``SamplingProfiler`` is an opt-in debugging aid: while running it samples
+every thread's stack at a fixed interval and reports collapsed stacks, the
+input format of flame graph tools.
+"""
+
+import bisect
+import functools
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+
+# Seconds; request latencies mostly fall between 0.5 ms and 50 ms
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    """Monotonic counter split by label values, or read from a callback at scrape time.
+    
+    A callback returns the value, or for a labelled metric a dict mapping
+    label value tuples to values.
+    """
+    
+    kind = 'counter'
+    
+    def __init__(self, name, documentation, labels=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+    
+    def samples(self):
+        if self.callback is not None:
+            value = self.callback()
+            if not self.labels:
+                yield f"{self.name} {value}"
+                return
+            items = list(value.items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for label_values, value in items:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {value}"
+
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+    
+    kind = 'gauge'
+    
+    def dec(self, *label_values):
+        self.inc(*label_values, amount=-1)
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate quantiles."""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (last is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def quantile(self, q, *label_values):
+        """Estimate the q quantile by interpolating within its bucket; None if empty."""
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None or not series[2]:
+                return None
+            counts = list(series[0])
+            total = series[2]
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+    
+    def series(self):
+        with self._lock:
+            return list(self._series)
+    
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(value[0]), value[1], value[2])) for key, value in self._series.items()]
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, label_values, [('le', bound)])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class QuantileGauge:
+    """p50/p95/p99 of a histogram, for dashboards that cannot compute them."""
+    
+    kind = 'gauge'
+    
+    def __init__(self, name, histogram, quantiles=(0.5, 0.95, 0.99)):
+        self.name = name
+        self.documentation = f"Approximate quantiles of {histogram.name}"
+        self.histogram = histogram
+        self.quantiles = quantiles
+    
+    def samples(self):
+        for label_values in self.histogram.series():
+            for q in self.quantiles:
+                value = self.histogram.quantile(q, *label_values)
+                labels = _format_labels(self.histogram.labels, label_values, [('quantile', q)])
+                yield f"{self.name}{labels} {value}"
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+    
+    def __init__(self):
+        self._metrics = {}
+    
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_latency = registry.register(Histogram(
+    'chess_http_request_duration_seconds', 'Request latency by route',
+    labels=('method', 'route')))
+registry.register(QuantileGauge('chess_http_request_duration_quantile_seconds', request_latency))
+requests_total = registry.register(Counter(
+    'chess_http_requests_total', 'Requests by route and status',
+    labels=('method', 'route', 'status')))
+requests_in_flight = registry.register(Gauge(
+    'chess_http_requests_in_flight', 'Requests currently being served'))
+operation_latency = registry.register(Histogram(
+    'chess_operation_duration_seconds', 'Time spent in board operations and JSON encoding',
+    labels=('operation',)))
+registry.register(QuantileGauge('chess_operation_duration_quantile_seconds', operation_latency))
+valid_move_calls = registry.register(Histogram(
+    'chess_is_valid_move_calls', 'is_valid_move calls per request',
+    labels=('route',), buckets=CALL_COUNT_BUCKETS))
+
+# Per-thread state of the request being served
+_request = threading.local()
+
+
+def begin_request():
+    """Mark the start of a request on this thread and return its start time."""
+    _request.valid_move_calls = 0
+    requests_in_flight.inc()
+    return time.perf_counter()
+
+
+def end_request(start, method, route, status):
+    """Record a finished request started with begin_request()."""
+    request_latency.observe(time.perf_counter() - start, method, route)
+    requests_total.inc(method, route, status)
+    valid_move_calls.observe(_request.valid_move_calls, route)
+    _request.valid_move_calls = 0
+    requests_in_flight.dec()
+
+
+def timed(operation, fn):
+    """Wrap fn so each call's duration is recorded under operation."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            operation_latency.observe(time.perf_counter() - start, operation)
+    return wrapper
+
+
+def _counted(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            _request.valid_move_calls += 1
+        except AttributeError:
+            pass
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def register_server_metrics(store, pool):
+    """Export game store, position cache and engine pool figures, read at scrape time."""
+    from transposition import position_cache
+    
+    registry.register(Gauge('chess_games_hot', 'Games held in memory as boards', callback=lambda: len(store)))
+    registry.register(Gauge('chess_games_frozen', 'Finished games held in memory in compact form',
+                            callback=store.frozen_count))
+    registry.register(Gauge('chess_store_memory_bytes', 'Approximate memory held by each game store tier',
+                            labels=('tier',),
+                            callback=lambda: {(tier,): size for tier, size in store.memory_usage().items()}))
+    registry.register(Gauge('chess_games_dirty', 'Games changed since the last flush',
+                            callback=store.dirty_count))
+    registry.register(Gauge('chess_games_stored', 'Games persisted in SQLite', callback=store.stored_count))
+    registry.register(Counter('chess_position_cache_hits_total', 'Position cache hits',
+                              callback=lambda: position_cache.hits))
+    registry.register(Counter('chess_position_cache_misses_total', 'Position cache misses',
+                              callback=lambda: position_cache.misses))
+    registry.register(Gauge('chess_engine_pool_pending', 'Engine tasks queued or running',
+                            callback=lambda: pool.stats()['pending']))
+    registry.register(Counter('chess_engine_pool_rejected_total', 'Engine tasks refused with a 503',
+                              callback=lambda: pool.stats()['rejected']))
+
+
+_instrumented = False
+
+
+def instrument():
+    """Install timing on both board engines and JSON encoding, and is_valid_move counting. Idempotent."""
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+    
+    import wire
+    from board import ChessBoard
+    from bitboard import BitboardChessBoard
+    from pieces import Piece
+    
+    wire.dumps = timed('json_serialize', wire.dumps)
+    for engine in (ChessBoard, BitboardChessBoard):
+        for name in ('move_piece', '_is_in_check', '_has_legal_moves', 'get_board_state'):
+            setattr(engine, name, timed(name, getattr(engine, name)))
+    for piece_class in Piece.__subclasses__():
+        piece_class.is_valid_move = _counted(piece_class.is_valid_move)
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads at a fixed interval while running.
+    
+    Meant to be switched on briefly in production: the cost is one stack
+    walk per thread per interval, and nothing at all while stopped.
+    """
+    
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = StackCounter()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+    
+    @property
+    def running(self):
+        return self._thread is not None
+    
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stacks.clear()
+                self.samples = 0
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+    
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopped.set()
+            thread.join()
+    
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                with self._lock:
+                    self._stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+    
+    def collapsed(self):
+        """Sampled stacks as 'frame;frame;frame count' lines, most frequent first."""
+        with self._lock:
+            items = self._stacks.most_common()
+        return ''.join(f"{stack} {count}\n" for stack, count in items)
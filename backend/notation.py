@@ -0,0 +1,387 @@
+"""Move notation: UCI and SAN moves, FEN positions and PGN game archives."""
+
+import re
+
+from rules import CASTLING_LETTERS, CASTLING_MOVES, PROMOTION_PIECES
+
+FILES = 'abcdefgh'
+PIECE_LETTERS = {'N': 'Knight', 'B': 'Bishop', 'R': 'Rook', 'Q': 'Queen', 'K': 'King'}
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+FEN_LETTERS = {'p': 'Pawn', 'n': 'Knight', 'b': 'Bishop', 'r': 'Rook', 'q': 'Queen', 'k': 'King'}
+PIECE_FEN = {name: letter for letter, name in FEN_LETTERS.items()}
+# (color, type) -> FEN letter, uppercase for white
+SQUARE_LETTERS = {
+    (color, name): letter.upper() if color == 'white' else letter
+    for name, letter in PIECE_FEN.items() for color in ('white', 'black')
+}
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+UCI_PATTERN = re.compile(r'^([a-h][1-8])([a-h][1-8])([qrbn]?)$')
+SAN_PATTERN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(=?[NBRQ])?$')
+HEADER_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]$')
+MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+')
+CASTLING_PATTERN = re.compile(r'^(-|K?Q?k?q?)$')
+EN_PASSANT_PATTERN = re.compile(r'^(-|[a-h][36])$')
+
+
+class NotationError(ValueError):
+    """Raised when a move cannot be parsed or is not legal in the position."""
+
+
+def parse_square(name):
+    """Convert a square name such as 'e4' to a (row, col) position."""
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+def square_name(position):
+    """Convert a (row, col) position to a square name such as 'e4'."""
+    row, col = position
+    return f"{FILES[col]}{8 - row}"
+
+
+def parse_fen(fen):
+    """Parse a FEN string into (pieces, turn, castling, en_passant, halfmove_clock, fullmove_number).
+    
+    pieces is a list of (square, color, type) with square = row * 8 + col.
+    castling is a mask of rules.CASTLING_LETTERS bits and en_passant a
+    square or None. Castling rights whose king or rook is not on its home
+    square are dropped, and the en passant square is kept only if a pawn of
+    the side to move can capture onto it, so equal positions always load
+    identically. The clock fields may be omitted and default to 0 and 1.
+    """
+    if not isinstance(fen, str):
+        raise NotationError('FEN must be a string')
+    fields = fen.split()
+    if not 4 <= len(fields) <= 6:
+        raise NotationError(f"Invalid FEN '{fen}': expected 4 to 6 fields")
+    placement, turn, castling, en_passant = fields[:4]
+    
+    ranks = placement.split('/')
+    if len(ranks) != 8:
+        raise NotationError(f"Invalid FEN '{fen}': expected 8 ranks")
+    pieces = []
+    kings = {'white': 0, 'black': 0}
+    for row, rank in enumerate(ranks):
+        col = 0
+        for char in rank:
+            if char.isdigit() and char != '0':
+                col += int(char)
+                continue
+            piece_type = FEN_LETTERS.get(char.lower())
+            if piece_type is None or col > 7:
+                raise NotationError(f"Invalid FEN '{fen}': bad rank '{rank}'")
+            color = 'white' if char.isupper() else 'black'
+            if piece_type == 'Pawn' and row in (0, 7):
+                raise NotationError(f"Invalid FEN '{fen}': pawn on back rank")
+            if piece_type == 'King':
+                kings[color] += 1
+            pieces.append((row * 8 + col, color, piece_type))
+            col += 1
+        if col != 8:
+            raise NotationError(f"Invalid FEN '{fen}': bad rank '{rank}'")
+    if kings != {'white': 1, 'black': 1}:
+        raise NotationError(f"Invalid FEN '{fen}': each side needs exactly one king")
+    
+    if turn not in ('w', 'b'):
+        raise NotationError(f"Invalid FEN '{fen}': side to move must be 'w' or 'b'")
+    if not CASTLING_PATTERN.match(castling):
+        raise NotationError(f"Invalid FEN '{fen}': bad castling field")
+    if not EN_PASSANT_PATTERN.match(en_passant):
+        raise NotationError(f"Invalid FEN '{fen}': bad en passant field")
+    try:
+        halfmove = int(fields[4]) if len(fields) > 4 else 0
+        fullmove = int(fields[5]) if len(fields) > 5 else 1
+    except ValueError:
+        raise NotationError(f"Invalid FEN '{fen}': clocks must be integers")
+    if halfmove < 0 or fullmove < 1:
+        raise NotationError(f"Invalid FEN '{fen}': clocks out of range")
+    
+    turn = 'white' if turn == 'w' else 'black'
+    placed = {sq: (color, piece_type) for sq, color, piece_type in pieces}
+    rights = 0
+    for letter, right in CASTLING_LETTERS:
+        if letter in castling:
+            color = 'white' if letter.isupper() else 'black'
+            _, king_from, rook_from, _, _, _ = next(move for move in CASTLING_MOVES.values() if move[0] == right)
+            if placed.get(king_from) == (color, 'King') and placed.get(rook_from) == (color, 'Rook'):
+                rights |= right
+    
+    target = None
+    if en_passant != '-':
+        row, col = parse_square(en_passant)
+        # The pawn that just moved two squares passed over the target square
+        direction = 1 if turn == 'white' else -1
+        opponent = 'black' if turn == 'white' else 'white'
+        pushed = (row + direction) * 8 + col
+        capturers = [(row + direction) * 8 + c for c in (col - 1, col + 1) if 0 <= c < 8]
+        if (row == (2 if turn == 'white' else 5) and row * 8 + col not in placed
+                and placed.get(pushed) == (opponent, 'Pawn')
+                and any(placed.get(sq) == (turn, 'Pawn') for sq in capturers)):
+            target = row * 8 + col
+    return pieces, turn, rights, target, halfmove, fullmove
+
+
+def format_board(squares):
+    """Build a 64-character board string from 64 (color, type) pairs or None in square order.
+    
+    Pieces are FEN letters and empty squares '.'; this is the board of the
+    compact wire format.
+    """
+    return ''.join('.' if piece is None else SQUARE_LETTERS[piece] for piece in squares)
+
+
+def format_fen(squares, turn, castling, en_passant, halfmove, fullmove):
+    """Build a FEN string from 64 (color, type) pairs or None in square order.
+    
+    castling is a mask of castling right bits and en_passant a square or None.
+    """
+    ranks = []
+    for row in range(8):
+        rank = ''
+        empty = 0
+        for piece in squares[row * 8:row * 8 + 8]:
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            color, piece_type = piece
+            letter = PIECE_FEN[piece_type]
+            rank += letter.upper() if color == 'white' else letter
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+    rights = ''.join(letter for letter, right in CASTLING_LETTERS if castling & right) or '-'
+    target = '-' if en_passant is None else square_name(divmod(en_passant, 8))
+    return f"{'/'.join(ranks)} {turn[0]} {rights} {target} {halfmove} {fullmove}"
+
+
+def parse_uci(text):
+    """Parse a UCI move such as 'e2e4' or 'e7e8q' into (from_pos, to_pos, promotion)."""
+    match = UCI_PATTERN.match(text.strip().lower())
+    if not match:
+        raise NotationError(f"Invalid UCI move '{text}'")
+    promotion = FEN_LETTERS[match.group(3)] if match.group(3) else None
+    return parse_square(match.group(1)), parse_square(match.group(2)), promotion
+
+
+def format_uci(move):
+    """Format a (from_pos, to_pos, promotion) move in UCI, such as 'e2e4' or 'e7e8q'."""
+    from_pos, to_pos, promotion = move
+    suffix = PIECE_FEN[promotion] if promotion else ''
+    return f"{square_name(from_pos)}{square_name(to_pos)}{suffix}"
+
+
+def format_san(game, move):
+    """Format a legal move in the game's current position as SAN, without a check suffix."""
+    from_pos, to_pos, promotion = move
+    piece_type = game.get_square(from_pos)['type']
+    if piece_type == 'King' and abs(to_pos[1] - from_pos[1]) == 2:
+        return 'O-O' if to_pos[1] == 6 else 'O-O-O'
+    capture = game.get_square(to_pos) is not None or (piece_type == 'Pawn' and from_pos[1] != to_pos[1])
+    destination = square_name(to_pos)
+    if piece_type == 'Pawn':
+        san = f"{FILES[from_pos[1]]}x{destination}" if capture else destination
+        if to_pos[0] in (0, 7):
+            san += '=' + PIECE_FEN[promotion or 'Queen'].upper()
+        return san
+    
+    # Qualify by file, then rank, then both when another piece of the same type can also move there
+    rivals = [
+        other for other, target, _ in game.legal_moves()
+        if target == to_pos and other != from_pos and game.get_square(other)['type'] == piece_type
+    ]
+    qualifier = ''
+    if rivals:
+        if all(other[1] != from_pos[1] for other in rivals):
+            qualifier = FILES[from_pos[1]]
+        elif all(other[0] != from_pos[0] for other in rivals):
+            qualifier = str(8 - from_pos[0])
+        else:
+            qualifier = square_name(from_pos)
+    return f"{PIECE_FEN[piece_type].upper()}{qualifier}{'x' if capture else ''}{destination}"
+
+
+def san_moves(game, moves):
+    """Make legal moves on game, lazily yielding each in SAN with '+' or '#' when it gives check."""
+    for move in moves:
+        san = format_san(game, move)
+        game.make_move(*move)
+        if game.game_status == 'checkmate':
+            san += '#'
+        elif game.game_status == 'check':
+            san += '+'
+        yield san
+
+
+def parse_san(game, text):
+    """Resolve a SAN move such as 'Nf3', 'exd5', 'O-O' or 'e8=Q' against the game's position."""
+    san = text.strip().rstrip('+#!?')
+    if san in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+        row = 7 if game.current_turn == 'white' else 0
+        from_pos, to_pos = (row, 4), (row, 6 if san in ('O-O', '0-0') else 2)
+        piece = game.get_square(from_pos)
+        if piece is None or piece['type'] != 'King' or not game.is_legal_move(from_pos, to_pos):
+            raise NotationError(f"Illegal move '{text}'")
+        return from_pos, to_pos, None
+    match = SAN_PATTERN.match(san)
+    if not match:
+        raise NotationError(f"Invalid SAN move '{text}'")
+    letter, from_file, from_rank, destination, promotion = match.groups()
+    if promotion:
+        promotion = PIECE_LETTERS[promotion[-1]]
+        if letter or promotion not in PROMOTION_PIECES:
+            raise NotationError(f"Invalid SAN move '{text}'")
+    
+    piece_type = PIECE_LETTERS.get(letter, 'Pawn')
+    to_pos = parse_square(destination)
+    candidates = []
+    for row in range(8):
+        if from_rank and row != 8 - int(from_rank):
+            continue
+        for col in range(8):
+            if from_file and col != FILES.index(from_file):
+                continue
+            piece = game.get_square((row, col))
+            if (piece and piece['type'] == piece_type and piece['color'] == game.current_turn
+                    and game.is_legal_move((row, col), to_pos)):
+                candidates.append((row, col))
+    
+    if not candidates:
+        raise NotationError(f"Illegal move '{text}'")
+    if len(candidates) > 1:
+        raise NotationError(f"Ambiguous move '{text}'")
+    return candidates[0], to_pos, promotion
+
+
+def resolve_moves(game, moves, notation='uci'):
+    """Lazily turn move strings into (from_pos, to_pos, promotion) moves for game.
+    
+    SAN depends on the position, so each move is resolved only when
+    requested, i.e. after the previous one has been applied.
+    """
+    if notation not in ('uci', 'san'):
+        raise NotationError(f"Unknown move format '{notation}'")
+    for text in moves:
+        if not isinstance(text, str):
+            raise NotationError(f"Moves must be strings, got {text!r}")
+        if notation == 'uci':
+            yield parse_uci(text)
+        else:
+            yield parse_san(game, text)
+
+
+def apply_move_strings(game, moves, notation='uci'):
+    """Apply move strings to game; return (number applied, error message or None)."""
+    before = len(game.move_history)
+    try:
+        applied, error = game.apply_moves(resolve_moves(game, moves, notation))
+    except NotationError as e:
+        applied, error = len(game.move_history) - before, str(e)
+    if error:
+        error = f"Move {before + applied + 1}: {error}"
+    return applied, error
+
+
+def _strip_movetext(text):
+    """Remove comments, variations and annotation glyphs from PGN movetext."""
+    out = []
+    depth = 0
+    in_comment = False
+    for line in text.splitlines():
+        if line.startswith('%'):
+            continue
+        for char in line:
+            if in_comment:
+                in_comment = char != '}'
+            elif char == '{':
+                in_comment = True
+            elif char == ';':
+                break
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth = max(depth - 1, 0)
+            elif depth == 0:
+                out.append(char)
+        out.append(' ')
+    return re.sub(r'\$\d+', ' ', ''.join(out))
+
+
+def format_pgn(headers, moves, result, fullmove=1, turn='white'):
+    """Build the PGN text of one game from its tag pairs, SAN moves and result.
+    
+    fullmove and turn give the move number and side to move of the first
+    move, for games that start from a FEN position. Movetext lines are
+    wrapped at 79 characters.
+    """
+    lines = []
+    for name, value in headers.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        lines.append(f'[{name} "{value}"]')
+    lines.append('')
+    
+    tokens = []
+    for san in moves:
+        if turn == 'white':
+            tokens.append(f"{fullmove}.")
+        elif not tokens:
+            tokens.append(f"{fullmove}...")
+        tokens.append(san)
+        if turn == 'black':
+            fullmove += 1
+        turn = 'black' if turn == 'white' else 'white'
+    tokens.append(result)
+    
+    line = ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 79:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def read_pgn(lines):
+    """Yield {'headers', 'moves', 'result'} for each game in PGN text lines.
+    
+    lines may be any iterable (such as an open file), so archives are read
+    one game at a time.
+    """
+    headers = {}
+    movetext = []
+    
+    def games_in(movetext):
+        moves = []
+        for token in _strip_movetext('\n'.join(movetext)).split():
+            token = MOVE_NUMBER_PATTERN.sub('', token)
+            if token in RESULTS:
+                yield moves, token
+                moves = []
+            elif token:
+                moves.append(token)
+        if moves:
+            yield moves, '*'
+    
+    for line in lines:
+        line = line.strip()
+        header = HEADER_PATTERN.match(line)
+        if header:
+            if movetext:
+                for moves, result in games_in(movetext):
+                    yield {'headers': headers, 'moves': moves, 'result': result}
+                headers, movetext = {}, []
+            headers[header.group(1)] = header.group(2)
+        elif line:
+            movetext.append(line)
+    
+    if movetext or headers:
+        found = False
+        for moves, result in games_in(movetext):
+            found = True
+            yield {'headers': headers, 'moves': moves, 'result': result}
+        if not found:
+            yield {'headers': headers, 'moves': [], 'result': '*'}
@@ -1,8 +1,54 @@
 """Chess piece classes and movement logic."""
 
+from attacks import KNIGHT_OFFSETS, KING_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS, QUEEN_DIRECTIONS
+
+
+def _straight_path_clear(row, col, target_row, target_col, board):
+    """Check rook-like movement: same row or column with nothing in between."""
+    if row == target_row:
+        step = 1 if target_col > col else -1
+        c = col + step
+        while c != target_col:
+            if board[row][c] is not None:
+                return False
+            c += step
+        return True
+    
+    if col == target_col:
+        step = 1 if target_row > row else -1
+        r = row + step
+        while r != target_row:
+            if board[r][col] is not None:
+                return False
+            r += step
+        return True
+    
+    return False
+
+
+def _diagonal_path_clear(row, col, target_row, target_col, board):
+    """Check bishop-like movement: same diagonal with nothing in between."""
+    if row == target_row or abs(target_row - row) != abs(target_col - col):
+        return False
+    
+    row_step = 1 if target_row > row else -1
+    col_step = 1 if target_col > col else -1
+    
+    current_row, current_col = row + row_step, col + col_step
+    while current_row != target_row:
+        if board[current_row][current_col] is not None:
+            return False
+        current_row += row_step
+        current_col += col_step
+    return True
+
+
 class Piece:
     """Base class for all chess pieces."""
     
+    # Pieces carry no per-instance dict; movement rules live on the classes
+    __slots__ = ('color', 'position', 'has_moved')
+    
     def __init__(self, color, position):
         self.color = color  # 'white' or 'black'
         self.position = position  # tuple (row, col)
@@ -12,6 +58,36 @@ class Piece:
         """Check if move to target position is valid."""
         raise NotImplementedError("Subclasses must implement is_valid_move")
     
+    def pseudo_legal_targets(self, board):
+        """Lazily yield target positions this piece can reach, ignoring checks."""
+        raise NotImplementedError("Subclasses must implement pseudo_legal_targets")
+    
+    def _step_targets(self, board, offsets):
+        """Yield single-step targets that are empty or hold an enemy piece."""
+        row, col = self.position
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                target_piece = board[r][c]
+                if target_piece is None or target_piece.color != self.color:
+                    yield (r, c)
+    
+    def _slide_targets(self, board, directions):
+        """Yield targets along each direction up to and including the first blocker."""
+        row, col = self.position
+        for dr, dc in directions:
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                target_piece = board[r][c]
+                if target_piece is None:
+                    yield (r, c)
+                else:
+                    if target_piece.color != self.color:
+                        yield (r, c)
+                    break
+                r += dr
+                c += dc
+    
     def __repr__(self):
         return f"{self.color[0].upper()}{self.__class__.__name__[0]}"
 
@@ -19,6 +95,8 @@ class Piece:
 class Pawn(Piece):
     """Pawn piece."""
     
+    __slots__ = ()
+    
     def is_valid_move(self, target_position, board):
         row, col = self.position
         target_row, target_col = target_position
@@ -37,39 +115,53 @@ class Pawn(Piece):
             return board[target_row][target_col] is not None and board[target_row][target_col].color != self.color
         
         return False
+    
+    def pseudo_legal_targets(self, board):
+        row, col = self.position
+        direction = -1 if self.color == 'white' else 1
+        next_row = row + direction
+        if not 0 <= next_row < 8:
+            return
+        
+        if board[next_row][col] is None:
+            yield (next_row, col)
+            two_row = row + 2 * direction
+            if not self.has_moved and 0 <= two_row < 8 and board[two_row][col] is None:
+                yield (two_row, col)
+        
+        for c in (col - 1, col + 1):
+            if 0 <= c < 8:
+                target_piece = board[next_row][c]
+                if target_piece is not None and target_piece.color != self.color:
+                    yield (next_row, c)
 
 
 class Rook(Piece):
     """Rook piece."""
     
+    __slots__ = ()
+    
     def is_valid_move(self, target_position, board):
         row, col = self.position
         target_row, target_col = target_position
         
-        # Must move in straight line
-        if row != target_row and col != target_col:
+        # Must move in straight line with a clear path
+        if not _straight_path_clear(row, col, target_row, target_col, board):
             return False
         
-        # Check path is clear
-        if row == target_row:
-            step = 1 if target_col > col else -1
-            for c in range(col + step, target_col, step):
-                if board[row][c] is not None:
-                    return False
-        else:
-            step = 1 if target_row > row else -1
-            for r in range(row + step, target_row, step):
-                if board[r][col] is not None:
-                    return False
-        
         # Check target square
         target_piece = board[target_row][target_col]
         return target_piece is None or target_piece.color != self.color
+    
+    def pseudo_legal_targets(self, board):
+        return self._slide_targets(board, ROOK_DIRECTIONS)
 
 
 class Knight(Piece):
     """Knight piece."""
     
+    __slots__ = ()
+    
     def is_valid_move(self, target_position, board):
         row, col = self.position
         target_row, target_col = target_position
@@ -83,47 +175,57 @@ class Knight(Piece):
         
         target_piece = board[target_row][target_col]
         return target_piece is None or target_piece.color != self.color
+    
+    def pseudo_legal_targets(self, board):
+        return self._step_targets(board, KNIGHT_OFFSETS)
 
 
 class Bishop(Piece):
     """Bishop piece."""
     
+    __slots__ = ()
+    
     def is_valid_move(self, target_position, board):
         row, col = self.position
         target_row, target_col = target_position
         
-        # Must move diagonally
-        if abs(target_row - row) != abs(target_col - col):
+        # Must move diagonally with a clear path
+        if not _diagonal_path_clear(row, col, target_row, target_col, board):
             return False
         
-        # Check path is clear
-        row_step = 1 if target_row > row else -1
-        col_step = 1 if target_col > col else -1
-        
-        current_row, current_col = row + row_step, col + col_step
-        while (current_row, current_col) != (target_row, target_col):
-            if board[current_row][current_col] is not None:
-                return False
-            current_row += row_step
-            current_col += col_step
-        
         target_piece = board[target_row][target_col]
         return target_piece is None or target_piece.color != self.color
+    
+    def pseudo_legal_targets(self, board):
+        return self._slide_targets(board, BISHOP_DIRECTIONS)
 
 
 class Queen(Piece):
     """Queen piece."""
     
+    __slots__ = ()
+    
     def is_valid_move(self, target_position, board):
+        row, col = self.position
+        target_row, target_col = target_position
+        
         # Queen moves like rook or bishop
-        rook = Rook(self.color, self.position)
-        bishop = Bishop(self.color, self.position)
-        return rook.is_valid_move(target_position, board) or bishop.is_valid_move(target_position, board)
+        if not (_straight_path_clear(row, col, target_row, target_col, board)
+                or _diagonal_path_clear(row, col, target_row, target_col, board)):
+            return False
+        
+        target_piece = board[target_row][target_col]
+        return target_piece is None or target_piece.color != self.color
+    
+    def pseudo_legal_targets(self, board):
+        return self._slide_targets(board, QUEEN_DIRECTIONS)
 
 
 class King(Piece):
     """King piece."""
     
+    __slots__ = ()
+    
     def is_valid_move(self, target_position, board):
         row, col = self.position
         target_row, target_col = target_position
@@ -134,3 +236,6 @@ class King(Piece):
         
         target_piece = board[target_row][target_col]
         return target_piece is None or target_piece.color != self.color
+    
+    def pseudo_legal_targets(self, board):
+        return self._step_targets(board, KING_OFFSETS)
@@ -0,0 +1,60 @@
+"""Castling, promotion and draw rules shared by both board implementations.
+
+Squares are indexed 0-63 as ``row * 8 + col`` (row 0 is Black's back
+rank). Castling rights are a 4-bit mask, so a position's rights are one
+integer that is cheap to copy, compare and hash.
+"""
+
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+ALL_CASTLING = 15
+# FEN letter for each castling right, in FEN order
+CASTLING_LETTERS = (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE))
+
+# King destination -> (right, king from, rook from, rook to, squares that
+# must be empty, squares the king stands on or crosses that must not be attacked)
+CASTLING_MOVES = {
+    62: (WHITE_KINGSIDE, 60, 63, 61, (61, 62), (60, 61, 62)),
+    58: (WHITE_QUEENSIDE, 60, 56, 59, (57, 58, 59), (60, 59, 58)),
+    6: (BLACK_KINGSIDE, 4, 7, 5, (5, 6), (4, 5, 6)),
+    2: (BLACK_QUEENSIDE, 4, 0, 3, (1, 2, 3), (4, 3, 2)),
+}
+# King destinations by color
+CASTLING_TARGETS = {'white': (62, 58), 'black': (6, 2)}
+
+
+def _castling_masks():
+    masks = [ALL_CASTLING] * 64
+    for right, king_from, rook_from, _, _, _ in CASTLING_MOVES.values():
+        masks[king_from] &= ~right
+        masks[rook_from] &= ~right
+    return tuple(masks)
+
+
+# Rights that survive a move from or to each square: moving the king or a
+# rook, or capturing a rook on its home square, loses the matching rights
+CASTLING_MASKS = _castling_masks()
+
+# Pieces a pawn may promote to, most useful first
+PROMOTION_PIECES = ('Queen', 'Rook', 'Bishop', 'Knight')
+
+# Plies without a capture or pawn move after which the game is drawn
+FIFTY_MOVE_PLIES = 100
+# Occurrences of the same position that draw the game
+REPETITION_LIMIT = 3
+
+GAME_OVER = ('checkmate', 'stalemate', 'draw')
+
+
+def is_draw(halfmove_clock, hash_history):
+    """Whether the fifty-move rule or threefold repetition draws the game.
+    
+    hash_history ends with the current position. Only positions since the
+    last capture or pawn move with the same side to move can repeat it, so
+    at most every other one of the last halfmove_clock hashes is compared.
+    """
+    if halfmove_clock >= FIFTY_MOVE_PLIES:
+        return True
+    if halfmove_clock < 2 * (REPETITION_LIMIT - 1):
+        return False
+    current = hash_history[-1]
+    return hash_history[-1:-2 - halfmove_clock:-2].count(current) >= REPETITION_LIMIT
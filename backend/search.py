@@ -0,0 +1,358 @@
+"""Alpha-beta search for the built-in engine opponent.
+
+``search(board, time_ms)`` picks a move for the side to move on a
+``ChessBoard`` using negamax alpha-beta with iterative deepening, a
+transposition table, MVV-LVA and killer move ordering, and a quiescence
+search over captures. Moves are made and taken back in place with the
+board's ``_push``/``_pop``, so no positions are copied.
+
+The deadline is checked every few dozen nodes and an interrupted iteration
+is abandoned, so a search overruns its budget by well under a millisecond.
+"""
+
+import time
+
+from attacks import square
+from rules import CASTLING_MOVES
+
+PIECE_VALUES = {'Pawn': 100, 'Knight': 320, 'Bishop': 330, 'Rook': 500, 'Queen': 900, 'King': 0}
+MATE_SCORE = 100000
+MAX_PLY = 64
+MAX_DEPTH = 32
+# Nodes between deadline checks
+CHECK_INTERVAL = 32
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Piece-square tables from white's point of view, a8 first (row 0 is rank 8)
+PIECE_SQUARE_TABLES = {
+    'Pawn': (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0
+    ),
+    'Knight': (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50
+    ),
+    'Bishop': (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20
+    ),
+    'Rook': (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0
+    ),
+    'Queen': (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20
+    ),
+    'King': (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20
+    ),
+}
+
+# Material plus placement for (color, type) by square, positive for white;
+# black reads the white table mirrored top to bottom
+SCORES = {}
+for _name, _table in PIECE_SQUARE_TABLES.items():
+    SCORES[('white', _name)] = tuple(PIECE_VALUES[_name] + bonus for bonus in _table)
+    SCORES[('black', _name)] = tuple(-(PIECE_VALUES[_name] + _table[sq ^ 56]) for sq in range(64))
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline has passed."""
+
+
+def evaluate(board):
+    """Static evaluation in centipawns, positive when white is better."""
+    score = 0
+    for row in board.board:
+        for piece in row:
+            if piece:
+                score += SCORES[(piece.color, piece.__class__.__name__)][square(piece.position)]
+    return score
+
+
+class Searcher:
+    """State for one search: node count, transposition table and killer moves."""
+    
+    def __init__(self, board, deadline):
+        self.board = board
+        self.deadline = deadline
+        self.nodes = 0
+        # zobrist hash -> (depth, score, flag, best move)
+        self.table = {}
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        # White-relative evaluation, updated incrementally by _make/_unmake
+        self.score = evaluate(board)
+    
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+    
+    def _ordered_moves(self, ply, best_move, captures_only=False):
+        """Pseudo-legal moves for the side to move, most promising first.
+        
+        Promotions and en passant count as captures, so quiescence sees them.
+        """
+        board = self.board
+        grid = board.board
+        killers = self.killers[ply]
+        scored = []
+        for move in board._pseudo_moves(board.current_turn):
+            from_pos, to_pos, promotion = move
+            piece = grid[from_pos[0]][from_pos[1]]
+            victim = grid[to_pos[0]][to_pos[1]]
+            if victim is None and piece.__class__.__name__ == 'Pawn' and from_pos[1] != to_pos[1]:
+                victim = piece
+            if move == best_move:
+                order = 1 << 21
+            elif victim is not None or promotion is not None:
+                # Most valuable victim (or promotion piece), then least valuable attacker
+                gain = PIECE_VALUES[victim.__class__.__name__] if victim is not None else 0
+                if promotion is not None:
+                    gain += PIECE_VALUES[promotion]
+                order = (1 << 20) + gain * 16 - PIECE_VALUES[piece.__class__.__name__] // 16
+            elif captures_only:
+                continue
+            elif move in killers:
+                order = 1 << 19
+            else:
+                order = 0
+            scored.append((order, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+    
+    def _make(self, move):
+        """Make a move and return (undo record, evaluation change) or None if it is illegal."""
+        from_pos, to_pos, promotion = move
+        board = self.board
+        piece = board.board[from_pos[0]][from_pos[1]]
+        captured = board.board[to_pos[0]][to_pos[1]]
+        color, name = piece.color, piece.__class__.__name__
+        from_sq, to_sq = square(from_pos), square(to_pos)
+        placed = name
+        if name == 'Pawn' and to_pos[0] in (0, 7):
+            placed = promotion or 'Queen'
+        delta = SCORES[(color, placed)][to_sq] - SCORES[(color, name)][from_sq]
+        if captured:
+            delta -= SCORES[(captured.color, captured.__class__.__name__)][to_sq]
+        elif name == 'Pawn' and from_pos[1] != to_pos[1]:
+            # En passant: the captured pawn stands beside the moving one
+            opponent = 'black' if color == 'white' else 'white'
+            delta -= SCORES[(opponent, 'Pawn')][square((from_pos[0], to_pos[1]))]
+        elif name == 'King' and abs(to_pos[1] - from_pos[1]) == 2:
+            _, _, rook_from, rook_to, _, _ = CASTLING_MOVES[to_sq]
+            rook = SCORES[(color, 'Rook')]
+            delta += rook[rook_to] - rook[rook_from]
+        
+        record = board._push(from_pos, to_pos, promotion)
+        if board._is_in_check(color):
+            board._pop(record)
+            return None
+        self.score += delta
+        return record, delta
+    
+    def _unmake(self, undo):
+        record, delta = undo
+        self.board._pop(record)
+        self.score -= delta
+    
+    def _relative_score(self):
+        return self.score if self.board.current_turn == 'white' else -self.score
+    
+    def root(self, depth):
+        """Search the root position to depth; return (score, best move)."""
+        entry = self.table.get(self.board.zobrist_hash)
+        best_move = entry[3] if entry else None
+        alpha, beta = -MATE_SCORE - 1, MATE_SCORE + 1
+        root_move = None
+        for move in self._ordered_moves(0, best_move):
+            undo = self._make(move)
+            if undo is None:
+                continue
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, 1)
+            finally:
+                self._unmake(undo)
+            if score > alpha:
+                alpha = score
+                root_move = move
+        if root_move is not None:
+            self.table[self.board.zobrist_hash] = (depth, alpha, EXACT, root_move)
+        return alpha, root_move
+    
+    def negamax(self, depth, alpha, beta, ply):
+        """Score the position for the side to move within the (alpha, beta) window."""
+        self._tick()
+        board = self.board
+        color = board.current_turn
+        in_check = board._is_in_check(color)
+        if in_check:
+            # Check extension: never stop the search while in check
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiesce(alpha, beta, ply)
+        
+        key = board.zobrist_hash
+        entry = self.table.get(key)
+        best_move = None
+        if entry is not None:
+            entry_depth, entry_score, flag, best_move = entry
+            if entry_depth >= depth:
+                entry_score = _score_from_table(entry_score, ply)
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER and entry_score >= beta:
+                    return entry_score
+                if flag == UPPER and entry_score <= alpha:
+                    return entry_score
+        
+        original_alpha = alpha
+        best_score = -MATE_SCORE - 1
+        for move in self._ordered_moves(ply, best_move):
+            undo = self._make(move)
+            if undo is None:
+                continue
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                self._unmake(undo)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                to_pos = move[1]
+                if board.board[to_pos[0]][to_pos[1]] is None:
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                break
+        
+        if best_score == -MATE_SCORE - 1:
+            # No legal moves: checkmate, or stalemate
+            return -MATE_SCORE + ply if in_check else 0
+        
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, _score_to_table(best_score, ply), flag, best_move)
+        return best_score
+    
+    def quiesce(self, alpha, beta, ply):
+        """Search captures only until the position is quiet."""
+        self._tick()
+        stand_pat = self._relative_score()
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        for move in self._ordered_moves(ply, None, captures_only=True):
+            undo = self._make(move)
+            if undo is None:
+                continue
+            try:
+                score = -self.quiesce(-beta, -alpha, ply + 1)
+            finally:
+                self._unmake(undo)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def _score_to_table(score, ply):
+    """Store mate scores relative to the node rather than the root."""
+    if score > MATE_SCORE - MAX_PLY:
+        return score + ply
+    if score < -MATE_SCORE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def _score_from_table(score, ply):
+    if score > MATE_SCORE - MAX_PLY:
+        return score - ply
+    if score < -MATE_SCORE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def search(board, time_ms, max_depth=MAX_DEPTH):
+    """Find a move for the side to move within time_ms milliseconds.
+    
+    Returns a dict with the move as (from_pos, to_pos, promotion) (None if there are
+    no legal moves), its score in centipawns for the side to move, the
+    deepest completed depth, and nodes, nodes per second and elapsed time.
+    The board is searched in place and restored before returning.
+    """
+    start = time.perf_counter()
+    searcher = Searcher(board, start + time_ms / 1000)
+    best_move, best_score, completed = None, 0, 0
+    for depth in range(1, max_depth + 1):
+        try:
+            best_score, best_move = searcher.root(depth)
+        except SearchTimeout:
+            # The interrupted iteration's scores are only bounds; keep the
+            # move and score of the last completed one together
+            break
+        completed = depth
+        if best_move is None or abs(best_score) > MATE_SCORE - MAX_PLY:
+            break
+    
+    if best_move is None:
+        best_move = next(board.generate_moves(), None)
+    elapsed = time.perf_counter() - start
+    return {
+        'move': best_move,
+        'score': best_score,
+        'depth': completed,
+        'nodes': searcher.nodes,
+        'nps': int(searcher.nodes / elapsed) if elapsed else 0,
+        'time_ms': round(elapsed * 1000, 1)
+    }
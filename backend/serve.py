@@ -0,0 +1,138 @@
+"""Production server: pre-forked workers that share warmed-up tables.
+
+Usage:
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 5001] [--access-log]
+
+The parent process imports the app and every engine module, which builds
+the attack tables, Zobrist keys and other precomputed data, maps the
+opening book if CHESS_OPENING_BOOK is set, and moves all of it out of
+the garbage collector's reach with gc.freeze(). It then forks the
+workers. Workers share those pages copy-on-write, and each only has to
+build its app, so a new worker serves within milliseconds of the fork.
+A worker that dies is replaced.
+
+Worker i listens on port + i and allocates game IDs of the form
+game_<i>_<hex>. A game lives in the memory of the worker that created
+it, so put a proxy in front that sends each request for a game to the
+port named in its ID (see Storage in API.md). Settings come from the same
+CHESS_* environment variables as app.py.
+
+Each worker serves with werkzeug's threaded WSGI server rather than a
+server like gunicorn, whose workers share one listening socket: routing
+by game ID needs every worker on a port of its own. The proxy in front
+is expected to handle TLS, slow clients and request buffering. SIGTERM or SIGINT stops the workers,
+and each flushes its games before it exits. Requires os.fork (Unix).
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import sys
+import threading
+
+from werkzeug.serving import make_server
+
+import book
+from app import close_app, create_app, load_config
+
+
+def preload(config):
+    """Build everything workers can share before they are forked."""
+    # Imported by the first engine pool; load it here so workers share it
+    import concurrent.futures.process
+    from bitboard import BitboardChessBoard
+    from board import ChessBoard
+    
+    # One board of each engine creates any state left to first use
+    ChessBoard()
+    BitboardChessBoard()
+    if config['CHESS_OPENING_BOOK']:
+        book.load(config['CHESS_OPENING_BOOK'])
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(host, port, config, access_log=False):
+    """Serve one worker until SIGTERM or SIGINT; runs in the forked child."""
+    if not access_log:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    app = create_app(config)
+    server = make_server(host, port, app, threaded=True)
+    
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever(), which runs in this thread
+        threading.Thread(target=server.shutdown).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        close_app(app)
+
+
+def fork_worker(host, port, config, access_log=False):
+    """Fork a worker serving on port; return its process ID."""
+    pid = os.fork()
+    if pid:
+        return pid
+    # Drop the parent's handlers before anything else can receive a signal
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        run_worker(host, port, config, access_log)
+    except BaseException:
+        code = 1
+        sys.excepthook(*sys.exc_info())
+    finally:
+        os._exit(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-forking chess API server')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001, help='port of the first worker')
+    parser.add_argument('--access-log', action='store_true', help='log every request to stderr')
+    args = parser.parse_args()
+    
+    config = load_config()
+    preload(config)
+    
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+    
+    def start(index):
+        # Worker index goes into the worker's game IDs
+        worker_config = dict(config, CHESS_WORKER=index)
+        workers[fork_worker(args.host, args.port + index, worker_config, args.access_log)] = index
+    
+    workers = {}
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(args.workers):
+        start(index)
+    print(f"Serving {args.workers} worker(s) on ports {args.port}-{args.port + args.workers - 1}", flush=True)
+    
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"Worker {index} exited; restarting it", file=sys.stderr)
+            start(index)
+
+
+if __name__ == '__main__':
+    main()
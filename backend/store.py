@@ -0,0 +1,647 @@
+"""Game storage: an in-memory hot tier backed by SQLite.
+
+Recently used games live in memory as board objects. Every game is also
+persisted to SQLite as its engine name, starting FEN (NULL for the standard
+starting position) and a compact move list (two bytes per move), and is
+rebuilt by replaying those moves when it is loaded again.
+Writes are deferred and flushed in batches (write-behind), so a move costs
+no disk I/O on the request path. The last known game status is stored
+alongside, so finished games can be listed without replaying them.
+
+Finished games that sit idle are compacted into a frozen tier holding
+only that same packed form, a few hundred bytes instead of a full board,
+and rebuilt on their next access.
+"""
+
+import gc
+import logging
+import re
+import sqlite3
+import threading
+import sys
+import time
+import types
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from board import ChessBoard
+from bitboard import BitboardChessBoard
+from rules import GAME_OVER, PROMOTION_PIECES
+
+logger = logging.getLogger(__name__)
+
+UPSERT = ('INSERT OR REPLACE INTO games (game_id, engine, moves, updated_at, start_fen, game_status) '
+          'VALUES (?, ?, ?, ?, ?, ?)')
+
+# Game IDs allocated by a numbered worker: game_<worker>_<random hex>
+WORKER_ID_PATTERN = re.compile(r'^game_(\d+)_[0-9a-f]+$')
+
+# Board implementations selectable per game
+ENGINES = {
+    'object': ChessBoard,
+    'bitboard': BitboardChessBoard
+}
+
+
+def pack_move(move):
+    """Pack a (from_pos, to_pos, promotion) move into two bytes (from square, to square).
+    
+    Squares use the low six bits. A promotion sets bit 6 of the from byte
+    and stores the index of the piece in PROMOTION_PIECES in the top two
+    bits of the to byte, so lists packed before promotion existed still
+    unpack unchanged. The opening book stores its moves the same way.
+    """
+    (from_row, from_col), (to_row, to_col), promotion = move
+    if promotion is None:
+        return bytes((from_row * 8 + from_col, to_row * 8 + to_col))
+    return bytes((from_row * 8 + from_col | 0x40, to_row * 8 + to_col | PROMOTION_PIECES.index(promotion) << 6))
+
+
+def unpack_move(data, offset=0):
+    """Unpack the two-byte move at offset into (from_pos, to_pos, promotion)."""
+    from_byte, to_byte = data[offset], data[offset + 1]
+    promotion = PROMOTION_PIECES[to_byte >> 6] if from_byte & 0x40 else None
+    return divmod(from_byte & 0x3f, 8), divmod(to_byte & 0x3f, 8), promotion
+
+
+def pack_moves(move_history):
+    """Pack a move history into two bytes per move with pack_move()."""
+    return b''.join([pack_move((move['from'], move['to'], move.get('promotion'))) for move in move_history])
+
+
+def unpack_moves(packed):
+    """Yield (from_pos, to_pos, promotion) moves from a packed move list."""
+    for offset in range(0, len(packed), 2):
+        yield unpack_move(packed, offset)
+
+
+def game_worker(game_id):
+    """The index of the worker that created game_id, or None if the ID names no worker."""
+    match = WORKER_ID_PATTERN.match(game_id)
+    return int(match.group(1)) if match else None
+
+
+def replay(engine, packed, fen=None):
+    """Rebuild a board by replaying a packed move list from its starting position."""
+    game = ENGINES[engine](fen)
+    applied, error = game.apply_moves(unpack_moves(packed))
+    if error:
+        raise ValueError(f"Corrupt move list at move {applied + 1}: {error}")
+    return game
+
+
+class _HotEntry:
+    __slots__ = ('game', 'engine', 'last_access', 'dirty', 'lock', 'pins')
+    
+    def __init__(self, game, engine):
+        self.game = game
+        self.engine = engine
+        self.last_access = time.monotonic()
+        self.dirty = False
+        # Serializes every request touching this game; other games are unaffected
+        self.lock = threading.RLock()
+        # Requests currently using the entry; pinned entries are never evicted
+        self.pins = 0
+
+
+class _FrozenEntry:
+    __slots__ = ('engine', 'moves', 'start_fen', 'game_status')
+    
+    def __init__(self, engine, moves, start_fen, game_status):
+        self.engine = engine
+        self.moves = moves
+        self.start_fen = start_fen
+        self.game_status = game_status
+
+
+# Shared objects a game refers to but does not own
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+
+
+def deep_sizeof(obj):
+    """Approximate bytes held by obj and every object reachable from it.
+    
+    Classes, modules and functions are shared by every game and not counted.
+    """
+    seen = set()
+    pending = [obj]
+    size = 0
+    while pending:
+        current = pending.pop()
+        if id(current) in seen or isinstance(current, _SHARED_TYPES):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        pending.extend(gc.get_referents(current))
+    return size
+
+
+class GameStore:
+    """Stores games in an LRU hot tier with an optional SQLite cold tier.
+    
+    Args:
+        db_path: SQLite file for the cold tier, or None to keep games in
+            memory only (evicted games are then lost).
+        max_hot: Maximum number of games held in memory as boards.
+        idle_ttl: Seconds after which an untouched game is evicted from memory.
+        freeze_after: Seconds after which an untouched finished game is
+            compacted into the frozen tier.
+        max_frozen: Maximum number of frozen games; the least recently
+            frozen are dropped first (and lost without SQLite).
+        flush_interval: Seconds between background write-behind flushes.
+        flush_batch: Number of dirty games that wakes the flusher thread early.
+        worker: Index of this worker process when there are several, put in
+            every game ID it allocates so requests can be routed back to it.
+    
+    Requests should access games through ``locked()``, which holds that
+    game's own lock; the store-wide lock only guards the hot-tier index and
+    is never held while a game is being read or changed.
+    
+    A game is owned by the process holding it in memory, so deployments with
+    several workers should route requests for a game to the worker named in
+    its ID (see game_worker()).
+    """
+    
+    def __init__(self, db_path=None, max_hot=10000, idle_ttl=3600,
+                 flush_interval=1.0, flush_batch=100, freeze_after=60, max_frozen=100000, worker=None):
+        self.db_path = db_path
+        self.worker = worker
+        self.max_hot = max_hot
+        self.idle_ttl = idle_ttl
+        self.freeze_after = freeze_after
+        self.max_frozen = max_frozen
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._hot = OrderedDict()
+        self._frozen = OrderedDict()
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._flusher = None
+        self._stopped = threading.Event()
+        # Set to have the flusher thread run before its next interval
+        self._wake = threading.Event()
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS games ('
+                'game_id TEXT PRIMARY KEY, engine TEXT NOT NULL, '
+                'moves BLOB NOT NULL, updated_at REAL NOT NULL, start_fen TEXT, game_status TEXT)'
+            )
+            columns = [row[1] for row in self._db.execute('PRAGMA table_info(games)')]
+            for column in ('start_fen', 'game_status'):
+                if column not in columns:
+                    self._db.execute(f'ALTER TABLE games ADD COLUMN {column} TEXT')
+            self._db.commit()
+    
+    def new_game_id(self):
+        """Allocate a game ID that is unique across processes and restarts, naming this worker if set."""
+        if self.worker is None:
+            return f"game_{uuid.uuid4().hex[:16]}"
+        return f"game_{self.worker}_{uuid.uuid4().hex[:16]}"
+    
+    def create(self, engine='object', fen=None):
+        """Create and store a new game, returning (game_id, game).
+        
+        Raises NotationError if fen is given and invalid.
+        """
+        game = ENGINES[engine](fen)
+        return self.add(game, engine), game
+    
+    def add(self, game, engine):
+        """Store an already built game under a new ID and return the ID."""
+        game_id = self.new_game_id()
+        entry = _HotEntry(game, engine)
+        entry.dirty = True
+        with self._lock:
+            self._hot[game_id] = entry
+            self._dirty.add(game_id)
+            flush_due = self._evict_overflow() or len(self._dirty) >= self.flush_batch
+        if flush_due:
+            self._request_flush()
+        return game_id
+    
+    def import_packed(self, engine, games):
+        """Store already validated games given as (packed moves, start FEN, status) triples; return their IDs.
+        
+        With SQLite the games are written straight to the cold tier in one
+        transaction and only replayed when first requested.
+        """
+        games = list(games)
+        game_ids = [self.new_game_id() for _ in games]
+        if self._db is None:
+            for game_id, (packed, fen, _) in zip(game_ids, games):
+                with self._lock:
+                    self._hot[game_id] = _HotEntry(replay(engine, packed, fen), engine)
+                    flush_due = self._evict_overflow()
+                if flush_due:
+                    self._request_flush()
+            return game_ids
+        now = time.time()
+        with self._db_lock, self._db:
+            self._db.executemany(
+                'INSERT INTO games (game_id, engine, moves, updated_at, start_fen, game_status) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(game_id, engine, packed, now, fen, status) for game_id, (packed, fen, status) in zip(game_ids, games)]
+            )
+        return game_ids
+    
+    @contextmanager
+    def locked(self, game_id):
+        """Hold a game's lock for the duration of the block.
+        
+        Yields the game, or None if it does not exist. The game stays in
+        memory until the block exits.
+        """
+        entry = self._pin(game_id)
+        if entry is None:
+            yield None
+            return
+        try:
+            with entry.lock:
+                yield entry.game
+        finally:
+            with self._lock:
+                entry.pins -= 1
+    
+    def get(self, game_id):
+        """Return the game with this ID, loading it from SQLite if needed, or None.
+        
+        The game is not locked; use locked() to read or change it safely.
+        """
+        entry = self._pin(game_id)
+        if entry is None:
+            return None
+        with self._lock:
+            entry.pins -= 1
+        return entry.game
+    
+    def _pin(self, game_id):
+        with self._lock:
+            entry = self._hot.get(game_id)
+            if entry is not None:
+                return self._use(game_id, entry)
+            
+            frozen = self._frozen.get(game_id)
+        
+        # Replay outside the store lock so loading one game never stalls others
+        if frozen is not None:
+            row = frozen.engine, frozen.moves, frozen.start_fen
+        else:
+            row = self._load_row(game_id)
+            if row is None:
+                return None
+        engine, packed, fen = row
+        loaded = _HotEntry(replay(engine, packed, fen), engine)
+        with self._lock:
+            # Another request may have loaded the game meanwhile; keep its copy
+            entry = self._hot.setdefault(game_id, loaded)
+            self._frozen.pop(game_id, None)
+            entry = self._use(game_id, entry)
+            flush_due = self._evict_overflow()
+        if flush_due:
+            self._request_flush()
+        return entry
+    
+    def _use(self, game_id, entry):
+        self._hot.move_to_end(game_id)
+        entry.last_access = time.monotonic()
+        entry.pins += 1
+        return entry
+    
+    def __contains__(self, game_id):
+        with self._lock:
+            if game_id in self._hot or game_id in self._frozen:
+                return True
+        return self._load_row(game_id) is not None
+    
+    def __len__(self):
+        """Number of games currently held in memory."""
+        return len(self._hot)
+    
+    def frozen_count(self):
+        """Number of finished games held in memory in frozen form."""
+        return len(self._frozen)
+    
+    def memory_usage(self, sample=20):
+        """Approximate bytes held by each in-memory tier, as {'hot': n, 'frozen': n}.
+        
+        Hot games are costly to measure, so up to sample of the most
+        recently used are measured and the average is scaled up. Frozen
+        games are counted exactly.
+        """
+        with self._lock:
+            entries = list(self._hot.values())
+            frozen = list(self._frozen.values())
+        hot = 0
+        measured = entries[-sample:]
+        for entry in measured:
+            with entry.lock:
+                hot += deep_sizeof(entry.game)
+        if measured:
+            hot = hot * len(entries) // len(measured)
+        frozen_size = sum(sys.getsizeof(entry) + sys.getsizeof(entry.moves) + sys.getsizeof(entry.start_fen)
+                          for entry in frozen)
+        return {'hot': hot, 'frozen': frozen_size}
+    
+    def dirty_count(self):
+        """Number of games changed since the last flush."""
+        return len(self._dirty)
+    
+    def mark_dirty(self, game_id):
+        """Record that a game changed so the next flush persists it."""
+        with self._lock:
+            entry = self._hot.get(game_id)
+            if entry is None:
+                return
+            entry.dirty = True
+            self._dirty.add(game_id)
+            flush_due = len(self._dirty) >= self.flush_batch
+        if flush_due:
+            self._request_flush()
+    
+    def _request_flush(self):
+        """Have dirty games flushed soon. Called without holding _lock.
+        
+        With the flusher thread running it is woken up, so the request path
+        does no disk I/O; otherwise the caller flushes, then evicts any games
+        that unflushed changes kept in memory.
+        """
+        if self._flusher is not None:
+            self._wake.set()
+            return
+        self.flush()
+        with self._lock:
+            self._evict_overflow()
+    
+    def flush(self):
+        """Write every dirty game to SQLite in one transaction.
+        
+        Games whose lock is busy are left dirty for the next flush rather
+        than waiting on a request in progress. A game stops being dirty only
+        once its row is committed. A game that cannot be packed is logged
+        and kept in memory, and is tried again when it next changes.
+        """
+        with self._lock:
+            if not self._dirty:
+                return 0
+            pending = [(game_id, self._hot.get(game_id)) for game_id in self._dirty]
+        
+        rows = []
+        entries = {}
+        dropped = []
+        for game_id, entry in pending:
+            if entry is None:
+                dropped.append(game_id)
+                continue
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                entry.dirty = False
+                game = entry.game
+                rows.append((game_id, entry.engine, pack_moves(game.move_history), time.time(),
+                             game.start_fen, game.game_status))
+                entries[game_id] = entry
+            except Exception:
+                # Still dirty, so it is never evicted and lost
+                entry.dirty = True
+                dropped.append(game_id)
+                logger.exception("Cannot persist game %s", game_id)
+            finally:
+                entry.lock.release()
+        
+        written = set(self._write_rows(rows))
+        with self._lock:
+            self._dirty.difference_update(dropped)
+            for game_id, entry in entries.items():
+                if game_id not in written:
+                    entry.dirty = True
+                elif not entry.dirty:
+                    # Not changed again since its row was built
+                    self._dirty.discard(game_id)
+        return len(written)
+    
+    def _write_rows(self, rows):
+        """Write rows in one transaction, or one at a time if that fails; return the IDs written."""
+        if self._db is None or not rows:
+            return [row[0] for row in rows]
+        try:
+            with self._db_lock, self._db:
+                self._db.executemany(UPSERT, rows)
+            return [row[0] for row in rows]
+        except sqlite3.Error:
+            # Write them one by one so a single bad row only holds back itself
+            pass
+        written = []
+        for row in rows:
+            try:
+                with self._db_lock, self._db:
+                    self._db.execute(UPSERT, row)
+                written.append(row[0])
+            except sqlite3.Error:
+                logger.exception("Cannot persist game %s", row[0])
+        return written
+    
+    def evict_idle(self):
+        """Drop games untouched for longer than idle_ttl from memory, flushing them first if needed."""
+        cutoff = time.monotonic() - self.idle_ttl
+        
+        def idle():
+            return [game_id for game_id, entry in self._hot.items() if entry.last_access < cutoff]
+        
+        self._flush_if_dirty(idle)
+        with self._lock:
+            return self._evict(idle())
+    
+    def compact_finished(self):
+        """Move finished games untouched for longer than freeze_after to the frozen tier.
+        
+        A frozen game keeps only its packed moves, starting FEN and status;
+        its board is rebuilt by replaying them the next time it is used.
+        """
+        cutoff = time.monotonic() - self.freeze_after
+        
+        def finished():
+            return [game_id for game_id, entry in self._hot.items()
+                    if entry.last_access < cutoff and entry.pins == 0
+                    and entry.game.game_status in GAME_OVER]
+        
+        self._flush_if_dirty(finished)
+        with self._lock:
+            frozen = 0
+            for game_id in finished():
+                entry = self._hot[game_id]
+                if entry.dirty or not entry.lock.acquire(blocking=False):
+                    continue
+                try:
+                    game = entry.game
+                    self._frozen[game_id] = _FrozenEntry(entry.engine, pack_moves(game.move_history),
+                                                         game.start_fen, game.game_status)
+                finally:
+                    entry.lock.release()
+                del self._hot[game_id]
+                frozen += 1
+            while len(self._frozen) > self.max_frozen:
+                self._frozen.popitem(last=False)
+            return frozen
+    
+    def _flush_if_dirty(self, select):
+        """Flush, outside _lock, if any game select() picks from the hot tier has unflushed changes."""
+        with self._lock:
+            dirty = any(self._hot[game_id].dirty for game_id in select())
+        if dirty:
+            self.flush()
+    
+    def _evict_overflow(self):
+        """Evict the least recently used games beyond max_hot. Caller holds _lock.
+        
+        Returns True if games in use or with unflushed changes kept the hot
+        tier over max_hot, so the caller should request a flush once it
+        releases _lock.
+        """
+        overflow = len(self._hot) - self.max_hot
+        if overflow <= 0:
+            return False
+        self._evict(list(self._hot)[:overflow])
+        return len(self._hot) > self.max_hot
+    
+    def _evict(self, game_ids):
+        """Drop games from memory, skipping any in use or with unflushed changes. Caller holds _lock.
+        
+        Never flushes, so no disk I/O happens under the store lock; games
+        left behind are evicted by a later pass once they have been flushed.
+        """
+        evicted = 0
+        for game_id in game_ids:
+            entry = self._hot[game_id]
+            if entry.pins == 0 and not entry.dirty:
+                del self._hot[game_id]
+                evicted += 1
+        return evicted
+    
+    def _load_row(self, game_id):
+        if self._db is None:
+            return None
+        with self._db_lock:
+            return self._db.execute(
+                'SELECT engine, moves, start_fen FROM games WHERE game_id = ?', (game_id,)
+            ).fetchone()
+    
+    def iter_games(self, after=None, statuses=None, batch_size=500):
+        """Lazily yield stored games in game ID order as dicts, without replaying them.
+        
+        Each dict has game_id, engine, moves (packed), start_fen,
+        game_status and updated_at. Only games with an ID greater than after
+        are yielded, so the last ID seen is a resume cursor; statuses
+        restricts the game_status values. Rows are read batch_size at a time
+        and the database lock is only held while a batch is read, so a full
+        export runs in constant memory next to normal traffic. Rows are read
+        as last written by the flusher thread, which is woken first but not
+        waited for: games changed within the last flush interval may be
+        missing or out of date, as may changes made during the export.
+        """
+        if self._db is None:
+            yield from self._iter_hot_games(after, statuses)
+            return
+        self._request_flush()
+        query = 'SELECT game_id, engine, moves, start_fen, game_status, updated_at FROM games WHERE game_id > ?'
+        if statuses:
+            query += f" AND game_status IN ({', '.join('?' * len(statuses))})"
+        query += ' ORDER BY game_id LIMIT ?'
+        cursor = after or ''
+        while True:
+            with self._db_lock:
+                if self._db is None:
+                    return
+                rows = self._db.execute(query, (cursor, *(statuses or ()), batch_size)).fetchall()
+            for game_id, engine, packed, fen, status, updated_at in rows:
+                yield {
+                    'game_id': game_id,
+                    'engine': engine,
+                    'moves': packed,
+                    'start_fen': fen,
+                    'game_status': status,
+                    'updated_at': updated_at
+                }
+            if len(rows) < batch_size:
+                return
+            cursor = rows[-1][0]
+    
+    def _iter_hot_games(self, after, statuses):
+        """iter_games() for a store without SQLite, reading the in-memory games."""
+        with self._lock:
+            game_ids = sorted(game_id for game_id in (*self._hot, *self._frozen)
+                              if after is None or game_id > after)
+        for game_id in game_ids:
+            with self._lock:
+                entry = self._hot.get(game_id)
+                frozen = self._frozen.get(game_id)
+            if entry is None:
+                if frozen is not None and (not statuses or frozen.game_status in statuses):
+                    yield {
+                        'game_id': game_id,
+                        'engine': frozen.engine,
+                        'moves': frozen.moves,
+                        'start_fen': frozen.start_fen,
+                        'game_status': frozen.game_status,
+                        'updated_at': None
+                    }
+                continue
+            with entry.lock:
+                game = entry.game
+                if statuses and game.game_status not in statuses:
+                    continue
+                row = {
+                    'game_id': game_id,
+                    'engine': entry.engine,
+                    'moves': pack_moves(game.move_history),
+                    'start_fen': game.start_fen,
+                    'game_status': game.game_status,
+                    'updated_at': None
+                }
+            yield row
+    
+    def stored_count(self):
+        """Number of games persisted in SQLite."""
+        if self._db is None:
+            return len(self._hot) + len(self._frozen)
+        with self._db_lock:
+            return self._db.execute('SELECT COUNT(*) FROM games').fetchone()[0]
+    
+    def start(self):
+        """Start the background thread that flushes writes, compacts finished games and evicts idle ones."""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run, name='game-store-flusher', daemon=True)
+            self._flusher.start()
+    
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.flush()
+                with self._lock:
+                    self._evict_overflow()
+                self.compact_finished()
+                self.evict_idle()
+            except Exception:
+                # Keep flushing; one failed pass must not stop persistence for good
+                logger.exception("Game store maintenance failed")
+    
+    def close(self):
+        """Stop the background thread and flush outstanding writes."""
+        self._stopped.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
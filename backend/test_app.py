@@ -0,0 +1,128 @@
+"""Test the Flask app factory."""
+
+import os
+import tempfile
+
+from app import close_app, create_app, load_config
+
+
+def test_apps_are_independent():
+    """Each app has its own store, and settings come from the environment unless overridden."""
+    first = create_app({'CHESS_DB_PATH': None, 'CHESS_ENGINE_WORKERS': 0})
+    second = create_app({'CHESS_DB_PATH': None, 'CHESS_ENGINE_WORKERS': 0, 'CHESS_ENGINE_MAX_TIME_MS': 100})
+    try:
+        response = first.test_client().post('/api/game/new', json={})
+        assert response.status_code == 201
+        game_id = response.get_json()['game_id']
+        assert first.test_client().get(f'/api/game/{game_id}/state').status_code == 200
+        assert second.test_client().get(f'/api/game/{game_id}/state').status_code == 404
+        
+        game_id = second.test_client().post('/api/game/new', json={}).get_json()['game_id']
+        response = second.test_client().post(f'/api/game/{game_id}/engine-move', json={'time_ms': 500})
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'time_ms must be between 1 and 100'
+    finally:
+        close_app(first)
+        close_app(second)
+    
+    os.environ['CHESS_MAX_HOT_GAMES'] = '5'
+    try:
+        config = load_config({'CHESS_IDLE_TTL': 1.5})
+    finally:
+        del os.environ['CHESS_MAX_HOT_GAMES']
+    assert config['CHESS_MAX_HOT_GAMES'] == 5 and config['CHESS_IDLE_TTL'] == 1.5
+    assert config['CHESS_DB_PATH'] == 'games.db'
+
+
+def test_close_app_flushes_games():
+    """Closing an app persists its games for the next app on the same database."""
+    with tempfile.TemporaryDirectory() as directory:
+        config = {'CHESS_DB_PATH': os.path.join(directory, 'games.db'), 'CHESS_ENGINE_WORKERS': 0}
+        app = create_app(config)
+        client = app.test_client()
+        game_id = client.post('/api/game/new', json={}).get_json()['game_id']
+        assert client.post(f'/api/game/{game_id}/move', json={'from': [6, 4], 'to': [4, 4]}).status_code == 200
+        close_app(app)
+        
+        app = create_app(config)
+        state = app.test_client().get(f'/api/game/{game_id}/state').get_json()['state']
+        assert state['current_turn'] == 'black'
+        close_app(app)
+
+
+def test_etag_changes_on_transposition():
+    """A different move order reaching the same position does not reuse the old ETag."""
+    app = create_app({'CHESS_DB_PATH': None, 'CHESS_ENGINE_WORKERS': 0})
+    try:
+        client = app.test_client()
+        game_id = client.post('/api/game/new', json={}).get_json()['game_id']
+        first_order = [([7, 6], [5, 5]), ([0, 6], [2, 5]), ([7, 1], [5, 2])]
+        for from_pos, to_pos in first_order:
+            client.post(f'/api/game/{game_id}/move', json={'from': from_pos, 'to': to_pos})
+        etag = client.get(f'/api/game/{game_id}/history').headers['ETag']
+        
+        client.post(f'/api/game/{game_id}/undo', json={'count': 3})
+        for from_pos, to_pos in reversed(first_order):
+            client.post(f'/api/game/{game_id}/move', json={'from': from_pos, 'to': to_pos})
+        response = client.get(f'/api/game/{game_id}/history', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json()['history'][0]['from'] == [7, 1]
+    finally:
+        close_app(app)
+
+
+def test_delta_after_takeback():
+    """A version whose moves were taken back gets the full state, not an empty delta."""
+    app = create_app({'CHESS_DB_PATH': None, 'CHESS_ENGINE_WORKERS': 0})
+    try:
+        client = app.test_client()
+        data = client.post('/api/game/new', json={}).get_json()
+        game_id, start = data['game_id'], data['state']['version']
+        after_e4 = client.post(f'/api/game/{game_id}/move?since={start}',
+                               json={'from': [6, 4], 'to': [4, 4]}).get_json()['delta']['version']
+        client.post(f'/api/game/{game_id}/undo')
+        client.post(f'/api/game/{game_id}/move', json={'from': [6, 3], 'to': [4, 3]})
+        
+        data = client.get(f'/api/game/{game_id}/state?since={after_e4}').get_json()
+        assert 'delta' not in data and data['state']['board'][4][3] == {'type': 'Pawn', 'color': 'white'}
+        data = client.get(f'/api/game/{game_id}/history?since={after_e4}').get_json()
+        assert data['since'] == 0 and data['history'][0]['to'] == [4, 3]
+        for since in (start, '1', '0-0000000000000000', 'x'):
+            data = client.get(f'/api/game/{game_id}/state?since={since}').get_json()
+            assert ('delta' in data) == (since == start)
+        assert data['state']['version'] != after_e4 and data['state']['version'].startswith('1-')
+    finally:
+        close_app(app)
+
+
+def test_engine_timeout_returns_504(monkeypatch):
+    """A search that never finishes answers 504 instead of an error."""
+    import concurrent.futures
+    import app as app_module
+    
+    app = create_app({'CHESS_DB_PATH': None, 'CHESS_ENGINE_WORKERS': 0})
+    try:
+        monkeypatch.setattr(app_module, 'ENGINE_TIMEOUT_MARGIN', 0)
+        monkeypatch.setattr(app.extensions['chess']['engine_pool'], 'submit',
+                            lambda fn, *args: concurrent.futures.Future())
+        client = app.test_client()
+        game_id = client.post('/api/game/new', json={}).get_json()['game_id']
+        response = client.post(f'/api/game/{game_id}/engine-move', json={'time_ms': 10})
+        assert response.status_code == 504
+        assert response.get_json()['error'] == 'Engine timed out'
+    finally:
+        close_app(app)
+
+
+def test_pgn_must_be_text():
+    """A non-string 'pgn' is a 400, like the other malformed batch and import bodies."""
+    app = create_app({'CHESS_DB_PATH': None, 'CHESS_ENGINE_WORKERS': 0})
+    try:
+        client = app.test_client()
+        game_id = client.post('/api/game/new', json={}).get_json()['game_id']
+        for path in (f'/api/game/{game_id}/moves:batch', '/api/games:import'):
+            response = client.post(path, json={'pgn': 5})
+            assert response.status_code == 400
+            assert response.get_json()['error'] == "'pgn' must be a string"
+    finally:
+        close_app(app)
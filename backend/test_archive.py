@@ -0,0 +1,78 @@
+"""Test game listing and streaming export."""
+
+import json
+import os
+import tempfile
+
+import archive
+from board import ChessBoard
+from notation import apply_move_strings, read_pgn
+from store import GameStore
+
+FOOLS_MATE = ['f2f3', 'e7e5', 'g2g4', 'd8h4']
+
+
+def _fill(store):
+    """Store five games, one of them finished; return their IDs in order."""
+    game_ids = []
+    for index in range(5):
+        game_id, game = store.create('bitboard' if index % 2 else 'object')
+        if index == 2:
+            assert apply_move_strings(game, FOOLS_MATE) == (4, None)
+            store.mark_dirty(game_id)
+        game_ids.append(game_id)
+    return sorted(game_ids)
+
+
+def test_list_pages_with_cursor():
+    """Pages follow game ID order and the cursor resumes after the last game listed."""
+    with tempfile.TemporaryDirectory() as directory:
+        for store in (GameStore(db_path=os.path.join(directory, 'games.db')), GameStore()):
+            game_ids = _fill(store)
+            seen = []
+            cursor = None
+            while True:
+                games, cursor = archive.list_page(store, cursor, limit=2)
+                seen += [game['game_id'] for game in games]
+                if cursor is None:
+                    break
+            assert seen == game_ids
+            
+            games, cursor = archive.list_page(store, statuses=archive.status_filter('finished'))
+            assert [(game['game_status'], game['move_count']) for game in games] == [('checkmate', 4)]
+            assert cursor is None
+            store.close()
+    
+    for bad in ('won', ''):
+        try:
+            archive.status_filter(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_export_ndjson_and_pgn():
+    """Exports stream one game at a time and PGN reads back into the same games."""
+    store = GameStore()
+    game_id, game = store.create(fen='r3k3/6P1/8/8/8/8/8/R3K2R b KQq - 0 1')
+    assert apply_move_strings(game, ['e8c8', 'e1g1', 'd8d7', 'g7g8n', 'd7g7']) == (5, None)
+    _fill(store)
+    
+    lines = archive.ndjson_lines(store.iter_games(statuses=('check',)))
+    record = json.loads(next(lines))
+    assert record['game_id'] == game_id
+    assert record['moves'] == ['e8c8', 'e1g1', 'd8d7', 'g7g8n', 'd7g7']
+    assert next(lines, None) is None
+    
+    texts = list(archive.pgn_games(store.iter_games()))
+    assert len(texts) == 6
+    games = [parsed for text in texts for parsed in read_pgn(text.splitlines())]
+    by_id = {parsed['headers']['GameId']: parsed for parsed in games}
+    assert by_id[game_id]['moves'] == ['O-O-O', 'O-O', 'Rd7', 'g8=N', 'Rg7+']
+    assert by_id[game_id]['headers']['FEN'] == 'r3k3/6P1/8/8/8/8/8/R3K2R b KQq - 0 1'
+    mate = [parsed for parsed in by_id.values() if parsed['result'] == '0-1']
+    assert len(mate) == 1 and mate[0]['moves'] == ['f3', 'e5', 'g4', 'Qh4#']
+    
+    replayed = ChessBoard(by_id[game_id]['headers']['FEN'])
+    assert apply_move_strings(replayed, by_id[game_id]['moves'], 'san') == (5, None)
+    assert replayed.to_fen() == game.to_fen()
@@ -0,0 +1,178 @@
+"""Test the asyncio server mode and its move event stream."""
+
+import asyncio
+import concurrent.futures
+import json
+import threading
+
+import async_server
+from async_server import AsyncChessServer, EventBroker
+from store import GameStore
+from workers import EnginePool
+
+
+async def _request(port, method, path, data=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(data).encode() if data is not None else b''
+    writer.write((
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+async def _read_event(reader):
+    lines = []
+    while True:
+        line = (await reader.readline()).decode().rstrip('\n')
+        if not line:
+            break
+        lines.append(line)
+    fields = dict(line.split(': ', 1) for line in lines)
+    return fields['event'], json.loads(fields['data'])
+
+
+async def _run_event_stream():
+    server = AsyncChessServer(GameStore(), pool=EnginePool(max_workers=0))
+    listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    
+    status, data = await _request(port, 'POST', '/api/game/new')
+    assert status == 201
+    game_id = data['game_id']
+    
+    # Two spectators subscribe to the same game
+    streams = []
+    for _ in range(2):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f"GET /api/game/{game_id}/events HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        await reader.readuntil(b'\r\n\r\n')
+        event, state = await _read_event(reader)
+        assert event == 'state' and state['move_count'] == 0
+        streams.append((reader, writer))
+    
+    status, data = await _request(port, 'POST', f'/api/game/{game_id}/move', {'from': [6, 4], 'to': [4, 4]})
+    assert status == 200
+    for reader, writer in streams:
+        event, delta = await asyncio.wait_for(_read_event(reader), 5)
+        assert event == 'move'
+        assert delta['move_count'] == 1
+        assert delta['history'][0]['to'] == [4, 4]
+    
+    # A takeback cannot be expressed as a delta and is sent as a full state
+    status, data = await _request(port, 'POST', f'/api/game/{game_id}/undo')
+    assert status == 200 and data['undone'] == 1
+    for reader, writer in streams:
+        event, state = await asyncio.wait_for(_read_event(reader), 5)
+        assert event == 'state' and state['move_count'] == 0
+        writer.close()
+    
+    # Resuming from a move that was taken back starts over with the full state
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write((f"GET /api/game/{game_id}/events HTTP/1.1\r\nHost: localhost\r\n"
+                  f"Last-Event-ID: {delta['version']}\r\n\r\n").encode())
+    await writer.drain()
+    await reader.readuntil(b'\r\n\r\n')
+    event, state = await asyncio.wait_for(_read_event(reader), 5)
+    assert event == 'state' and state['move_count'] == 0
+    writer.close()
+    status, data = await _request(port, 'POST', f'/api/game/{game_id}/move', {'from': [6, 4], 'to': [4, 4]})
+    status, data = await _request(port, 'POST', f'/api/game/{game_id}/engine-move', {'time_ms': 50})
+    assert status == 200 and data['state']['move_count'] == 2
+    
+    status, data = await _request(port, 'GET', f'/api/game/{game_id}/history')
+    assert status == 200 and len(data['history']) == 2
+    status, data = await _request(port, 'GET', f'/api/game/{game_id}/state?format=compact')
+    assert status == 200 and len(data['state']['board']) == 64
+    status, data = await _request(port, 'GET', f'/api/game/{game_id}/state?format=svg')
+    assert status == 400
+    status, data = await _request(port, 'GET', '/api/game/missing/state')
+    assert status == 404
+    
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b"GET /api/metrics HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    response = (await reader.read()).decode()
+    writer.close()
+    assert 'Content-Type: text/plain' in response
+    assert 'chess_http_requests_total{method="POST",route="engine_move",status="200"}' in response
+    assert 'chess_games_hot 1' in response
+    
+    listener.close()
+    await listener.wait_closed()
+
+
+def test_move_events_fan_out():
+    """Every subscriber receives each move as a state delta and each takeback as a state."""
+    asyncio.run(_run_event_stream())
+
+
+def test_locked_game_does_not_stall_loop():
+    """A request waiting on one game's lock leaves the loop free to serve other games."""
+    async def run():
+        store = GameStore()
+        server = AsyncChessServer(store, pool=EnginePool(max_workers=0))
+        listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        busy_id = (await _request(port, 'POST', '/api/game/new'))[1]['game_id']
+        other_id = (await _request(port, 'POST', '/api/game/new'))[1]['game_id']
+        
+        held, release = threading.Event(), threading.Event()
+        
+        def hold():
+            with store.locked(busy_id):
+                held.set()
+                release.wait(5)
+        
+        holder = threading.Thread(target=hold)
+        holder.start()
+        held.wait(5)
+        waiting = asyncio.ensure_future(_request(port, 'GET', f'/api/game/{busy_id}/state'))
+        status, data = await asyncio.wait_for(_request(port, 'GET', f'/api/game/{other_id}/state'), 2)
+        assert status == 200 and not waiting.done()
+        release.set()
+        status, data = await asyncio.wait_for(waiting, 5)
+        assert status == 200
+        holder.join()
+        listener.close()
+        await listener.wait_closed()
+    asyncio.run(run())
+
+
+def test_oversized_body_and_engine_timeout(monkeypatch):
+    """Oversized bodies get a 413 and a search that never finishes a 504."""
+    async def run():
+        pool = EnginePool(max_workers=0)
+        server = AsyncChessServer(GameStore(), pool=pool)
+        listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        
+        status, data = await _request(port, 'POST', '/api/game/new', {'fen': ' ' * async_server.MAX_BODY_BYTES})
+        assert status == 413 and not data['success']
+        
+        game_id = (await _request(port, 'POST', '/api/game/new'))[1]['game_id']
+        monkeypatch.setattr(async_server, 'ENGINE_TIMEOUT_MARGIN', 0)
+        monkeypatch.setattr(pool, 'submit', lambda fn, *args: concurrent.futures.Future())
+        status, data = await asyncio.wait_for(
+            _request(port, 'POST', f'/api/game/{game_id}/engine-move', {'time_ms': 10}), 5)
+        assert status == 504 and data['error'] == 'Engine timed out'
+        listener.close()
+        await listener.wait_closed()
+    asyncio.run(run())
+
+
+def test_slow_subscriber_dropped():
+    """A subscriber whose queue fills up is disconnected instead of blocking others."""
+    async def run():
+        broker = EventBroker(max_queue=2)
+        slow = broker.subscribe('game')
+        for i in range(3):
+            broker.publish('game', b'event')
+        assert broker.subscriber_count() == 0
+        assert slow.get_nowait() is None
+    asyncio.run(run())
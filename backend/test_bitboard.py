@@ -0,0 +1,157 @@
+"""Parity tests between the object and bitboard board implementations."""
+
+import random
+
+from board import ChessBoard
+from bitboard import BitboardChessBoard
+from notation import NotationError
+from test_chess import PERFT_SUITE
+
+
+def _assert_same_position(game, bitboard_game):
+    assert game.get_board_state() == bitboard_game.get_board_state()
+    assert game.encoded_state('compact') == bitboard_game.encoded_state('compact')
+    assert game.move_history == bitboard_game.move_history
+    assert game.zobrist_hash == bitboard_game.zobrist_hash
+    assert game.to_fen() == bitboard_game.to_fen()
+    assert game.get_state_delta(0) == bitboard_game.get_state_delta(0)
+    assert sorted(game.generate_moves()) == sorted(bitboard_game.generate_moves())
+
+
+def test_initial_position_parity():
+    """Both engines start from the same position."""
+    _assert_same_position(ChessBoard(), BitboardChessBoard())
+
+
+def test_random_game_parity():
+    """Random legal games produce identical states, histories and statuses."""
+    for seed in range(20):
+        rng = random.Random(seed)
+        game = ChessBoard()
+        bitboard_game = BitboardChessBoard()
+        for _ in range(150):
+            moves = sorted(game.generate_moves())
+            if not moves:
+                break
+            move = rng.choice(moves)
+            assert game.move_piece(*move) == bitboard_game.move_piece(*move)
+            _assert_same_position(game, bitboard_game)
+        assert game.game_status == bitboard_game.game_status
+
+
+def test_rejected_move_parity():
+    """Both engines reject the same moves with the same messages."""
+    rng = random.Random(7)
+    game = ChessBoard()
+    bitboard_game = BitboardChessBoard()
+    for _ in range(60):
+        for _ in range(30):
+            from_pos = (rng.randrange(8), rng.randrange(8))
+            to_pos = (rng.randrange(-1, 9), rng.randrange(-1, 9))
+            assert game.move_piece(from_pos, to_pos) == bitboard_game.move_piece(from_pos, to_pos)
+        _assert_same_position(game, bitboard_game)
+        moves = sorted(game.generate_moves())
+        if not moves:
+            break
+        move = rng.choice(moves)
+        assert game.move_piece(*move) == bitboard_game.move_piece(*move)
+
+
+def test_out_of_range_square_parity():
+    """Squares off the board are rejected by both engines, never wrapped around."""
+    game = ChessBoard()
+    bitboard_game = BitboardChessBoard()
+    for from_pos, to_pos in (((-2, 4), (4, 4)), ((6, -4), (5, 4)), ((8, 4), (4, 4)),
+                             ((6, 4), (4, -4)), ((-1, -1), (-2, -1)), ((6, 4), (9, 4))):
+        result = game.move_piece(from_pos, to_pos)
+        assert not result[0]
+        assert result == bitboard_game.move_piece(from_pos, to_pos)
+        assert not game.is_legal_move(from_pos, to_pos)
+        assert not bitboard_game.is_legal_move(from_pos, to_pos)
+    _assert_same_position(game, bitboard_game)
+    assert game.move_history == []
+
+
+def test_opponent_in_check_rejected():
+    """Both engines refuse positions where the side not to move is in check."""
+    for fen in ('4k3/8/8/8/8/8/4R3/4K3 w - - 0 1', '4k3/8/8/8/8/8/3p4/4K3 b - - 0 1',
+                '4k3/8/8/8/1b6/8/8/4K3 b - - 0 1'):
+        for engine in (ChessBoard, BitboardChessBoard):
+            try:
+                engine.from_fen(fen)
+                assert False, (engine, fen)
+            except NotationError as e:
+                assert 'not to move is in check' in str(e)
+    # The side to move may be in check
+    for engine in (ChessBoard, BitboardChessBoard):
+        assert engine.from_fen('4k3/8/8/8/8/8/4R3/4K3 b - - 0 1').game_status == 'check'
+
+
+def test_fools_mate_parity():
+    """Checkmate is reported identically."""
+    game = ChessBoard()
+    bitboard_game = BitboardChessBoard()
+    for from_pos, to_pos in [((6, 5), (5, 5)), ((1, 4), (3, 4)), ((6, 6), (4, 6)), ((0, 3), (4, 7))]:
+        assert game.move_piece(from_pos, to_pos) == bitboard_game.move_piece(from_pos, to_pos)
+    assert game.game_status == bitboard_game.game_status == 'checkmate'
+    _assert_same_position(game, bitboard_game)
+
+
+def test_perft_parity():
+    """Both engines count the same perft nodes from middlegame positions."""
+    rng = random.Random(11)
+    game = ChessBoard()
+    bitboard_game = BitboardChessBoard()
+    for _ in range(3):
+        for _ in range(8):
+            moves = sorted(game.generate_moves())
+            if not moves:
+                break
+            move = rng.choice(moves)
+            assert game.move_piece(*move) == bitboard_game.move_piece(*move)
+        assert game.perft(2) == bitboard_game.perft(2)
+        _assert_same_position(game, bitboard_game)
+
+
+def test_unmake_move_parity():
+    """Taking moves back leaves both engines in the same position."""
+    rng = random.Random(13)
+    game = ChessBoard()
+    bitboard_game = BitboardChessBoard()
+    for _ in range(60):
+        moves = sorted(game.generate_moves())
+        if moves and (rng.random() < 0.7 or not game.move_history):
+            move = rng.choice(moves)
+            game.make_move(*move)
+            bitboard_game.make_move(*move)
+        else:
+            assert game.unmake_move() == bitboard_game.unmake_move()
+        _assert_same_position(game, bitboard_game)
+
+
+def test_perft_suite():
+    """Perft matches the published node counts for positions with every special move."""
+    for fen, counts in PERFT_SUITE:
+        game = BitboardChessBoard.from_fen(fen)
+        assert [game.perft(depth) for depth in range(1, len(counts) + 1)] == counts, fen
+        assert game.zobrist_hash == ChessBoard.from_fen(fen).zobrist_hash == game._compute_hash()
+
+
+def test_special_move_parity():
+    """Castling, en passant, promotion and draws are played identically."""
+    games = [
+        ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', [((7, 4), (7, 2)), ((0, 4), (0, 6)), ((7, 2), (6, 2))]),
+        (None, [((6, 4), (4, 4)), ((1, 0), (2, 0)), ((4, 4), (3, 4)), ((1, 5), (3, 5)), ((3, 4), (2, 5))]),
+        ('8/4P3/8/8/8/8/k7/4K3 w - - 0 1', [((1, 4), (0, 4), 'Rook'), ((6, 0), (5, 0)), ((0, 4), (0, 0))]),
+        (None, [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))] * 2),
+    ]
+    for fen, moves in games:
+        game = ChessBoard(fen)
+        bitboard_game = BitboardChessBoard(fen)
+        for move in moves:
+            assert game.move_piece(*move) == bitboard_game.move_piece(*move)
+            assert game.game_status == bitboard_game.game_status
+            _assert_same_position(game, bitboard_game)
+        while game.move_history:
+            assert game.unmake_move() and bitboard_game.unmake_move()
+            _assert_same_position(game, bitboard_game)
@@ -0,0 +1,96 @@
+"""Test the opening book builder and lookups."""
+
+import os
+import tempfile
+
+import book
+from bitboard import BitboardChessBoard
+from board import ChessBoard
+from notation import apply_move_strings
+from transposition import position_cache
+
+PGN = """[Event "A"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 1-0
+
+[Event "B"]
+[Result "0-1"]
+
+1. e4 c5 2. Nf3 d6 0-1
+
+[Event "C"]
+[Result "*"]
+
+1. e4 e5 2. Nf3 Nf6 *
+
+[Event "D"]
+[Result "0-1"]
+
+1. f3 e5 2. g4 Qh4# 0-1
+
+[Event "E"]
+[Result "0-1"]
+
+1. f3 e5 2. g4 Qh4# 0-1
+"""
+
+
+def test_build_and_probe():
+    """Book positions carry their legal moves, status and most played moves."""
+    with tempfile.TemporaryDirectory() as directory:
+        pgn_path = os.path.join(directory, 'games.pgn')
+        with open(pgn_path, 'w') as f:
+            f.write(PGN)
+        book_path = os.path.join(directory, 'opening.book')
+        # Start, 1. e4, 1. e4 e5, 1. e4 e5 2. Nf3 and the three positions of the fool's mate
+        # line before Qh4#; 1. e4 c5 and 1. e4 e5 2. Nf3 Nc6 occur once
+        assert book.build(book_path, [pgn_path], plies=4, min_games=2) == 7
+        
+        opening_book = book.OpeningBook(book_path)
+        start = BitboardChessBoard()
+        entry = opening_book.probe(start.zobrist_hash)
+        assert entry['status'] == 'active'
+        assert sorted(entry['moves']) == sorted(start.generate_moves())
+        assert opening_book.book_moves(start.zobrist_hash) == [(((6, 4), (4, 4), None), 3), (((6, 5), (5, 5), None), 2)]
+        
+        apply_move_strings(start, ['e2e4', 'c7c5'])
+        assert opening_book.probe(start.zobrist_hash) is None
+        assert opening_book.book_moves(start.zobrist_hash) == []
+        opening_book.close()
+        
+        try:
+            book.OpeningBook(pgn_path)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_loaded_book_serves_boards_and_engine():
+    """Boards of both engines read book positions from the book; the engine plays the top book move."""
+    with tempfile.TemporaryDirectory() as directory:
+        pgn_path = os.path.join(directory, 'games.pgn')
+        with open(pgn_path, 'w') as f:
+            f.write(PGN)
+        book_path = os.path.join(directory, 'opening.book')
+        book.build(book_path, [pgn_path], plies=4, min_games=2)
+        
+        assert book.suggest(ChessBoard().zobrist_hash) is None
+        opening_book = book.load(book_path)
+        try:
+            for engine in (ChessBoard, BitboardChessBoard):
+                game = engine()
+                hits = opening_book.hits
+                assert apply_move_strings(game, ['f2f3', 'e7e5', 'g2g4']) == (3, None)
+                assert opening_book.hits > hits
+                assert sorted(game.legal_moves()) == sorted(game.generate_moves())
+                suggestion = book.suggest(game.zobrist_hash)
+                assert suggestion == {'move': ((0, 3), (4, 7), None), 'book': True, 'games': 2}
+                assert game.move_piece(*suggestion['move'])[0]
+                assert game.game_status == 'checkmate'
+                position_cache.clear()
+            assert position_cache.stats()['book']['positions'] == 7
+        finally:
+            position_cache.book = None
+            position_cache.clear()
+            opening_book.close()
@@ -1,6 +1,10 @@
 """Test chess board and piece movement."""
 
+import json
+
 from board import ChessBoard
+from pieces import Pawn
+from rules import PROMOTION_PIECES
 
 
 def test_basic_moves():
@@ -40,6 +44,310 @@ def test_basic_moves():
     return game
 
 
+def _brute_force_moves(game):
+    """All legal moves found by trying every piece against every square."""
+    moves = [
+        ((row, col), (target_row, target_col))
+        for row in range(8) for col in range(8)
+        if game.board[row][col] and game.board[row][col].color == game.current_turn
+        for target_row in range(8) for target_col in range(8)
+        if game._can_reach(game.board[row][col], (target_row, target_col))
+        and not game._would_be_in_check((row, col), (target_row, target_col))
+    ]
+    return [
+        (from_pos, to_pos, promotion)
+        for from_pos, to_pos in moves
+        for promotion in (
+            PROMOTION_PIECES if isinstance(game.get_piece(from_pos), Pawn) and to_pos[0] in (0, 7) else (None,)
+        )
+    ]
+
+
+def _play_random_game(game, plies, seed):
+    """Play up to plies random legal moves, yielding after each one."""
+    import random
+    rng = random.Random(seed)
+    for _ in range(plies):
+        moves = _brute_force_moves(game)
+        if not moves:
+            return
+        move = rng.choice(moves)
+        success, message = game.move_piece(*move)
+        assert success, message
+        yield move
+
+
+def test_incremental_attack_maps():
+    """Incrementally updated attack maps match a full rebuild."""
+    for seed in range(5):
+        game = ChessBoard()
+        for _ in _play_random_game(game, 60, seed):
+            incremental = {color: list(counts) for color, counts in game.attack_maps.items()}
+            game._init_attack_maps()
+            assert incremental == game.attack_maps
+            
+            for color in ('white', 'black'):
+                opponent = 'black' if color == 'white' else 'white'
+                king_pos = game._find_king(color)
+                brute_force = any(
+                    piece.color == opponent and piece.is_valid_move(king_pos, game.board)
+                    for row in game.board for piece in row if piece
+                )
+                assert game._is_in_check(color) == brute_force
+
+
+def test_generate_moves_matches_brute_force():
+    """The move generator finds exactly the moves a full 64x64 scan finds."""
+    for seed in range(5):
+        game = ChessBoard()
+        assert len(list(game.generate_moves())) == 20
+        for _ in _play_random_game(game, 80, seed):
+            assert sorted(game.generate_moves()) == sorted(_brute_force_moves(game))
+
+
+def test_compact_pieces():
+    """Pieces are slotted and queen move checks allocate nothing."""
+    import tracemalloc
+    game = ChessBoard()
+    assert all(not hasattr(piece, '__dict__') for row in game.board for piece in row if piece)
+    
+    queen = game.get_piece((7, 3))
+    queen.is_valid_move((3, 7), game.board)
+    tracemalloc.start()
+    for _ in range(100):
+        queen.is_valid_move((3, 7), game.board)
+        queen.is_valid_move((5, 3), game.board)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert current < 1024
+
+
+def test_zobrist_hash():
+    """Incremental hashes match a full recompute and identify transpositions."""
+    for seed in range(3):
+        game = ChessBoard()
+        for _ in _play_random_game(game, 60, seed):
+            assert game.zobrist_hash == game._compute_hash()
+    
+    game = ChessBoard()
+    start_hash = game.zobrist_hash
+    for from_pos, to_pos in [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))]:
+        game.move_piece(from_pos, to_pos)
+    assert game.zobrist_hash == start_hash
+    assert game.hash_history.count(start_hash) == 2
+
+
+def test_position_cache_shared_between_games():
+    """A position evaluated in one game is a cache hit in another."""
+    from transposition import position_cache
+    position_cache.clear()
+    first, second = ChessBoard(), ChessBoard()
+    first.move_piece((6, 3), (4, 3))
+    misses = position_cache.misses
+    second.move_piece((6, 3), (4, 3))
+    assert position_cache.misses == misses
+    assert position_cache.hits >= 1
+    assert first.legal_moves() is second.legal_moves()
+
+
+def test_state_delta():
+    """Deltas list only the squares and history entries after a move count."""
+    game = ChessBoard()
+    game.move_piece((6, 4), (4, 4))
+    game.move_piece((1, 3), (3, 3))
+    game.move_piece((4, 4), (3, 3))
+    
+    delta = game.get_state_delta(2)
+    assert [square['position'] for square in delta['squares']] == [(3, 3), (4, 4)]
+    assert delta['squares'][0]['piece'] == {'type': 'Pawn', 'color': 'white'}
+    assert delta['history'] == game.move_history[2:]
+    assert delta['move_count'] == 3 and delta['current_turn'] == 'black'
+    
+    full = game.get_board_state()['board']
+    for square in game.get_state_delta(0)['squares']:
+        row, col = square['position']
+        assert full[row][col] == square['piece']
+
+
+def test_checkmate_detection():
+    """Fool's mate is detected as checkmate."""
+    game = ChessBoard()
+    for from_pos, to_pos in [((6, 5), (5, 5)), ((1, 4), (3, 4)), ((6, 6), (4, 6)), ((0, 3), (4, 7))]:
+        success, message = game.move_piece(from_pos, to_pos)
+        assert success, message
+    assert game.game_status == 'checkmate'
+    
+    # Pinned pieces cannot expose their own king
+    game = ChessBoard()
+    for from_pos, to_pos in [((6, 4), (4, 4)), ((1, 3), (3, 3)), ((7, 5), (3, 1))]:
+        assert game.move_piece(from_pos, to_pos)[0]
+    assert game.game_status == 'check'
+    success, message = game.move_piece((1, 0), (2, 0))
+    assert not success and message == "Move would put king in check"
+
+
+def test_perft_start_position():
+    """Perft from the starting position matches the published node counts."""
+    game = ChessBoard()
+    state = game.get_board_state()
+    hash_value = game.zobrist_hash
+    assert [game.perft(depth) for depth in (1, 2, 3)] == [20, 400, 8902]
+    assert game.get_board_state() == state
+    assert game.zobrist_hash == hash_value
+
+
+def test_make_unmake_move():
+    """Undoing every move restores the starting position exactly."""
+    game = ChessBoard()
+    fresh = ChessBoard()
+    states = [(game.get_board_state(), game.zobrist_hash, game.to_fen())]
+    for _ in _play_random_game(game, 40, 5):
+        states.append((game.get_board_state(), game.zobrist_hash, game.to_fen()))
+    
+    while game.move_history:
+        states.pop()
+        assert game.unmake_move()
+        assert (game.get_board_state(), game.zobrist_hash, game.to_fen()) == states[-1]
+        assert game.attack_maps == ChessBoard.from_fen(game.to_fen()).attack_maps
+    assert not game.unmake_move()
+    assert game.hash_history == fresh.hash_history
+    assert [piece.has_moved for row in game.board for piece in row if piece] == \
+        [piece.has_moved for row in fresh.board for piece in row if piece]
+
+
+def test_board_formats_and_encoded_state():
+    """Compact and FEN states describe the same position; cached encodings follow moves."""
+    game = ChessBoard()
+    compact = game.get_board_state('compact')
+    assert compact['board'] == 'rnbqkbnrpppppppp' + '.' * 32 + 'PPPPPPPPRNBQKBNR'
+    assert game.get_board_state('fen')['fen'] == game.to_fen()
+    assert json.loads(game.encoded_state()) == game.get_board_state()
+    
+    before = game.encoded_state('compact')
+    assert game.encoded_state('compact') is before
+    game.move_piece((6, 4), (4, 4))
+    after = json.loads(game.encoded_state('compact'))
+    assert after['board'][36] == 'P' and after['move_count'] == 1
+    game.unmake_move()
+    assert game.encoded_state('compact') == before
+
+
+# Published perft node counts (index 0 is depth 1) for positions full of
+# castling, en passant and promotion; kept to depths that run in about a second
+PERFT_SUITE = [
+    ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2039]),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812]),
+    ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467]),
+    ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486]),
+    ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10', [46, 2079]),
+]
+
+
+def test_perft_suite():
+    """Perft matches the published node counts for positions with every special move."""
+    for fen, counts in PERFT_SUITE:
+        game = ChessBoard.from_fen(fen)
+        assert [game.perft(depth) for depth in range(1, len(counts) + 1)] == counts, fen
+        assert game.to_fen() == fen
+        assert game.zobrist_hash == game._compute_hash()
+
+
+def test_castling():
+    """Castling moves the rook, needs safe squares and is lost when the king or rook moves."""
+    game = ChessBoard.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+    assert game.move_piece((7, 4), (7, 6)) == (True, "Move successful")
+    assert game.move_history[-1]['castling'] == 'kingside'
+    assert game.to_fen() == 'r3k2r/8/8/8/8/8/8/R4RK1 b kq - 1 1'
+    assert game.changed_squares(0) == [(7, 4), (7, 5), (7, 6), (7, 7)]
+    assert game.move_piece((0, 0), (1, 0))[0]
+    assert game.to_fen() == '4k2r/r7/8/8/8/8/8/R4RK1 w k - 2 2'
+    assert game.unmake_move() and game.unmake_move()
+    assert game.to_fen() == 'r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1'
+    assert game.zobrist_hash == game._compute_hash()
+    
+    # The king may not castle out of, through or into check
+    game = ChessBoard.from_fen('r3kr2/8/8/8/8/8/8/R3K2R w KQq - 0 1')
+    assert not game.is_legal_move((7, 4), (7, 6))
+    assert game.move_piece((7, 4), (7, 6)) == (False, "Invalid move for this piece")
+    assert ((7, 4), (7, 2), None) in game.generate_moves()
+    game = ChessBoard.from_fen('r3k2r/8/8/8/8/8/8/RN2K2R w KQkq - 0 1')
+    assert not game.is_legal_move((7, 4), (7, 2))
+
+
+def test_en_passant():
+    """A pawn that advanced two squares can be captured in passing on the next move only."""
+    game = ChessBoard()
+    assert game.move_piece((6, 4), (4, 4))[0]
+    assert game.to_fen().split()[3] == '-'
+    for from_pos, to_pos in [((1, 0), (2, 0)), ((4, 4), (3, 4)), ((1, 3), (3, 3))]:
+        assert game.move_piece(from_pos, to_pos)[0]
+    assert game.to_fen().split()[3] == 'd6'
+    before = game.get_board_state(), game.zobrist_hash
+    
+    assert game.move_piece((3, 4), (2, 3))[0]
+    assert game.move_history[-1]['captured'] == 'Pawn' and game.move_history[-1]['en_passant']
+    assert game.get_piece((3, 3)) is None and (3, 3) in game.changed_squares(4)
+    assert game.zobrist_hash == game._compute_hash()
+    assert game.unmake_move()
+    assert (game.get_board_state(), game.zobrist_hash) == before
+    
+    # The right lapses after any other move
+    for from_pos, to_pos in [((7, 6), (5, 5)), ((2, 0), (3, 0))]:
+        assert game.move_piece(from_pos, to_pos)[0]
+    assert not game.is_legal_move((3, 4), (2, 3))
+
+
+def test_promotion():
+    """Pawns reaching the last rank promote, to a Queen unless another piece is asked for."""
+    game = ChessBoard.from_fen('8/4P3/8/8/8/8/k7/4K3 w - - 0 1')
+    assert game.move_piece((1, 4), (0, 4), 'King') == (False, "Invalid promotion piece 'King'")
+    assert game.move_piece((7, 4), (7, 3), 'Queen') == \
+        (False, "Promotion is only allowed for a pawn reaching the last rank")
+    assert len([move for move in game.generate_moves() if move[0] == (1, 4)]) == 4
+    
+    assert game.move_piece((1, 4), (0, 4), 'Knight')[0]
+    assert game.get_square((0, 4)) == {'type': 'Knight', 'color': 'white'}
+    assert game.move_history[-1]['promotion'] == 'Knight'
+    assert game.to_fen() == '4N3/8/8/8/8/8/k7/4K3 b - - 0 1'
+    assert game.unmake_move()
+    assert game.get_square((1, 4)) == {'type': 'Pawn', 'color': 'white'}
+    assert game.move_piece((1, 4), (0, 4))[0]
+    assert game.get_square((0, 4)) == {'type': 'Queen', 'color': 'white'}
+
+
+def test_draws():
+    """The fifty-move rule and threefold repetition end the game in a draw."""
+    game = ChessBoard.from_fen('k7/8/8/8/8/8/8/K6R w - - 99 60')
+    assert game.game_status == 'active'
+    assert game.move_piece((7, 7), (6, 7))[0]
+    assert game.game_status == 'draw'
+    assert game.move_piece((0, 0), (1, 0)) == (False, "Game is over")
+    
+    game = ChessBoard()
+    shuffle = [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))]
+    for from_pos, to_pos in shuffle * 2:
+        assert game.game_status == 'active'
+        assert game.move_piece(from_pos, to_pos)[0]
+    assert game.game_status == 'draw'
+    assert game.unmake_move()
+    assert game.game_status == 'active'
+
+
+
+def test_apply_moves_stops_at_game_over():
+    """A batch rejects moves played after the game ended partway through it."""
+    game = ChessBoard()
+    fools_mate = [((6, 5), (5, 5)), ((1, 4), (3, 4)), ((6, 6), (4, 6)), ((0, 3), (4, 7))]
+    assert game.apply_moves(fools_mate + [((6, 0), (5, 0))]) == (4, "Game is over")
+    assert game.game_status == 'checkmate'
+    assert game.move_piece((6, 0), (5, 0)) == (False, "Game is over")
+    
+    game = ChessBoard()
+    shuffle = [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))]
+    assert game.apply_moves(shuffle * 3) == (8, "Game is over")
+    assert game.game_status == 'draw'
+    assert len(game.move_history) == 8
+
 if __name__ == "__main__":
     print("=== Chess Engine Test ===\n")
     game = test_basic_moves()
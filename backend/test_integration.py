@@ -78,6 +78,189 @@ def test_game_state(game_id):
     assert data['state']['move_count'] == 2
     print("✓ Game state retrieved")
 
+def test_legal_moves(game_id):
+    """Test legal move listing."""
+    response = requests.get(f"{API_URL}/game/{game_id}/moves")
+    assert response.status_code == 200
+    data = response.json()
+    assert data['success'] == True
+    assert data['current_turn'] == 'white'
+    assert {'from': [7, 6], 'to': [5, 5], 'promotion': None} in data['moves']
+    print(f"✓ Legal moves retrieved: {len(data['moves'])} moves")
+
+def test_state_delta_and_etag(game_id):
+    """Test delta responses and conditional GET."""
+    version = requests.get(f"{API_URL}/game/{game_id}/state").json()['state']['version']
+    response = requests.post(f"{API_URL}/game/{game_id}/move?since={version}", json={"from": [7, 6], "to": [5, 5]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data['delta']['move_count'] == 3
+    assert len(data['delta']['history']) == 1
+    
+    # A version whose moves were taken back gets the full state
+    stale = data['delta']['version']
+    requests.post(f"{API_URL}/game/{game_id}/undo")
+    requests.post(f"{API_URL}/game/{game_id}/move", json={"from": [7, 1], "to": [5, 2]})
+    response = requests.get(f"{API_URL}/game/{game_id}/state?since={stale}")
+    data = response.json()
+    assert 'delta' not in data and data['state']['move_count'] == 3
+    
+    etag = response.headers['ETag']
+    response = requests.get(f"{API_URL}/game/{game_id}/state", headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    print("✓ Delta and conditional GET work")
+
+def test_batch_moves():
+    """Test applying several moves in one request."""
+    game_id = test_create_game()
+    response = requests.post(
+        f"{API_URL}/game/{game_id}/moves:batch",
+        json={"moves": ["e4", "e5", "Nf3", "Nc6"], "format": "san"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data['applied'] == 4
+    assert data['state']['move_count'] == 4
+    print("✓ Batch moves applied")
+
+def test_import_games():
+    """Test bulk game import from PGN."""
+    response = requests.post(
+        f"{API_URL}/games:import",
+        json={"pgn": "1. f3 e5 2. g4 Qh4# 0-1\n\n1. e4 e5 *"}
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert data['imported'] == 2
+    assert data['games'][0]['game_status'] == 'checkmate'
+    print(f"✓ Imported {data['imported']} games")
+
+def test_fen_round_trip():
+    """Test creating a game from FEN and reading it back."""
+    fen = "7k/8/6K1/8/8/8/8/6Q1 w - - 0 1"
+    response = requests.post(f"{API_URL}/game/new", json={"fen": fen})
+    assert response.status_code == 201
+    game_id = response.json()['game_id']
+    
+    response = requests.get(f"{API_URL}/game/{game_id}/fen")
+    assert response.status_code == 200
+    assert response.json()['fen'] == fen
+    
+    response = requests.post(f"{API_URL}/game/new", json={"fen": "not a fen"})
+    assert response.status_code == 400
+    print("✓ FEN round trip works")
+
+def test_undo_move():
+    """Test taking back moves."""
+    response = requests.post(f"{API_URL}/game/new")
+    game_id = response.json()['game_id']
+    initial = response.json()['state']
+    requests.post(f"{API_URL}/game/{game_id}/move", json={"from": [6, 4], "to": [4, 4]})
+    requests.post(f"{API_URL}/game/{game_id}/move", json={"from": [1, 4], "to": [3, 4]})
+    
+    response = requests.post(f"{API_URL}/game/{game_id}/undo", json={"count": 2})
+    assert response.status_code == 200
+    assert response.json()['state'] == initial
+    
+    response = requests.post(f"{API_URL}/game/{game_id}/undo")
+    assert response.status_code == 400
+    print("✓ Undo restores the previous position")
+
+def test_engine_move():
+    """Test the built-in engine playing a move."""
+    response = requests.post(f"{API_URL}/game/new")
+    game_id = response.json()['game_id']
+    
+    response = requests.post(f"{API_URL}/game/{game_id}/engine-move", json={"time_ms": 200})
+    assert response.status_code == 200
+    data = response.json()
+    assert data['state']['current_turn'] == 'black'
+    assert data['search']['nodes'] > 0
+    print(f"✓ Engine played {data['move']} at {data['search']['nps']} nodes/sec")
+
+def test_compact_state():
+    """Test the compact and FEN board formats."""
+    response = requests.post(f"{API_URL}/game/new")
+    game_id = response.json()['game_id']
+    
+    response = requests.get(f"{API_URL}/game/{game_id}/state", params={"format": "compact"})
+    assert response.status_code == 200
+    assert response.json()['state']['board'].startswith('rnbqkbnr')
+    
+    response = requests.get(f"{API_URL}/game/{game_id}/state",
+                            headers={"Accept": "application/vnd.chess.fen+json"})
+    assert response.json()['state']['fen'].startswith('rnbqkbnr/pppppppp')
+    
+    response = requests.get(f"{API_URL}/game/{game_id}/state", params={"format": "xml"})
+    assert response.status_code == 400
+    print("✓ Compact and FEN board formats")
+
+def test_metrics():
+    """Test the Prometheus metrics endpoint."""
+    response = requests.get(f"{API_URL}/metrics")
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+    assert 'chess_http_request_duration_seconds_bucket' in response.text
+    assert 'chess_games_hot' in response.text
+    print("✓ Metrics exported")
+
+def test_special_moves():
+    """Test castling and promotion through the API."""
+    response = requests.post(f"{API_URL}/game/new", json={"fen": "4k3/1P6/8/8/8/8/8/4K2R w K - 0 1"})
+    game_id = response.json()['game_id']
+    
+    response = requests.post(f"{API_URL}/game/{game_id}/move", json={"from": [7, 4], "to": [7, 6]})
+    assert response.status_code == 200
+    response = requests.post(f"{API_URL}/game/{game_id}/move", json={"from": [0, 4], "to": [0, 3]})
+    assert response.status_code == 200
+    response = requests.post(f"{API_URL}/game/{game_id}/move",
+                             json={"from": [1, 1], "to": [0, 1], "promotion": "Knight"})
+    assert response.status_code == 200
+    
+    history = requests.get(f"{API_URL}/game/{game_id}/history").json()['history']
+    assert history[0]['castling'] == 'kingside'
+    assert history[2]['promotion'] == 'Knight'
+    print("✓ Castling and promotion")
+
+def test_list_and_export_games():
+    """Test game listing and streaming export."""
+    response = requests.get(f"{API_URL}/games", params={"limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page['games']) <= 2
+    if page['next_cursor']:
+        response = requests.get(f"{API_URL}/games", params={"limit": 2, "cursor": page['next_cursor']})
+        assert all(game['game_id'] > page['next_cursor'] for game in response.json()['games'])
+    
+    response = requests.get(f"{API_URL}/games:export", params={"status": "finished"}, stream=True)
+    assert response.headers['Content-Type'].startswith('application/x-ndjson')
+    for line in response.iter_lines():
+        assert json.loads(line)['game_status'] in ('checkmate', 'stalemate', 'draw')
+    
+    response = requests.get(f"{API_URL}/games:export", params={"format": "pgn", "status": "checkmate"})
+    assert response.status_code == 200 and '[GameId "' in response.text
+    print("✓ Game listing and export")
+
+def test_analyze_positions():
+    """Test bulk position analysis, streamed as NDJSON."""
+    positions = [
+        "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+        "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",
+        "not a fen"
+    ]
+    response = requests.post(f"{API_URL}/analyze", json={"positions": positions})
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result['index'] for result in results] == [0, 1, 2]
+    assert results[0]['status'] == 'checkmate'
+    assert results[1]['status'] == 'stalemate' and results[1]['legal_moves'] == 0
+    assert 'error' in results[2]
+    
+    response = requests.post(f"{API_URL}/analyze", data="\n".join(positions[:2]),
+                             headers={"Content-Type": "text/plain"})
+    assert len(response.text.splitlines()) == 2
+    print("✓ Position analysis")
+
 def run_all_tests():
     """Run all integration tests."""
     print("\n=== Running Integration Tests ===\n")
@@ -89,6 +272,18 @@ def run_all_tests():
         test_invalid_move(game_id)
         test_move_history(game_id)
         test_game_state(game_id)
+        test_legal_moves(game_id)
+        test_state_delta_and_etag(game_id)
+        test_batch_moves()
+        test_import_games()
+        test_fen_round_trip()
+        test_undo_move()
+        test_engine_move()
+        test_compact_state()
+        test_metrics()
+        test_special_moves()
+        test_list_and_export_games()
+        test_analyze_positions()
         
         print("\n=== All Tests Passed! ===\n")
         return True
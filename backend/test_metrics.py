@@ -0,0 +1,64 @@
+"""Test request metrics, board instrumentation and the sampling profiler."""
+
+import time
+
+import metrics
+from board import ChessBoard
+
+
+def test_histogram_quantiles_and_exposition():
+    histogram = metrics.Histogram('test_seconds', 'Test latency', labels=('route',),
+                                  buckets=(0.001, 0.01, 0.1))
+    for _ in range(90):
+        histogram.observe(0.0005, '/a')
+    for _ in range(10):
+        histogram.observe(0.05, '/a')
+    
+    assert 0 < histogram.quantile(0.5, '/a') <= 0.001
+    assert 0.01 < histogram.quantile(0.99, '/a') <= 0.1
+    assert histogram.quantile(0.5, '/b') is None
+    
+    registry = metrics.Registry()
+    registry.register(histogram)
+    registry.register(metrics.QuantileGauge('test_quantile_seconds', histogram))
+    registry.register(metrics.Gauge('test_size', 'Test size', callback=lambda: 7))
+    registry.register(metrics.Gauge('test_bytes', 'Test bytes', labels=('tier',),
+                                    callback=lambda: {('hot',): 10, ('frozen',): 2}))
+    text = registry.render()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{route="/a",le="0.001"} 90' in text
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 100' in text
+    assert 'test_seconds_count{route="/a"} 100' in text
+    assert 'test_quantile_seconds{route="/a",quantile="0.99"}' in text
+    assert 'test_size 7' in text
+    assert 'test_bytes{tier="frozen"} 2' in text
+
+
+def test_instrumented_move_counts_valid_move_calls():
+    metrics.instrument()
+    game = ChessBoard()
+    
+    start = metrics.begin_request()
+    assert metrics.requests_in_flight._values[()] >= 1
+    assert game.move_piece((6, 4), (4, 4))
+    assert metrics._request.valid_move_calls == 1
+    metrics.end_request(start, 'POST', '/test/move', 200)
+    
+    assert metrics.valid_move_calls.quantile(0.5, '/test/move') is not None
+    assert metrics.request_latency.quantile(0.5, 'POST', '/test/move') is not None
+    assert metrics.operation_latency.quantile(0.5, 'move_piece') is not None
+    assert 'chess_http_requests_total{method="POST",route="/test/move",status="200"} 1' in metrics.registry.render()
+
+
+def test_sampling_profiler_collects_stacks():
+    profiler = metrics.SamplingProfiler(interval=0.001)
+    assert profiler.collapsed() == ''
+    profiler.start()
+    deadline = time.time() + 5
+    while profiler.samples < 5 and time.time() < deadline:
+        sum(range(10000))
+    profiler.stop()
+    
+    assert not profiler.running
+    assert profiler.samples >= 5
+    assert 'test_sampling_profiler_collects_stacks' in profiler.collapsed()
@@ -0,0 +1,141 @@
+"""Test move notation parsing and batch move application."""
+
+from board import ChessBoard
+from bitboard import BitboardChessBoard
+from notation import (
+    STARTING_FEN, NotationError, format_pgn, format_san, format_uci, parse_square, parse_uci, read_pgn,
+    resolve_moves, san_moves, square_name
+)
+
+PGN = """[Event "Casual"]
+[White "Alice"]
+[Black "Bob"]
+
+1. e4 e5 2. Nf3 {develops} Nc6 3. Bb5 a6 (3... Nf6 4. O-O) 4. Ba4 $1 Nf6 1/2-1/2
+
+[Event "Fool's mate"]
+
+1. f3 e5 2. g4 Qh4# 0-1
+"""
+
+
+def test_squares_and_uci():
+    """Square names and UCI moves map to board coordinates."""
+    assert parse_square('e2') == (6, 4)
+    assert square_name((0, 0)) == 'a8'
+    assert parse_uci('g1f3') == ((7, 6), (5, 5), None)
+    assert parse_uci('e7e8n') == ((1, 4), (0, 4), 'Knight')
+    for bad in ('e2', 'e9e4', 'e7e8k'):
+        try:
+            parse_uci(bad)
+            assert False, bad
+        except NotationError:
+            pass
+
+
+def test_read_pgn():
+    """PGN archives split into games with comments and variations removed."""
+    games = list(read_pgn(PGN.splitlines()))
+    assert len(games) == 2
+    assert games[0]['headers']['White'] == 'Alice'
+    assert games[0]['moves'] == ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6', 'Ba4', 'Nf6']
+    assert games[0]['result'] == '1/2-1/2'
+    assert games[1]['moves'] == ['f3', 'e5', 'g4', 'Qh4#']
+
+
+def test_apply_san_moves():
+    """SAN moves resolve against the position and status is evaluated at the end."""
+    for engine in (ChessBoard, BitboardChessBoard):
+        game = engine()
+        moves = next(read_pgn(PGN.splitlines()))['moves']
+        applied, error = game.apply_moves(resolve_moves(game, moves, 'san'))
+        assert (applied, error) == (8, None)
+        assert game.get_square((2, 5)) == {'type': 'Knight', 'color': 'black'}
+        
+        game = engine()
+        applied, error = game.apply_moves(resolve_moves(game, ['f2f3', 'e7e5', 'g2g4', 'd8h4']))
+        assert (applied, error) == (4, None)
+        assert game.game_status == 'checkmate'
+
+
+def test_ambiguous_and_illegal_san():
+    """SAN that matches no move or several moves is rejected."""
+    game = ChessBoard()
+    game.apply_moves(resolve_moves(game, ['b1c3', 'a7a6', 'g1f3', 'a6a5', 'c3b1', 'a5a4', 'd2d3', 'b7b6'], 'uci'))
+    try:
+        list(resolve_moves(game, ['Nd2'], 'san'))
+        assert False
+    except NotationError as e:
+        assert 'Ambiguous' in str(e)
+    assert next(resolve_moves(game, ['Nbd2'], 'san')) == ((7, 1), (6, 3), None)
+    try:
+        list(resolve_moves(game, ['Qh5'], 'san'))
+        assert False
+    except NotationError as e:
+        assert 'Illegal' in str(e)
+
+
+def test_castling_and_promotion_notation():
+    """SAN castling and promotions resolve for both engines, and FEN keeps rights and en passant."""
+    for engine in (ChessBoard, BitboardChessBoard):
+        game = engine.from_fen('r3k3/6P1/8/8/8/8/8/R3K2R w KQq - 0 1')
+        assert game.apply_moves(resolve_moves(game, ['O-O', 'O-O-O', 'g8=N'], 'san')) == (3, None)
+        assert [move.get('castling') for move in game.move_history] == ['kingside', 'queenside', None]
+        assert game.move_history[-1]['promotion'] == 'Knight'
+        assert game.to_fen() == '2kr2N1/8/8/8/8/8/8/R4RK1 b - - 0 2'
+        
+        game = engine.from_fen('4k3/8/8/8/8/8/8/4K2R w K - 0 1')
+        assert game.move_piece((7, 7), (6, 7))[0]
+        try:
+            list(resolve_moves(game, ['O-O'], 'san'))
+            assert False
+        except NotationError as e:
+            assert 'Illegal' in str(e)
+    
+    # Rights without their king and rook, and en passant squares nobody can use, are dropped
+    assert ChessBoard.from_fen('4k3/8/8/8/8/8/8/4K2R w KQk - 0 1').to_fen() == '4k3/8/8/8/8/8/8/4K2R w K - 0 1'
+    fen = 'rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3'
+    assert BitboardChessBoard.from_fen(fen).to_fen() == fen
+    assert ChessBoard.from_fen(fen.replace('f6', 'c6')).to_fen() == fen.replace('f6', '-')
+
+
+def test_fen_round_trip():
+    """Both engines load and export FEN positions identically."""
+    fens = [
+        STARTING_FEN.replace('KQkq', '-'),
+        'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w - - 2 3',
+        '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    ]
+    for fen in fens:
+        for engine in (ChessBoard, BitboardChessBoard):
+            assert engine.from_fen(fen).to_fen() == fen
+    assert ChessBoard.from_fen(STARTING_FEN).get_board_state() == ChessBoard().get_board_state()
+    
+    game = BitboardChessBoard.from_fen(fens[1])
+    assert game.move_piece((7, 5), (3, 1))[0]
+    assert game.to_fen() == 'r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b - - 3 3'
+    assert ChessBoard.from_fen('7k/6Q1/6K1/8/8/8/8/8 b - - 0 1').game_status == 'checkmate'
+    
+    for bad in ('', '8/8/8/8/8/8/8/8 w - - 0 1', 'rnbqkbnr/pppppppp/8/8 w - - 0 1',
+                'knbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1', STARTING_FEN.replace(' w ', ' x ')):
+        try:
+            ChessBoard.from_fen(bad)
+            assert False, bad
+        except NotationError:
+            pass
+
+
+def test_format_san():
+    """Moves are written in SAN with the minimal disambiguation, and PGN movetext wraps."""
+    game = ChessBoard.from_fen('4k3/8/8/8/8/8/4K3/R6R w - - 0 1')
+    assert format_san(game, ((7, 0), (7, 3), None)) == 'Rad1'
+    game = ChessBoard.from_fen('4k3/R7/8/8/8/8/8/R3K3 w - - 0 1')
+    assert format_san(game, ((1, 0), (4, 0), None)) == 'R7a4'
+    assert format_uci(((1, 4), (0, 4), 'Knight')) == 'e7e8n'
+    
+    game = ChessBoard()
+    moves = [parse_uci(move) for move in ['e2e4', 'd7d5', 'e4d5', 'd8d5']]
+    assert list(san_moves(game, moves)) == ['e4', 'd5', 'exd5', 'Qxd5']
+    text = format_pgn({'Result': '*'}, ['Nf3', 'Nf6', 'Ng1', 'Ng8'] * 10, '*')
+    assert all(len(line) <= 79 for line in text.splitlines())
+    assert next(read_pgn(text.splitlines()))['moves'] == ['Nf3', 'Nf6', 'Ng1', 'Ng8'] * 10
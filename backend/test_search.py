@@ -0,0 +1,62 @@
+"""Test the built-in alpha-beta engine."""
+
+import time
+
+from board import ChessBoard
+from search import MATE_SCORE, SearchTimeout, Searcher, evaluate, search
+
+
+def test_finds_mate_in_one():
+    """The engine plays a back-rank mate and scores it as mate."""
+    board = ChessBoard.from_fen('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1')
+    result = search(board, 1000)
+    assert result['move'] == ((7, 3), (0, 3), None)
+    assert result['score'] > MATE_SCORE - 10
+
+
+def test_wins_hanging_material():
+    """A free queen is captured rather than ignored."""
+    board = ChessBoard.from_fen('4k3/8/8/3q4/8/8/3R4/3K4 w - - 0 1')
+    assert search(board, 300)['move'] == ((6, 3), (3, 3), None)
+
+
+def test_time_budget_and_board_restored():
+    """The search stops on time and leaves the position as it found it."""
+    board = ChessBoard()
+    # Copies, since the search updates the attack maps in place
+    attack_maps = {color: list(counts) for color, counts in board.attack_maps.items()}
+    before = (board.to_fen(), board.zobrist_hash, attack_maps, evaluate(board))
+    start = time.perf_counter()
+    result = search(board, 50)
+    assert time.perf_counter() - start < 0.1
+    assert result['move'] in list(board.generate_moves())
+    assert result['nodes'] > 0 and result['depth'] >= 1
+    attack_maps = {color: list(counts) for color, counts in board.attack_maps.items()}
+    assert (board.to_fen(), board.zobrist_hash, attack_maps, evaluate(board)) == before
+
+
+def test_no_legal_moves():
+    """Checkmated positions have no engine move."""
+    board = ChessBoard.from_fen('7k/6Q1/6K1/8/8/8/8/8 b - - 0 1')
+    assert search(board, 100)['move'] is None
+
+
+def test_timeout_keeps_last_completed_iteration(monkeypatch):
+    """A search cut short returns the move and score of the last completed depth together."""
+    # The best move changes between depth 1 and depth 2
+    fen = 'rnbq1bnr/pp1ppk2/6p1/2p2p1p/1PP4P/3P1PP1/P3PN2/RNBQKB1R b KQ - 2 8'
+    completed = search(ChessBoard.from_fen(fen), 60000, max_depth=1)
+    deeper = search(ChessBoard.from_fen(fen), 60000, max_depth=2)
+    assert completed['move'] != deeper['move']
+    
+    def tick(self):
+        # Time out after a fixed number of nodes rather than on the clock
+        self.nodes += 1
+        if self.nodes >= limit:
+            raise SearchTimeout()
+    
+    monkeypatch.setattr(Searcher, '_tick', tick)
+    for limit in range(completed['nodes'] + 1, deeper['nodes']):
+        result = search(ChessBoard.from_fen(fen), 60000, max_depth=2)
+        assert result['depth'] == 1
+        assert (result['move'], result['score']) == (completed['move'], completed['score'])
@@ -0,0 +1,229 @@
+"""Test game storage tiers."""
+
+import os
+import tempfile
+import time
+
+from board import ChessBoard
+from store import GameStore, game_worker, pack_moves, unpack_moves
+
+OPENING = [((6, 4), (4, 4), None), ((1, 4), (3, 4), None), ((7, 6), (5, 5), None), ((0, 1), (2, 2), None)]
+
+
+def test_pack_moves_round_trip():
+    """Packed move lists are two bytes per move and unpack to the same moves."""
+    moves = OPENING + [((1, 0), (0, 0), 'Knight'), ((6, 7), (7, 7), 'Queen')]
+    history = [{'from': from_pos, 'to': to_pos} for from_pos, to_pos, _ in moves]
+    for move, (_, _, promotion) in zip(history, moves):
+        if promotion:
+            move['promotion'] = promotion
+    packed = pack_moves(history)
+    assert len(packed) == 2 * len(moves)
+    assert list(unpack_moves(packed)) == moves
+    # Lists packed before promotions were stored read back unchanged
+    assert list(unpack_moves(bytes([52, 36]))) == [((6, 4), (4, 4), None)]
+
+
+def test_games_survive_restart():
+    """Flushed games are replayed from SQLite by a new store."""
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'games.db')
+        store = GameStore(db_path=db_path)
+        game_id, game = store.create('bitboard')
+        for move in OPENING:
+            assert game.move_piece(*move)[0]
+            store.mark_dirty(game_id)
+        expected = game.get_board_state()
+        store.close()
+        
+        reopened = GameStore(db_path=db_path)
+        assert game_id in reopened
+        assert reopened.get(game_id).get_board_state() == expected
+        assert reopened.get('game_missing') is None
+        reopened.close()
+
+
+def test_fen_game_survives_restart():
+    """Games started from a FEN replay from that position."""
+    fen = 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w - - 2 3'
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'games.db')
+        store = GameStore(db_path=db_path)
+        game_id, game = store.create('object', fen)
+        assert game.move_piece((7, 5), (3, 1))[0]
+        store.mark_dirty(game_id)
+        expected = game.to_fen()
+        store.close()
+        
+        reopened = GameStore(db_path=db_path)
+        assert reopened.get(game_id).to_fen() == expected
+        reopened.close()
+
+
+def test_hot_tier_eviction():
+    """The hot tier is bounded and evicted games reload from the cold tier."""
+    with tempfile.TemporaryDirectory() as directory:
+        store = GameStore(db_path=os.path.join(directory, 'games.db'), max_hot=2, flush_batch=1000)
+        ids = [store.create()[0] for _ in range(3)]
+        assert len(store) == 2
+        assert store.stored_count() == 3
+        
+        game = store.get(ids[0])
+        assert game is not None and len(store) == 2
+        
+        store.idle_ttl = 0
+        assert store.evict_idle() == 2
+        assert len(store) == 0
+        store.close()
+
+
+def test_unwritable_game_does_not_stop_persistence():
+    """A game that cannot be packed is logged and kept in memory while every other game is written."""
+    with tempfile.TemporaryDirectory() as directory:
+        store = GameStore(db_path=os.path.join(directory, 'games.db'), flush_interval=0.05)
+        bad_id, bad_game = store.create()
+        bad_game.move_history.append({'from': (-2, 4), 'to': (4, 4)})
+        store.mark_dirty(bad_id)
+        store.start()
+        
+        good_id, good_game = store.create()
+        assert good_game.move_piece((6, 4), (4, 4))[0]
+        store.mark_dirty(good_id)
+        deadline = time.monotonic() + 5
+        while store.stored_count() < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert store.stored_count() == 1
+        assert store._flusher.is_alive()
+        
+        store.idle_ttl = 0
+        store.evict_idle()
+        assert store.get(bad_id) is bad_game
+        store.close()
+        
+        reopened = GameStore(db_path=store.db_path)
+        assert reopened.get(good_id).current_turn == 'black'
+        assert reopened.get(bad_id) is None
+        reopened.close()
+
+def test_no_disk_io_under_store_lock():
+    """Flushes never write while holding the store lock, and requests leave them to the flusher thread."""
+    import threading
+    
+    with tempfile.TemporaryDirectory() as directory:
+        store = GameStore(db_path=os.path.join(directory, 'games.db'), max_hot=2, flush_batch=2, flush_interval=60)
+        writers = []
+        write_rows = store._write_rows
+        
+        def checked_write_rows(rows):
+            assert not store._lock._is_owned()
+            writers.append(threading.current_thread().name)
+            return write_rows(rows)
+        
+        store._write_rows = checked_write_rows
+        for _ in range(5):
+            store.create()
+        assert len(store) == 2 and store.dirty_count() == 1
+        store.idle_ttl = 0
+        assert store.evict_idle() == 2
+        assert store.stored_count() == 5
+        
+        writers.clear()
+        store.idle_ttl = 3600
+        store.start()
+        for _ in range(5):
+            store.create()
+        deadline = time.monotonic() + 5
+        while (store.stored_count() < 9 or len(store) > 2) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(store) == 2 and store.stored_count() >= 9
+        assert writers and set(writers) == {'game-store-flusher'}
+        store.close()
+
+def test_game_ids_unique():
+    """Game IDs do not depend on a per-process counter, and name the worker that created them."""
+    ids = {GameStore().new_game_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert all(game_worker(game_id) is None for game_id in ids)
+    
+    store = GameStore(worker=3)
+    game_id, _ = store.create()
+    assert game_id.startswith('game_3_') and game_worker(game_id) == 3
+    assert all(game_worker(game_id) == 3 for game_id in store.import_packed('object', [(b'', None, 'active')]))
+
+
+def test_concurrent_moves_on_one_game():
+    """Many threads moving and reading one game never see a corrupt board."""
+    import random
+    import threading
+    
+    store = GameStore()
+    game_id, _ = store.create()
+    errors = []
+    
+    def player(seed):
+        rng = random.Random(seed)
+        for _ in range(40):
+            with store.locked(game_id) as game:
+                moves = sorted(game.generate_moves())
+                if not moves or game.game_status == 'draw':
+                    return
+                success, message = game.move_piece(*rng.choice(moves))
+                if not success:
+                    errors.append(message)
+                store.mark_dirty(game_id)
+    
+    def reader():
+        for _ in range(200):
+            with store.locked(game_id) as game:
+                state = game.get_board_state()
+                pieces = sum(1 for row in state['board'] for piece in row if piece)
+                captures = sum(1 for move in game.move_history if move['captured'])
+                if pieces != 32 - captures or state['move_count'] != len(game.move_history):
+                    errors.append('inconsistent board observed')
+    
+    threads = [threading.Thread(target=player, args=(seed,)) for seed in range(8)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    game = store.get(game_id)
+    replayed = ChessBoard()
+    for move in game.move_history:
+        assert replayed.move_piece(move['from'], move['to'], move.get('promotion'))[0]
+    assert replayed.get_board_state() == game.get_board_state()
+
+
+def test_finished_games_compact_and_thaw():
+    """Idle finished games shrink to a frozen entry and rebuild on access, with or without SQLite."""
+    fools_mate = [((6, 5), (5, 5), None), ((1, 4), (3, 4), None), ((6, 6), (4, 6), None), ((0, 3), (4, 7), None)]
+    with tempfile.TemporaryDirectory() as directory:
+        for store in (GameStore(db_path=os.path.join(directory, 'games.db')), GameStore()):
+            finished_id, game = store.create('bitboard')
+            for move in fools_mate:
+                assert game.move_piece(*move)[0]
+            store.mark_dirty(finished_id)
+            expected = game.to_fen()
+            active_id = store.create()[0]
+            
+            store.freeze_after = 0
+            assert store.compact_finished() == 1
+            assert len(store) == 1 and store.frozen_count() == 1
+            assert finished_id in store
+            usage = store.memory_usage()
+            assert 0 < usage['frozen'] < usage['hot']
+            assert [row['game_id'] for row in store.iter_games(statuses=('checkmate',))] == [finished_id]
+            
+            with store.locked(finished_id) as thawed:
+                assert thawed.to_fen() == expected and thawed.game_status == 'checkmate'
+            assert store.frozen_count() == 0 and len(store) == 2
+            assert store.get(active_id) is not None
+            
+            store.max_frozen = 0
+            assert store.compact_finished() == 1
+            assert store.frozen_count() == 0
+            # Dropped from memory; still reloadable when SQLite holds it
+            assert (store.get(finished_id) is not None) == (store.db_path is not None)
+            store.close()
@@ -0,0 +1,32 @@
+"""Test response encoding and board format negotiation."""
+
+import json
+
+import wire
+
+
+def test_dumps_matches_stdlib():
+    payload = {'board': [[None, {'type': 'Pawn', 'color': 'white'}]], 'move': (6, 4), 'count': 3}
+    assert json.loads(wire.dumps(payload)) == json.loads(json.dumps(payload))
+    # Integer keys are not valid for orjson by default and use the fallback
+    assert json.loads(wire.dumps({1: 'a'})) == {'1': 'a'}
+
+
+def test_board_format_negotiation():
+    assert wire.board_format(None, None) == 'full'
+    assert wire.board_format('compact', None) == 'compact'
+    assert wire.board_format(None, 'text/html, application/vnd.chess.fen+json;q=0.9') == 'fen'
+    assert wire.board_format('full', 'application/vnd.chess.compact+json') == 'full'
+    assert wire.board_format(None, 'application/json') == 'full'
+    try:
+        wire.board_format('xml', None)
+        assert False
+    except ValueError as e:
+        assert 'xml' in str(e)
+
+
+def test_with_field_splices_encoded_value():
+    encoded = wire.dumps({'move_count': 1})
+    body = wire.with_field({'success': True}, 'state', encoded)
+    assert json.loads(body) == {'success': True, 'state': {'move_count': 1}}
+    assert json.loads(wire.with_field({}, 'state', encoded)) == {'state': {'move_count': 1}}
@@ -0,0 +1,81 @@
+"""Test the engine process pool."""
+
+import time
+
+from board import ChessBoard
+from notation import STARTING_FEN
+from store import unpack_moves
+from workers import EnginePool, PoolSaturated, analyze_positions, engine_search, replay_games
+
+
+def test_replay_games():
+    """Replayed games come back as packed moves, and invalid games as errors."""
+    results = replay_games('bitboard', [
+        (['f3', 'e5', 'g4', 'Qh4'], 'san', None),
+        (['e2e4', 'e2e4'], 'uci', None),
+        (['g1a7'], 'uci', '7k/8/6K1/8/8/8/8/6Q1 w - - 0 1'),
+    ])
+    assert results[0]['game_status'] == 'checkmate'
+    assert list(unpack_moves(results[0]['packed']))[0] == ((6, 5), (5, 5), None)
+    assert results[1] == {'index': 1, 'error': 'Move 2: No piece at starting position'}
+    assert results[2]['fen'] == '7k/8/6K1/8/8/8/8/6Q1 w - - 0 1'
+
+
+def test_inline_pool():
+    """With no workers, tasks run in the calling thread."""
+    pool = EnginePool(max_workers=0, max_pending=1)
+    result = pool.submit(engine_search, STARTING_FEN, 20).result()
+    assert result['move'] in list(ChessBoard().generate_moves())
+    assert pool.stats()['pending'] == 0 and pool.stats()['completed'] == 1
+
+
+def test_process_pool_backpressure():
+    """Work beyond max_pending is rejected instead of queued."""
+    pool = EnginePool(max_workers=1, max_pending=1)
+    try:
+        future = pool.submit(engine_search, STARTING_FEN, 200)
+        try:
+            pool.submit(engine_search, STARTING_FEN, 200)
+            assert False, 'expected PoolSaturated'
+        except PoolSaturated:
+            pass
+        assert future.result(timeout=30)['move'] in list(ChessBoard().generate_moves())
+        # The pending count drops in a done callback, just after the result is set
+        for _ in range(100):
+            if pool.stats()['pending'] == 0:
+                break
+            time.sleep(0.01)
+        stats = pool.stats()
+        assert stats['rejected'] == 1 and stats['completed'] == 1 and stats['pending'] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_analyze_positions():
+    """Positions stream through the pool in chunks and come back in input order."""
+    fens = [
+        'rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3',
+        '7k/5Q2/6K1/8/8/8/8/8 b - - 0 1',
+        'not a fen',
+        STARTING_FEN,
+        None
+    ]
+    for workers in (0, 1):
+        results = list(analyze_positions(iter(fens * 3), workers=workers, chunk_size=2))
+        assert [result['index'] for result in results] == list(range(15))
+        assert [result.get('status') for result in results[:5]] == ['checkmate', 'stalemate', None, 'active', None]
+        assert results[3]['legal_moves'] == 20 and results[0]['legal_moves'] == 0
+        assert results[4]['error'] == 'FEN must be a string'
+    
+    # A shared pool that is already full refuses before any result is produced
+    pool = EnginePool(max_workers=1, max_pending=1)
+    try:
+        future = pool.submit(engine_search, STARTING_FEN, 200)
+        try:
+            next(analyze_positions(fens, pool=pool))
+            assert False, 'expected PoolSaturated'
+        except PoolSaturated:
+            pass
+        future.result(timeout=30)
+    finally:
+        pool.shutdown()
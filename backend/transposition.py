@@ -0,0 +1,62 @@
+"""Process-wide transposition cache for position evaluation results."""
+
+import threading
+from collections import OrderedDict
+
+
+class TranspositionCache:
+    """Bounded LRU cache keyed by Zobrist hash.
+    
+    Values are small dicts that boards fill in lazily (for example
+    ``status`` and ``moves``), so a position evaluated by one game is free
+    for every other game that reaches it. When an opening book is loaded
+    (see ``book.load()``), entries for book positions start out filled from it.
+    """
+    
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.book = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def entry(self, key):
+        """Return the mutable entry for key, creating an empty one on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            entry = (self.book.probe(key) if self.book is not None else None) or {}
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return entry
+    
+    def record(self, hit):
+        """Count a lookup of a field within an entry."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'book': self.book.stats() if self.book is not None else None
+        }
+
+
+# Shared by every game in this process
+position_cache = TranspositionCache()
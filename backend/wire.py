@@ -0,0 +1,61 @@
+"""Wire formats for API responses.
+
+Board state can be sent in three formats:
+
+- ``full``: ``board`` is 8 rows of 8 ``{'type', 'color'}`` dicts or null
+- ``compact``: ``board`` is a 64-character string in square order (row 0,
+  black's back rank, first), FEN letters for pieces and '.' for empty squares
+- ``fen``: no ``board``; ``fen`` holds the position as a FEN string
+
+JSON is encoded with orjson when it is installed and with the standard
+library otherwise; both produce the same compact JSON.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BOARD_FORMATS = ('full', 'compact', 'fen')
+# Accept header media types that select a board format
+FORMAT_MEDIA_TYPES = {
+    'application/vnd.chess.compact+json': 'compact',
+    'application/vnd.chess.fen+json': 'fen'
+}
+
+
+def dumps(obj):
+    """Encode obj as JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # Non-string keys or integers beyond 64 bits; the stdlib handles both
+            pass
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def board_format(format_param, accept):
+    """Board format from a ?format= value or an Accept header; full by default.
+    
+    Raises ValueError for an unknown ?format= value.
+    """
+    if format_param is not None:
+        if format_param not in BOARD_FORMATS:
+            raise ValueError(f"Unknown format '{format_param}'; use one of {', '.join(BOARD_FORMATS)}")
+        return format_param
+    if accept:
+        for media_range in accept.split(','):
+            media_type = media_range.split(';', 1)[0].strip().lower()
+            if media_type in FORMAT_MEDIA_TYPES:
+                return FORMAT_MEDIA_TYPES[media_type]
+    return 'full'
+
+
+def with_field(fields, name, encoded):
+    """JSON object bytes of fields plus one member whose value is already encoded."""
+    head = dumps(fields)
+    separator = b',' if len(head) > 2 else b''
+    return head[:-1] + separator + dumps(name) + b':' + encoded + b'}'
@@ -0,0 +1,217 @@
+"""Process pool for CPU-heavy engine work.
+
+Searches and bulk replays run in worker processes so that they do not hold
+the GIL of the process serving requests. Work is sent as FEN strings and
+move lists, and results come back as plain tuples, dicts and packed move
+bytes; board objects never cross the process boundary.
+
+The pool bounds the number of tasks queued or running. Submitting beyond
+that raises ``PoolSaturated``, which the API turns into a 503, instead of
+letting a backlog build up behind slow searches.
+
+``analyze_positions()`` evaluates large sets of FEN positions through a
+pool, a chunk of positions per task, yielding results as chunks finish.
+"""
+
+import itertools
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from board import ChessBoard
+from notation import NotationError, apply_move_strings
+from search import search
+from store import ENGINES, pack_moves
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already has max_pending tasks queued or running."""
+
+
+def engine_search(fen, time_ms):
+    """Search a FEN position; runs in a worker process."""
+    return search(ChessBoard.from_fen(fen), time_ms)
+
+
+def replay_games(engine, sources):
+    """Validate and replay games given as (moves, notation, fen) triples; runs in a worker process.
+    
+    Returns one dict per game, either {'index', 'error'} or {'index',
+    'packed', 'fen', 'move_count', 'game_status'} with the moves packed as
+    in the game store.
+    """
+    results = []
+    for index, (moves, notation, fen) in enumerate(sources):
+        try:
+            game = ENGINES[engine](fen)
+        except NotationError as e:
+            results.append({'index': index, 'error': str(e)})
+            continue
+        if not isinstance(moves, list):
+            results.append({'index': index, 'error': "Each game must be a list of moves"})
+            continue
+        applied, error = apply_move_strings(game, moves, notation)
+        if error:
+            results.append({'index': index, 'error': error})
+            continue
+        results.append({
+            'index': index,
+            'packed': pack_moves(game.move_history),
+            'fen': fen,
+            'move_count': applied,
+            'game_status': game.game_status
+        })
+    return results
+
+
+def analyze_fens(start, fens):
+    """Status and legal move count of each FEN position; runs in a worker process.
+    
+    Returns one dict per position, {'index', 'fen', 'error'} or {'index',
+    'fen', 'status', 'turn', 'legal_moves'}, with indexes counted from start.
+    """
+    results = []
+    for index, fen in enumerate(fens, start):
+        try:
+            if not isinstance(fen, str):
+                raise NotationError("FEN must be a string")
+            game = ChessBoard(fen)
+        except NotationError as e:
+            results.append({'index': index, 'fen': fen, 'error': str(e)})
+            continue
+        results.append({
+            'index': index,
+            'fen': fen,
+            'status': game.game_status,
+            'turn': game.current_turn,
+            'legal_moves': len(game.legal_moves())
+        })
+    return results
+
+
+# Positions sent to a worker per task
+ANALYZE_CHUNK = 256
+
+
+def analyze_positions(fens, workers=None, chunk_size=ANALYZE_CHUNK, pool=None):
+    """Lazily yield analyze_fens() results for an iterable of FEN strings, in input order.
+    
+    fens is read chunk_size positions at a time and at most two chunks per
+    worker are in flight, so it may be a generator over a file of any size.
+    With pool (an EnginePool) the work shares that pool and raises
+    PoolSaturated if the pool is full before any of its chunks is running;
+    otherwise a pool of workers processes (default: one per CPU) is started
+    for the call and stopped when the generator finishes or is closed.
+    """
+    own_pool = pool is None
+    if own_pool:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        pool = EnginePool(max_workers=workers, max_pending=2 * max(workers, 1))
+    window = 2 * max(pool.max_workers, 1)
+    positions = iter(fens)
+    start = 0
+    chunk = None
+    in_flight = deque()
+    try:
+        while True:
+            while len(in_flight) < window:
+                if chunk is None:
+                    chunk = list(itertools.islice(positions, chunk_size))
+                if not chunk:
+                    break
+                try:
+                    in_flight.append(pool.submit(analyze_fens, start, chunk))
+                except PoolSaturated:
+                    # Shared pool is busy: retry once one of ours finishes
+                    if not in_flight:
+                        raise
+                    break
+                start += len(chunk)
+                chunk = None
+            if not in_flight:
+                return
+            yield from in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if own_pool:
+            pool.shutdown()
+
+
+class EnginePool:
+    """Bounded process pool for engine tasks.
+    
+    Args:
+        max_workers: Worker processes; 0 runs tasks inline in the calling
+            thread, which keeps the API working where processes are unwanted.
+        max_pending: Tasks allowed to be queued or running at once.
+    
+    Worker processes are started on first use with the ``spawn`` method, so
+    they never inherit the server's threads or open database connections.
+    """
+    
+    def __init__(self, max_workers=2, max_pending=8):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def submit(self, fn, *args):
+        """Schedule fn(*args) and return a Future, or raise PoolSaturated."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated(f"Engine pool busy ({self.pending} tasks pending)")
+            self.pending += 1
+            if self.max_workers and self._executor is None:
+                # Imported on first use: multiprocessing is the bulk of this
+                # module's import time and inline pools never need it
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+        
+        if not self.max_workers:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            self._done(future)
+            return future
+        
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+    
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'pending': self.pending,
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
+    
+    def shutdown(self):
+        """Stop the worker processes, waiting for running tasks."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
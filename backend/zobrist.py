@@ -0,0 +1,37 @@
+"""Zobrist hashing keys shared by every board implementation.
+
+Keys come from a fixed seed so the same position hashes to the same value
+in every process and under both engines.
+"""
+
+import random
+
+PIECE_TYPES = ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')
+COLORS = ('white', 'black')
+
+_rng = random.Random(0x5EED_C4E55)
+
+# PIECE_KEYS[color_index * 6 + piece_type_index][sq]
+PIECE_KEYS = tuple(
+    tuple(_rng.getrandbits(64) for _ in range(64))
+    for _ in range(len(COLORS) * len(PIECE_TYPES))
+)
+# Mixed in when black is to move
+SIDE_KEY = _rng.getrandbits(64)
+
+_CASTLING_RIGHT_KEYS = tuple(_rng.getrandbits(64) for _ in range(4))
+# CASTLING_KEYS[rights] for every combination of the four castling right bits
+CASTLING_KEYS = tuple(
+    _CASTLING_RIGHT_KEYS[0] * (rights & 1) ^ _CASTLING_RIGHT_KEYS[1] * (rights >> 1 & 1)
+    ^ _CASTLING_RIGHT_KEYS[2] * (rights >> 2 & 1) ^ _CASTLING_RIGHT_KEYS[3] * (rights >> 3 & 1)
+    for rights in range(16)
+)
+# EN_PASSANT_KEYS[col] when an en passant capture onto that file is possible
+EN_PASSANT_KEYS = tuple(_rng.getrandbits(64) for _ in range(8))
+
+# (color, piece type name) -> per-square keys, for object-based boards
+KEYS_BY_NAME = {
+    (color, name): PIECE_KEYS[color_index * 6 + type_index]
+    for color_index, color in enumerate(COLORS)
+    for type_index, name in enumerate(PIECE_TYPES)
+}
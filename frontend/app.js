@@ -22,10 +22,14 @@ const API_URL = 'http://localhost:5001/api';
 let currentGameId = null;
 let selectedSquare = null;
 let gameState = null;
+let legalMoves = [];
+let moveHistory = [];
 
 // Initialize game on page load
 document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('new-game-btn').addEventListener('click', createNewGame);
+    document.getElementById('engine-btn').addEventListener('click', engineMove);
+    document.getElementById('undo-btn').addEventListener('click', undoMove);
     
     // Add keyboard shortcuts
     document.addEventListener('keydown', (e) => {
@@ -36,6 +40,10 @@ document.addEventListener('DOMContentLoaded', () => {
             if (confirm('Start a new game?')) {
                 createNewGame();
             }
+        } else if (e.key === 'u' || e.key === 'U') {
+            undoMove();
+        } else if (e.key === 'e' || e.key === 'E') {
+            engineMove();
         }
     });
     
@@ -53,6 +61,7 @@ async function createNewGame() {
         if (data.success) {
             currentGameId = data.game_id;
             gameState = data.state;
+            moveHistory = [];
             renderBoard(gameState.board);
             updateGameInfo(gameState);
             showMessage('New game started!', 'success');
@@ -93,12 +102,36 @@ function renderBoard(board) {
     }
 }
 
+// Apply a state delta from the server, redrawing only the squares that changed
+function applyDelta(delta) {
+    delta.squares.forEach(({ position, piece }) => {
+        const [row, col] = position;
+        gameState.board[row][col] = piece;
+        const square = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
+        square.textContent = piece ? PIECE_SYMBOLS[piece.color][piece.type] : '';
+    });
+    
+    gameState.current_turn = delta.current_turn;
+    gameState.game_status = delta.game_status;
+    gameState.move_count = delta.move_count;
+    gameState.version = delta.version;
+    moveHistory = moveHistory.slice(0, delta.since).concat(delta.history);
+    
+    // Only pieces of the side to move are selectable
+    document.querySelectorAll('.square').forEach(square => {
+        const piece = gameState.board[square.dataset.row][square.dataset.col];
+        const selectable = piece !== null && piece.color === gameState.current_turn;
+        square.classList.toggle('hoverable', selectable);
+        square.style.cursor = selectable ? 'pointer' : '';
+    });
+}
+
 // Handle square click
 function handleSquareClick(row, col) {
     if (!currentGameId) return;
     
     // Don't allow moves if game is over
-    if (gameState.game_status === 'checkmate' || gameState.game_status === 'stalemate') {
+    if (['checkmate', 'stalemate', 'draw'].includes(gameState.game_status)) {
         showMessage('Game is over. Start a new game!', 'info');
         return;
     }
@@ -125,27 +158,34 @@ function handleSquareClick(row, col) {
 
 // Highlight valid moves for selected piece
 function highlightValidMoves(row, col) {
-    const piece = gameState.board[row][col];
-    if (!piece) return;
-    
-    // Get all possible moves (simplified - shows all empty squares and captures)
-    for (let r = 0; r < 8; r++) {
-        for (let c = 0; c < 8; c++) {
-            const targetPiece = gameState.board[r][c];
-            if (!targetPiece || targetPiece.color !== piece.color) {
-                const square = document.querySelector(`[data-row="${r}"][data-col="${c}"]`);
-                if (square) {
-                    square.classList.add('valid-move');
-                }
+    legalMoves
+        .filter(move => move.from[0] === row && move.from[1] === col)
+        .forEach(move => {
+            const square = document.querySelector(`[data-row="${move.to[0]}"][data-col="${move.to[1]}"]`);
+            if (square) {
+                square.classList.add('valid-move');
             }
-        }
+        });
+}
+
+// Fetch legal moves for the side to move
+async function updateLegalMoves() {
+    if (!currentGameId) return;
+    
+    try {
+        const response = await fetch(`${API_URL}/game/${currentGameId}/moves`);
+        const data = await response.json();
+        legalMoves = data.success ? data.moves : [];
+    } catch (error) {
+        legalMoves = [];
+        console.error('Error fetching legal moves:', error);
     }
 }
 
 // Make a move
 async function makeMove(fromRow, fromCol, toRow, toCol) {
     try {
-        const response = await fetch(`${API_URL}/game/${currentGameId}/move`, {
+        const response = await fetch(`${API_URL}/game/${currentGameId}/move?since=${gameState.version}`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -159,8 +199,17 @@ async function makeMove(fromRow, fromCol, toRow, toCol) {
         const data = await response.json();
         
         if (data.success) {
-            gameState = data.state;
-            renderBoard(gameState.board);
+            if (data.delta) {
+                applyDelta(data.delta);
+            } else {
+                // The server sends the full state when our version is stale,
+                // e.g. after moves were taken back in another tab
+                gameState = data.state;
+                const historyResponse = await fetch(`${API_URL}/game/${currentGameId}/history`);
+                const historyData = await historyResponse.json();
+                moveHistory = historyData.history;
+                renderBoard(gameState.board);
+            }
             updateGameInfo(gameState);
             showMessage(data.message, 'success');
             
@@ -171,6 +220,8 @@ async function makeMove(fromRow, fromCol, toRow, toCol) {
                 showMessage(`${gameState.current_turn} is in check!`, 'info');
             } else if (gameState.game_status === 'stalemate') {
                 showMessage('Stalemate! Game is a draw.', 'info');
+            } else if (gameState.game_status === 'draw') {
+                showMessage('Draw by repetition or the fifty-move rule.', 'info');
             }
         } else {
             showMessage(data.error, 'error');
@@ -180,6 +231,64 @@ async function makeMove(fromRow, fromCol, toRow, toCol) {
     }
 }
 
+// Let the engine play a move for the side to move
+async function engineMove() {
+    if (!currentGameId) return;
+    
+    try {
+        showMessage('Engine is thinking...', 'info');
+        const response = await fetch(`${API_URL}/game/${currentGameId}/engine-move`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ time_ms: 1000 })
+        });
+        const data = await response.json();
+        
+        if (data.success) {
+            clearSelection();
+            const previousVersion = gameState.version;
+            gameState = data.state;
+            const historyResponse = await fetch(`${API_URL}/game/${currentGameId}/history?since=${previousVersion}`);
+            const historyData = await historyResponse.json();
+            moveHistory = moveHistory.slice(0, historyData.since).concat(historyData.history);
+            renderBoard(gameState.board);
+            updateGameInfo(gameState);
+            showMessage(`Engine searched ${data.search.nodes} nodes to depth ${data.search.depth}`, 'success');
+        } else {
+            showMessage(data.error, 'error');
+        }
+    } catch (error) {
+        showMessage('Error requesting engine move: ' + error.message, 'error');
+    }
+}
+
+// Take back the last move
+async function undoMove() {
+    if (!currentGameId) return;
+    
+    try {
+        const response = await fetch(`${API_URL}/game/${currentGameId}/undo`, {
+            method: 'POST'
+        });
+        const data = await response.json();
+        
+        if (data.success) {
+            clearSelection();
+            gameState = data.state;
+            moveHistory = moveHistory.slice(0, gameState.move_count);
+            renderBoard(gameState.board);
+            updateGameInfo(gameState);
+            showMessage('Move taken back', 'success');
+        } else {
+            showMessage(data.error, 'error');
+        }
+    } catch (error) {
+        showMessage('Error undoing move: ' + error.message, 'error');
+    }
+}
+
 // Clear square selection
 function clearSelection() {
     if (selectedSquare) {
@@ -203,35 +312,25 @@ function updateGameInfo(state) {
         state.game_status.charAt(0).toUpperCase() + state.game_status.slice(1);
     document.getElementById('move-count').textContent = state.move_count;
     
+    updateLegalMoves();
     updateMoveHistory();
 }
 
 // Update move history
-async function updateMoveHistory() {
-    if (!currentGameId) return;
+function updateMoveHistory() {
+    const historyElement = document.getElementById('move-history');
+    historyElement.innerHTML = '';
     
-    try {
-        const response = await fetch(`${API_URL}/game/${currentGameId}/history`);
-        const data = await response.json();
-        
-        if (data.success) {
-            const historyElement = document.getElementById('move-history');
-            historyElement.innerHTML = '';
-            
-            data.history.forEach((move, index) => {
-                const moveDiv = document.createElement('div');
-                const fromPos = `${String.fromCharCode(97 + move.from[1])}${8 - move.from[0]}`;
-                const toPos = `${String.fromCharCode(97 + move.to[1])}${8 - move.to[0]}`;
-                moveDiv.textContent = `${index + 1}. ${move.piece} ${fromPos} → ${toPos}`;
-                if (move.captured) {
-                    moveDiv.textContent += ` (captured ${move.captured})`;
-                }
-                historyElement.appendChild(moveDiv);
-            });
+    moveHistory.forEach((move, index) => {
+        const moveDiv = document.createElement('div');
+        const fromPos = `${String.fromCharCode(97 + move.from[1])}${8 - move.from[0]}`;
+        const toPos = `${String.fromCharCode(97 + move.to[1])}${8 - move.to[0]}`;
+        moveDiv.textContent = `${index + 1}. ${move.piece} ${fromPos} → ${toPos}`;
+        if (move.captured) {
+            moveDiv.textContent += ` (captured ${move.captured})`;
         }
-    } catch (error) {
-        console.error('Error fetching move history:', error);
-    }
+        historyElement.appendChild(moveDiv);
+    });
 }
 
 // Show message